@@ -74,7 +74,19 @@ export type ProductListItem = {
   sort_order: number
   view_count: number
   image_url: string | null
-  variants: Array<{ id: string; option_name: string; option_value: string; stock_qty: number; in_order_qty: number }>
+  // Агрегаты по вариантам; сами варианты — через getProduct(id)
+  variants_count: number
+  stock_qty_total: number
+  in_order_qty_total: number
+}
+
+export type ProductVariantItem = {
+  id: string
+  option_name: string
+  option_value: string
+  stock_qty: number
+  in_order_qty: number
+  sort_order: number
 }
 
 export type ProductListResponse = {
@@ -249,6 +261,31 @@ export async function uploadImage(
   return res.json()
 }
 
+export type BatchUploadResult = {
+  filename: string
+  ok: boolean
+  id?: string
+  url?: string
+  width?: number
+  height?: number
+  error?: string
+}
+
+export async function uploadImages(
+  productId: string,
+  files: File[]
+): Promise<{ items: BatchUploadResult[]; uploaded: number; failed: number }> {
+  const form = new FormData()
+  files.forEach((file) => form.append('files', file))
+  const res = await fetchWithAuth(`${API_BASE}/admin/products/${productId}/images/batch`, {
+    method: 'POST',
+    headers: { Authorization: `Bearer ${getToken()}` },
+    body: form,
+  })
+  if (!res.ok) throw new Error('Failed to upload images')
+  return res.json()
+}
+
 export async function uploadAttachment(
   productId: string,
   file: File,
@@ -270,7 +307,7 @@ export async function uploadAttachment(
 
 export async function addVariant(
   productId: string,
-  data: { option_name: string; option_value: string; stock_qty?: number; in_order_qty?: number; sort_order?: number }
+  data: { option_name: string; option_value: string; stock_qty?: number; sort_order?: number }
 ): Promise<{ id: string }> {
   const res = await fetchWithAuth(`${API_BASE}/admin/products/${productId}/variants`, {
     method: 'POST',
@@ -279,7 +316,6 @@ export async function addVariant(
       option_name: data.option_name,
       option_value: data.option_value,
       stock_qty: data.stock_qty ?? 0,
-      in_order_qty: data.in_order_qty ?? 0,
       sort_order: data.sort_order ?? 0,
     }),
   })
@@ -290,7 +326,7 @@ export async function addVariant(
 export async function updateVariant(
   productId: string,
   variantId: string,
-  data: { option_name?: string; option_value?: string; stock_qty?: number; in_order_qty?: number; sort_order?: number }
+  data: { option_name?: string; option_value?: string; stock_qty?: number; sort_order?: number }
 ): Promise<{ id: string }> {
   const res = await fetchWithAuth(`${API_BASE}/admin/products/${productId}/variants/${variantId}`, {
     method: 'PUT',
@@ -306,6 +342,7 @@ export async function deleteVariant(productId: string, variantId: string): Promi
     method: 'DELETE',
     headers: authHeaders(),
   })
+  if (res.status === 409) throw new Error('У варианта есть активные резервы — удаление невозможно')
   if (!res.ok) throw new Error('Failed to delete variant')
 }
 
@@ -357,6 +394,15 @@ export async function updateImageSort(
   if (!res.ok) throw new Error('Failed to update image order')
 }
 
+export async function reorderImages(productId: string, ids: string[]): Promise<void> {
+  const res = await fetchWithAuth(`${API_BASE}/admin/products/${productId}/images/order`, {
+    method: 'PUT',
+    headers: authHeaders(),
+    body: JSON.stringify({ ids }),
+  })
+  if (!res.ok) throw new Error('Failed to update image order')
+}
+
 export async function deleteFile(fileId: string): Promise<void> {
   const res = await fetchWithAuth(`${API_BASE}/admin/files/${fileId}`, {
     method: 'DELETE',
@@ -12,11 +12,11 @@ import {
   deleteVariant,
   getProduct,
   listCategories,
-  updateImageSort,
+  reorderImages,
   updateProduct,
   updateVariant,
   uploadAttachment,
-  uploadImage,
+  uploadImages,
   getFileUrl,
 } from '../api'
 import { useToast } from '../components/Toast'
@@ -133,7 +133,7 @@ export function ProductEdit() {
   const [showSpecModal, setShowSpecModal] = useState(false)
   const [showVariantModal, setShowVariantModal] = useState(false)
   const [newSpec, setNewSpec] = useState({ name: '', value: '', unit: '' })
-  const [newVariant, setNewVariant] = useState({ option_name: '', option_value: '', stock_qty: 0, in_order_qty: 0 })
+  const [newVariant, setNewVariant] = useState({ option_name: '', option_value: '', stock_qty: 0 })
 
   const loadProduct = useCallback(async () => {
     if (isNew || !id) return
@@ -261,21 +261,26 @@ export function ProductEdit() {
 
   async function handleImagesSelected(files: File[]) {
     if (!id || isNew) return
-    for (const file of files) {
-      try {
-        const res = await uploadImage(id, file, undefined, data.images.length)
-        setData((d) => ({
-          ...d,
-          images: [
-            ...d.images,
-            { id: res.id, url: res.url, sort_order: d.images.length },
-          ],
-        }))
-        showToast(`Фотография "${file.name}" успешно загружена`, 'success')
-      } catch (err) {
-        const errorMessage = err instanceof Error ? err.message : 'Ошибка загрузки'
-        showToast(`Ошибка загрузки "${file.name}": ${errorMessage}`, 'error')
+    try {
+      // Все файлы — одним запросом; сервер возвращает результат по каждому
+      const res = await uploadImages(id, files)
+      const uploaded = res.items.filter((r) => r.ok)
+      setData((d) => ({
+        ...d,
+        images: [
+          ...d.images,
+          ...uploaded.map((r, i) => ({ id: r.id!, url: r.url!, sort_order: d.images.length + i })),
+        ],
+      }))
+      if (uploaded.length > 0) {
+        showToast(`Загружено фотографий: ${uploaded.length}`, 'success')
       }
+      res.items
+        .filter((r) => !r.ok)
+        .forEach((r) => showToast(`Ошибка загрузки "${r.filename}": ${r.error}`, 'error'))
+    } catch (err) {
+      const errorMessage = err instanceof Error ? err.message : 'Ошибка загрузки'
+      showToast(`Ошибка загрузки фотографий: ${errorMessage}`, 'error')
     }
   }
 
@@ -325,8 +330,7 @@ export function ProductEdit() {
     imgs[idx] = imgs[idx + dir]
     imgs[idx + dir] = tmp
     try {
-      await updateImageSort(id, imgs[idx].id, idx)
-      await updateImageSort(id, imgs[idx + dir].id, idx + dir)
+      await reorderImages(id, imgs.map((img) => img.id))
       setData((d) => ({
         ...d,
         images: imgs.map((img, i) => ({ ...img, sort_order: i })),
@@ -414,7 +418,6 @@ export function ProductEdit() {
         option_name: newVariant.option_name.trim(),
         option_value: newVariant.option_value.trim(),
         stock_qty: newVariant.stock_qty || 0,
-        in_order_qty: newVariant.in_order_qty || 0,
         sort_order: data.variants.length,
       })
       setData((d) => ({
@@ -426,12 +429,12 @@ export function ProductEdit() {
             option_name: newVariant.option_name.trim(),
             option_value: newVariant.option_value.trim(),
             stock_qty: newVariant.stock_qty || 0,
-            in_order_qty: newVariant.in_order_qty || 0,
+            in_order_qty: 0,
             sort_order: d.variants.length,
           },
         ],
       }))
-      setNewVariant({ option_name: '', option_value: '', stock_qty: 0, in_order_qty: 0 })
+      setNewVariant({ option_name: '', option_value: '', stock_qty: 0 })
       setShowVariantModal(false)
       showToast('Вариант добавлен', 'success')
     } catch (err) {
@@ -443,7 +446,7 @@ export function ProductEdit() {
 
   async function handleUpdateVariant(
     variantId: string,
-    field: 'stock_qty' | 'in_order_qty',
+    field: 'stock_qty',
     value: number
   ) {
     if (!id || isNew) return
@@ -857,20 +860,7 @@ export function ProductEdit() {
                             }
                           />
                         </td>
-                        <td>
-                          <input
-                            type="number"
-                            min={0}
-                            value={v.in_order_qty}
-                            onChange={(e) =>
-                              handleUpdateVariant(
-                                v.id,
-                                'in_order_qty',
-                                parseInt(e.target.value, 10) || 0
-                              )
-                            }
-                          />
-                        </td>
+                        <td title="Меняется только резервами заказов">{v.in_order_qty}</td>
                         <td>
                           <button
                             type="button"
@@ -950,7 +940,7 @@ export function ProductEdit() {
           isOpen={showVariantModal}
           onClose={() => {
             setShowVariantModal(false)
-            setNewVariant({ option_name: '', option_value: '', stock_qty: 0, in_order_qty: 0 })
+            setNewVariant({ option_name: '', option_value: '', stock_qty: 0 })
           }}
           title="Добавить вариант"
         >
@@ -988,24 +978,13 @@ export function ProductEdit() {
               }
             />
           </div>
-          <div className="form-group">
-            <label>В заказе</label>
-            <input
-              type="number"
-              min={0}
-              value={newVariant.in_order_qty}
-              onChange={(e) =>
-                setNewVariant((v) => ({ ...v, in_order_qty: parseInt(e.target.value, 10) || 0 }))
-              }
-            />
-          </div>
           <div className="modal-actions">
             <button
               type="button"
               className="btn btn-secondary"
               onClick={() => {
                 setShowVariantModal(false)
-                setNewVariant({ option_name: '', option_value: '', stock_qty: 0, in_order_qty: 0 })
+                setNewVariant({ option_name: '', option_value: '', stock_qty: 0 })
               }}
             >
               Отмена
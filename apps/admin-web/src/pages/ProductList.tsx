@@ -11,7 +11,9 @@ import {
   listManufacturers,
   getStats,
   deleteProduct,
+  getProduct,
   type ProductListItem,
+  type ProductVariantItem,
   type StatsResponse,
   type SortField,
   type SortOrder,
@@ -44,6 +46,8 @@ export function ProductList() {
     sort_order: 'asc' as SortOrder,
   })
   const [expandedIds, setExpandedIds] = useState<Set<string>>(new Set())
+  // Варианты подгружаются при первом раскрытии строки
+  const [variantsById, setVariantsById] = useState<Record<string, ProductVariantItem[]>>({})
   const [deletingId, setDeletingId] = useState<string | null>(null)
 
   const loadData = useCallback(async () => {
@@ -66,6 +70,7 @@ export function ProductList() {
         listManufacturers(),
       ])
       setData(productsRes)
+      setVariantsById({})
       setStats(statsRes)
       setCategories(catsRes.map((c) => ({ id: c.id, name: c.name })))
       setManufacturers(mfrsRes)
@@ -103,6 +108,11 @@ export function ProductList() {
       else next.add(id)
       return next
     })
+    if (!variantsById[id]) {
+      getProduct(id)
+        .then((p) => setVariantsById((prev) => ({ ...prev, [id]: p.variants as ProductVariantItem[] })))
+        .catch((e) => setError(e instanceof Error ? e.message : 'Ошибка загрузки вариантов'))
+    }
   }
 
   const handleDelete = async (id: string) => {
@@ -275,11 +285,11 @@ export function ProductList() {
                 <tr
                   key={p.id}
                   className={expandedIds.has(p.id) ? 'expanded' : ''}
-                  onClick={() => p.variants.length > 0 && toggleExpand(p.id)}
-                  style={p.variants.length > 0 ? { cursor: 'pointer' } : undefined}
+                  onClick={() => p.variants_count > 0 && toggleExpand(p.id)}
+                  style={p.variants_count > 0 ? { cursor: 'pointer' } : undefined}
                 >
                   <td>
-                    {p.variants.length > 0 && (
+                    {p.variants_count > 0 && (
                       <span className="expand-icon">{expandedIds.has(p.id) ? '▼' : '▶'}</span>
                     )}
                   </td>
@@ -320,31 +330,37 @@ export function ProductList() {
                     </button>
                   </td>
                 </tr>
-                {expandedIds.has(p.id) && p.variants.length > 0 && (
+                {expandedIds.has(p.id) && p.variants_count > 0 && (
                   <tr key={`${p.id}-variants`} className="variants-row">
                     <td colSpan={10}>
                       <div className="variants-panel">
-                        <strong>Варианты:</strong>
-                        <table className="variants-table">
-                          <thead>
-                            <tr>
-                              <th>Опция</th>
-                              <th>Значение</th>
-                              <th>В наличии</th>
-                              <th>В заказе</th>
-                            </tr>
-                          </thead>
-                          <tbody>
-                            {p.variants.map((v) => (
-                              <tr key={v.id}>
-                                <td>{v.option_name}</td>
-                                <td>{v.option_value}</td>
-                                <td>{v.stock_qty}</td>
-                                <td>{v.in_order_qty}</td>
+                        <strong>
+                          Варианты: {p.variants_count}, в наличии {p.stock_qty_total}, в заказе {p.in_order_qty_total}
+                        </strong>
+                        {!variantsById[p.id] ? (
+                          <div>Загрузка…</div>
+                        ) : (
+                          <table className="variants-table">
+                            <thead>
+                              <tr>
+                                <th>Опция</th>
+                                <th>Значение</th>
+                                <th>В наличии</th>
+                                <th>В заказе</th>
                               </tr>
-                            ))}
-                          </tbody>
-                        </table>
+                            </thead>
+                            <tbody>
+                              {variantsById[p.id].map((v) => (
+                                <tr key={v.id}>
+                                  <td>{v.option_name}</td>
+                                  <td>{v.option_value}</td>
+                                  <td>{v.stock_qty}</td>
+                                  <td>{v.in_order_qty}</td>
+                                </tr>
+                              ))}
+                            </tbody>
+                          </table>
+                        )}
                       </div>
                     </td>
                   </tr>
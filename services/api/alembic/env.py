@@ -9,7 +9,7 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 from app.config import get_settings
 from app.db import Base
-from app.models import Product, ProductCategory, ProductImage, ProductAttachment, ProductSpec, ProductVariant  # noqa: F401 — для autogenerate
+from app.models import Product, ProductCategory, ProductImage, ProductAttachment, ProductSpec, ProductVariant, ProductViewDaily, AppSetting, StockReservation  # noqa: F401 — для autogenerate
 
 config = context.config
 if config.config_file_name is not None:
@@ -0,0 +1,49 @@
+"""add product view daily
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _month_start(d: date, shift: int = 0) -> date:
+    m = d.year * 12 + d.month - 1 + shift
+    return date(m // 12, m % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    # Дневные просмотры, секционирование по месяцам; последующие секции создаёт rollup-задача API
+    op.execute(
+        """
+        CREATE TABLE product_view_daily (
+            product_id UUID NOT NULL REFERENCES products (id) ON DELETE CASCADE,
+            day DATE NOT NULL,
+            views INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (product_id, day)
+        ) PARTITION BY RANGE (day)
+        """
+    )
+    op.execute("CREATE TABLE product_view_daily_default PARTITION OF product_view_daily DEFAULT")
+    # Партиции ведутся по дате UTC (как в app/services/view_stats.py)
+    today = datetime.now(timezone.utc).date()
+    for shift in range(0, 3):
+        start, end = _month_start(today, shift), _month_start(today, shift + 1)
+        op.execute(
+            f"CREATE TABLE product_view_daily_y{start.year}m{start.month:02d} PARTITION OF product_view_daily "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    op.execute("CREATE INDEX ix_product_view_daily_day ON product_view_daily (day)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE product_view_daily CASCADE")
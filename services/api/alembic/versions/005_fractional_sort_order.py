@@ -0,0 +1,43 @@
+"""fractional sort order
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = (
+    "products",
+    "product_categories",
+    "product_images",
+    "product_attachments",
+    "product_specs",
+    "product_variants",
+)
+
+
+def upgrade() -> None:
+    # Дробные ключи порядка: перемещение элемента меняет одну строку (середина между соседями)
+    for table in TABLES:
+        op.alter_column(table, "sort_order", type_=sa.Float(), existing_type=sa.Integer(), existing_nullable=False)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.alter_column(
+            table,
+            "sort_order",
+            type_=sa.Integer(),
+            existing_type=sa.Float(),
+            existing_nullable=False,
+            postgresql_using="round(sort_order)::integer",
+        )
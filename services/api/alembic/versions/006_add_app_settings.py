@@ -0,0 +1,34 @@
+"""add app settings
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Настройки из админки; отсутствующий ключ — значение из .env
+    op.execute("CREATE SEQUENCE app_settings_version_seq")
+    op.create_table(
+        "app_settings",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("value", postgresql.JSONB(), nullable=True),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("app_settings")
+    op.execute("DROP SEQUENCE app_settings_version_seq")
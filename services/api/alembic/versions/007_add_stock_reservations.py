@@ -0,0 +1,43 @@
+"""add stock reservations
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stock_reservations",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("idempotency_key", sa.String(128), nullable=False, unique=True),
+        sa.Column("variant_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("product_variants.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("qty", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.CheckConstraint("qty > 0", name="ck_stock_reservations_qty_positive"),
+    )
+    op.create_index(
+        "ix_stock_reservations_held_expires",
+        "stock_reservations",
+        ["expires_at"],
+        postgresql_where=sa.text("status = 'held'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_stock_reservations_held_expires", table_name="stock_reservations")
+    op.drop_table("stock_reservations")
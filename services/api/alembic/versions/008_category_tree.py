@@ -0,0 +1,187 @@
+"""category tree: materialized path and product counts
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("product_categories", sa.Column("path", sa.Text(), server_default="", nullable=False))
+    op.add_column("product_categories", sa.Column("products_total", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("product_categories", sa.Column("products_published", sa.Integer(), server_default="0", nullable=False))
+
+    # Путь категории: путь родителя + собственный id; перенос ветки переписывает пути потомков
+    op.execute(
+        """
+        CREATE FUNCTION product_categories_set_path() RETURNS trigger AS $$
+        DECLARE
+            parent_path text;
+        BEGIN
+            IF NEW.parent_id IS NULL THEN
+                NEW.path := replace(NEW.id::text, '-', '') || '/';
+            ELSE
+                SELECT path INTO parent_path FROM product_categories WHERE id = NEW.parent_id;
+                IF parent_path IS NULL THEN
+                    RAISE EXCEPTION 'parent category % not found', NEW.parent_id USING ERRCODE = 'foreign_key_violation';
+                END IF;
+                IF TG_OP = 'UPDATE' AND parent_path LIKE OLD.path || '%' THEN
+                    RAISE EXCEPTION 'category % cannot be moved into its own subtree', NEW.id USING ERRCODE = 'check_violation';
+                END IF;
+                NEW.path := parent_path || replace(NEW.id::text, '-', '') || '/';
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION product_categories_move_subtree() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.path IS DISTINCT FROM OLD.path THEN
+                UPDATE product_categories
+                SET path = NEW.path || substr(path, length(OLD.path) + 1)
+                WHERE path LIKE OLD.path || '%' AND id <> NEW.id;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER product_categories_set_path
+        BEFORE INSERT OR UPDATE OF parent_id ON product_categories
+        FOR EACH ROW EXECUTE FUNCTION product_categories_set_path()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER product_categories_move_subtree
+        AFTER UPDATE OF parent_id ON product_categories
+        FOR EACH ROW EXECUTE FUNCTION product_categories_move_subtree()
+        """
+    )
+    # Существующие категории: пути от корней вниз
+    op.execute(
+        """
+        WITH RECURSIVE t AS (
+            SELECT id, replace(id::text, '-', '') || '/' AS path
+            FROM product_categories WHERE parent_id IS NULL
+            UNION ALL
+            SELECT c.id, t.path || replace(c.id::text, '-', '') || '/'
+            FROM product_categories c JOIN t ON c.parent_id = t.id
+        )
+        UPDATE product_categories c SET path = t.path FROM t WHERE c.id = t.id
+        """
+    )
+    op.create_index(
+        "ix_product_categories_path",
+        "product_categories",
+        ["path"],
+        postgresql_ops={"path": "text_pattern_ops"},
+    )
+
+    # Счётчики товаров: триггеры уровня оператора с таблицами переходов —
+    # массовые операции, импорт и клонирование обновляют каждую категорию один раз за запрос
+    op.execute(
+        """
+        CREATE FUNCTION products_category_counts() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE product_categories c
+                SET products_total = c.products_total + d.total,
+                    products_published = c.products_published + d.published
+                FROM (
+                    SELECT category_id, count(*) AS total, count(*) FILTER (WHERE is_published) AS published
+                    FROM new_rows WHERE category_id IS NOT NULL GROUP BY category_id
+                ) d
+                WHERE c.id = d.category_id;
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE product_categories c
+                SET products_total = c.products_total - d.total,
+                    products_published = c.products_published - d.published
+                FROM (
+                    SELECT category_id, count(*) AS total, count(*) FILTER (WHERE is_published) AS published
+                    FROM old_rows WHERE category_id IS NOT NULL GROUP BY category_id
+                ) d
+                WHERE c.id = d.category_id;
+            ELSE
+                UPDATE product_categories c
+                SET products_total = c.products_total + d.total,
+                    products_published = c.products_published + d.published
+                FROM (
+                    SELECT category_id, sum(total) AS total, sum(published) AS published
+                    FROM (
+                        SELECT category_id, 1 AS total, is_published::int AS published FROM new_rows
+                        UNION ALL
+                        SELECT category_id, -1, -(is_published::int) FROM old_rows
+                    ) x
+                    WHERE category_id IS NOT NULL
+                    GROUP BY category_id
+                    HAVING sum(total) <> 0 OR sum(published) <> 0
+                ) d
+                WHERE c.id = d.category_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER products_category_counts_ins AFTER INSERT ON products
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION products_category_counts()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER products_category_counts_upd AFTER UPDATE ON products
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION products_category_counts()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER products_category_counts_del AFTER DELETE ON products
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION products_category_counts()
+        """
+    )
+    op.execute(
+        """
+        UPDATE product_categories c
+        SET products_total = d.total, products_published = d.published
+        FROM (
+            SELECT category_id, count(*) AS total, count(*) FILTER (WHERE is_published) AS published
+            FROM products WHERE category_id IS NOT NULL GROUP BY category_id
+        ) d
+        WHERE c.id = d.category_id
+        """
+    )
+
+
+def downgrade() -> None:
+    for name in ("products_category_counts_ins", "products_category_counts_upd", "products_category_counts_del"):
+        op.execute(f"DROP TRIGGER {name} ON products")
+    op.execute("DROP FUNCTION products_category_counts()")
+    op.execute("DROP TRIGGER product_categories_move_subtree ON product_categories")
+    op.execute("DROP TRIGGER product_categories_set_path ON product_categories")
+    op.execute("DROP FUNCTION product_categories_move_subtree()")
+    op.execute("DROP FUNCTION product_categories_set_path()")
+    op.drop_index("ix_product_categories_path", table_name="product_categories")
+    op.drop_column("product_categories", "products_published")
+    op.drop_column("product_categories", "products_total")
+    op.drop_column("product_categories", "path")
@@ -0,0 +1,99 @@
+"""catalog stats: maintained product counters
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Одна строка (id = 1) со счётчиками каталога для GET /api/admin/stats
+    op.create_table(
+        "catalog_stats",
+        sa.Column("id", sa.SmallInteger(), primary_key=True),
+        sa.Column("total_products", sa.BigInteger(), server_default="0", nullable=False),
+        sa.Column("published_count", sa.BigInteger(), server_default="0", nullable=False),
+        sa.Column("total_views", sa.BigInteger(), server_default="0", nullable=False),
+        sa.CheckConstraint("id = 1", name="ck_catalog_stats_single_row"),
+    )
+
+    # Триггеры уровня оператора с таблицами переходов (как products_category_counts):
+    # массовая операция или сброс просмотров обновляет строку счётчиков один раз за запрос,
+    # запросы, не меняющие счётчики (правка описания, цены), её не трогают
+    op.execute(
+        """
+        CREATE FUNCTION products_catalog_stats() RETURNS trigger AS $$
+        DECLARE
+            d_total bigint := 0;
+            d_published bigint := 0;
+            d_views bigint := 0;
+        BEGIN
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                SELECT d_total + count(*), d_published + count(*) FILTER (WHERE is_published),
+                       d_views + coalesce(sum(view_count), 0)
+                INTO d_total, d_published, d_views
+                FROM new_rows;
+            END IF;
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                SELECT d_total - count(*), d_published - count(*) FILTER (WHERE is_published),
+                       d_views - coalesce(sum(view_count), 0)
+                INTO d_total, d_published, d_views
+                FROM old_rows;
+            END IF;
+            IF d_total <> 0 OR d_published <> 0 OR d_views <> 0 THEN
+                UPDATE catalog_stats
+                SET total_products = total_products + d_total,
+                    published_count = published_count + d_published,
+                    total_views = total_views + d_views
+                WHERE id = 1;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER products_catalog_stats_ins AFTER INSERT ON products
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION products_catalog_stats()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER products_catalog_stats_upd AFTER UPDATE ON products
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION products_catalog_stats()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER products_catalog_stats_del AFTER DELETE ON products
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION products_catalog_stats()
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO catalog_stats (id, total_products, published_count, total_views)
+        SELECT 1, count(*), count(*) FILTER (WHERE is_published), coalesce(sum(view_count), 0)
+        FROM products
+        """
+    )
+
+
+def downgrade() -> None:
+    for name in ("products_catalog_stats_ins", "products_catalog_stats_upd", "products_catalog_stats_del"):
+        op.execute(f"DROP TRIGGER {name} ON products")
+    op.execute("DROP FUNCTION products_catalog_stats()")
+    op.drop_table("catalog_stats")
@@ -3,11 +3,13 @@
 """
 from fastapi import APIRouter
 
-from app.api import admin, files, miniapp, products
+from app.api import admin, categories, files, miniapp, products, reservations
 
 router = APIRouter()
 router.include_router(products.router, prefix="/products", tags=["products"])
+router.include_router(categories.router, prefix="/categories", tags=["categories"])
 router.include_router(files.router, prefix="/files", tags=["files"])
 router.include_router(miniapp.router, prefix="/miniapp", tags=["miniapp"])
 router.include_router(admin.router_public, prefix="/admin", tags=["admin"])
 router.include_router(admin.router, prefix="/admin", tags=["admin"])
+router.include_router(reservations.router, prefix="/reservations", tags=["reservations"])
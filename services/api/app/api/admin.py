@@ -1,24 +1,38 @@
 """
 Админ API — CRUD товаров, загрузка файлов.
 """
+import asyncio
 import io
 import logging
-import re
 import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
 from pathlib import Path
+from typing import Literal
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
-from sqlalchemy import func, or_, select
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, func, insert, or_, select, true, union_all, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 import passlib.exc
 
-from app.api.admin_auth import create_access_token, require_admin, verify_password
+from app.api.admin_auth import PasswordCheckBusy, create_access_token, require_admin, verify_password_async
 from app.config import get_settings
-from app.db import get_db
-from app.models.product import Product, ProductAttachment, ProductCategory, ProductImage, ProductSpec, ProductVariant
+from app.db import get_db, get_readonly_db, pool_status, read_replicas
+from app.models.product import (
+    SYSTEM_PRODUCT_SLUG,
+    CatalogStats,
+    Product,
+    ProductAttachment,
+    ProductCategory,
+    ProductImage,
+    ProductSpec,
+    ProductVariant,
+    ProductViewDaily,
+)
 from app.limiter import limiter
 from app.schemas.admin import (
     CategoryCreate,
@@ -26,15 +40,31 @@ from app.schemas.admin import (
     ImageSortUpdate,
     LoginRequest,
     LoginResponse,
+    MoveRequest,
+    ProductBulkAction,
     ProductCreate,
+    ProductFilter,
+    ProductImportResult,
     ProductUpdate,
+    ReorderRequest,
     SettingsResponse,
     SettingsUpdate,
     SpecCreate,
+    SpecItem,
     SpecUpdate,
     VariantCreate,
+    VariantItem,
     VariantUpdate,
 )
+from app.repositories.category import category_tree, subtree_ids
+from app.services.image_info import probe_image
+from app.services.ordering import PRODUCT_COLLECTIONS, OrderingError, apply_order, move_item
+from app.services.product_clone import CloneConflict, CloneError, clone_product
+from app.services.product_collections import CollectionReplaceError, ProductNotFoundError, replace_collection
+from app.services.product_export import EXPORT_FORMATS, export_products
+from app.services.product_import import ImportFormatError, import_products
+from app.services.runtime_settings import runtime_settings, save_settings
+from app.services.stock import products_with_holds, variants_with_holds
 from app.storage.local import get_storage
 
 # Роутер для логина (без JWT)
@@ -48,13 +78,16 @@ settings = get_settings()
 ALLOWED_IMAGE = {"image/jpeg", "image/png", "image/webp"}
 ALLOWED_ATTACHMENT = {"application/pdf", "application/zip", "application/x-rar-compressed"}
 MAX_FILE_MB = 50
+# Пакетная загрузка фото: файлов за запрос и одновременных записей в хранилище
+MAX_BATCH_FILES = 50
+UPLOAD_CONCURRENCY = 4
 
 
-def _check_password(password: str) -> bool:
-    """Проверка пароля админа."""
+async def _check_password(password: str) -> bool:
+    """Проверка пароля админа (bcrypt — в отдельном пуле потоков)."""
     if settings.admin_password_hash and settings.admin_password_hash.startswith(("$2a$", "$2b$")):
         try:
-            return verify_password(password, settings.admin_password_hash)
+            return await verify_password_async(password, settings.admin_password_hash)
         except passlib.exc.UnknownHashError:
             logging.getLogger(__name__).warning("ADMIN_PASSWORD_HASH invalid, falling back to ADMIN_PASSWORD")
     if settings.admin_password:
@@ -62,12 +95,22 @@ def _check_password(password: str) -> bool:
     return False
 
 
-def _slugify(s: str) -> str:
-    """Преобразование в slug."""
-    s = s.lower().strip()
-    s = re.sub(r"[^\w\s-]", "", s)
-    s = re.sub(r"[-\s]+", "-", s)
-    return s[:255]
+def _product_filters(f: ProductFilter) -> list:
+    """Условия WHERE для фильтра товаров (список и массовые операции)."""
+    filters = []
+    if f.search:
+        search_pattern = f"%{f.search}%"
+        filters.append(or_(Product.title.ilike(search_pattern), Product.sku.ilike(search_pattern)))
+    if f.category_id is not None:
+        if f.include_subcategories:
+            filters.append(Product.category_id.in_(subtree_ids(category_id=f.category_id)))
+        else:
+            filters.append(Product.category_id == f.category_id)
+    if f.is_published is not None:
+        filters.append(Product.is_published == f.is_published)
+    if f.manufacturer:
+        filters.append(Product.manufacturer == f.manufacturer)
+    return filters
 
 
 # --- Login (без JWT, rate-limit: 5 попыток в минуту) ---
@@ -78,12 +121,14 @@ async def login(request: Request, data: LoginRequest):
     try:
         if data.login != settings.admin_login:
             raise HTTPException(status_code=401, detail="Invalid login or password")
-        if not _check_password(data.password):
+        if not await _check_password(data.password):
             raise HTTPException(status_code=401, detail="Invalid login or password")
         token = create_access_token(data.login)
         return LoginResponse(access_token=token)
     except HTTPException:
         raise
+    except PasswordCheckBusy:
+        raise HTTPException(status_code=503, detail="Too many login attempts, try again later", headers={"Retry-After": "5"})
     except Exception:
         logging.getLogger(__name__).exception("Login error")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -92,9 +137,10 @@ async def login(request: Request, data: LoginRequest):
 # --- Products CRUD ---
 @router.get("/products")
 async def admin_list_products(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_readonly_db),
     search: str | None = None,
     category_id: UUID | None = None,
+    include_subcategories: bool = False,
     is_published: bool | None = None,
     manufacturer: str | None = None,
     page: int = 1,
@@ -103,25 +149,15 @@ async def admin_list_products(
     sort_order: str = "asc",
 ):
     """Список товаров с фильтрами, сортировкой и пагинацией."""
-    filters = []
-    if search:
-        search_pattern = f"%{search}%"
-        filters.append(or_(Product.title.ilike(search_pattern), Product.sku.ilike(search_pattern)))
-    if category_id is not None:
-        filters.append(Product.category_id == category_id)
-    if is_published is not None:
-        filters.append(Product.is_published == is_published)
-    if manufacturer:
-        filters.append(Product.manufacturer == manufacturer)
-
-    base_stmt = select(Product)
-    if filters:
-        base_stmt = base_stmt.where(*filters)
-
-    count_stmt = select(func.count()).select_from(Product)
-    if filters:
-        count_stmt = count_stmt.where(*filters)
-    total = (await db.execute(count_stmt)).scalar() or 0
+    filters = _product_filters(
+        ProductFilter(
+            search=search,
+            category_id=category_id,
+            include_subcategories=include_subcategories,
+            is_published=is_published,
+            manufacturer=manufacturer,
+        )
+    )
 
     # Маппинг полей сортировки
     sort_columns = {
@@ -143,40 +179,89 @@ async def admin_list_products(
     else:
         order_clause = sort_column.asc().nulls_last()
 
-    stmt = (
-        base_stmt
-        .options(selectinload(Product.images), selectinload(Product.category), selectinload(Product.variants))
+    # Страница товаров + total через COUNT(*) OVER () — без отдельного запроса подсчёта
+    page_q = (
+        select(
+            Product.id,
+            Product.slug,
+            Product.title,
+            Product.sku,
+            Product.manufacturer,
+            Product.category_id,
+            Product.price_amount,
+            Product.price_currency,
+            Product.is_published,
+            Product.sort_order,
+            Product.view_count,
+            func.count().over().label("total"),
+            func.row_number().over(order_by=(order_clause, Product.created_at.desc())).label("rn"),
+        )
+        .where(*filters)
         .order_by(order_clause, Product.created_at.desc())
         .offset((page - 1) * per_page)
         .limit(per_page)
+        .subquery()
     )
+    # Агрегаты считаются только для строк страницы
+    first_image = (
+        select(ProductImage.id)
+        .where(ProductImage.product_id == page_q.c.id)
+        .order_by(ProductImage.sort_order)
+        .limit(1)
+        .scalar_subquery()
+    )
+    variant_stats = (
+        select(
+            func.count().label("variants_count"),
+            func.coalesce(func.sum(ProductVariant.stock_qty), 0).label("stock_qty_total"),
+            func.coalesce(func.sum(ProductVariant.in_order_qty), 0).label("in_order_qty_total"),
+        )
+        .where(ProductVariant.product_id == page_q.c.id)
+        .lateral()
+    )
+    stmt = (
+        select(
+            page_q,
+            ProductCategory.name.label("category_name"),
+            first_image.label("image_id"),
+            variant_stats.c.variants_count,
+            variant_stats.c.stock_qty_total,
+            variant_stats.c.in_order_qty_total,
+        )
+        .outerjoin(ProductCategory, ProductCategory.id == page_q.c.category_id)
+        .outerjoin(variant_stats, true())
+        .order_by(page_q.c.rn)
+    )
+    rows = (await db.execute(stmt)).all()
 
-    result = await db.execute(stmt)
-    products = result.scalars().all()
-
-    def first_image_url(p):
-        imgs = sorted(p.images, key=lambda x: x.sort_order)
-        return f"/api/files/{imgs[0].id}" if imgs else None
+    if rows:
+        total = rows[0].total
+    else:
+        # Страница за пределами выборки — total отдельным запросом
+        total = (await db.execute(select(func.count()).select_from(Product).where(*filters))).scalar() or 0
 
     return {
         "items": [
             {
-                "id": str(p.id),
-                "slug": p.slug,
-                "title": p.title,
-                "sku": p.sku,
-                "manufacturer": p.manufacturer,
-                "category_id": str(p.category_id) if p.category_id else None,
-                "category_name": p.category.name if p.category else None,
-                "price_amount": float(p.price_amount) if p.price_amount else None,
-                "price_currency": p.price_currency,
-                "is_published": p.is_published,
-                "sort_order": p.sort_order,
-                "view_count": p.view_count,
-                "image_url": first_image_url(p),
-                "variants": [{"id": str(v.id), "option_name": v.option_name, "option_value": v.option_value, "stock_qty": v.stock_qty, "in_order_qty": v.in_order_qty} for v in sorted(p.variants, key=lambda x: x.sort_order)],
+                "id": str(r.id),
+                "slug": r.slug,
+                "title": r.title,
+                "sku": r.sku,
+                "manufacturer": r.manufacturer,
+                "category_id": str(r.category_id) if r.category_id else None,
+                "category_name": r.category_name,
+                "price_amount": float(r.price_amount) if r.price_amount else None,
+                "price_currency": r.price_currency,
+                "is_published": r.is_published,
+                "sort_order": r.sort_order,
+                "view_count": r.view_count,
+                "image_url": f"/api/files/{r.image_id}" if r.image_id else None,
+                # Сами варианты — в GET /products/{id}
+                "variants_count": r.variants_count,
+                "stock_qty_total": r.stock_qty_total,
+                "in_order_qty_total": r.in_order_qty_total,
             }
-            for p in products
+            for r in rows
         ],
         "total": total,
         "page": page,
@@ -210,10 +295,43 @@ async def admin_create_product(
     return {"id": str(product.id), "slug": product.slug}
 
 
+@router.post("/products/import", response_model=ProductImportResult)
+async def admin_import_products(
+    file: UploadFile = File(...),
+    dry_run: bool = Form(False),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Массовый импорт товаров из CSV/XLSX (upsert по slug/sku вместе с ТТХ, вариантами и категориями).
+    Файл читается потоково, каждая пачка коммитится отдельно; dry_run — только проверка строк.
+    """
+    try:
+        return await import_products(db, file.file, file.filename or "", dry_run=dry_run)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/products/export")
+async def admin_export_products(
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson|yml)$"),
+    is_published: bool | None = None,
+):
+    """
+    Потоковая выгрузка каталога: CSV (формат импорта), NDJSON или YML-фид.
+    Читается серверным курсором — память не растёт с размером каталога.
+    """
+    media_type, filename = EXPORT_FORMATS[fmt]
+    return StreamingResponse(
+        export_products(fmt, is_published),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get("/products/{product_id}")
 async def admin_get_product(
     product_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_readonly_db),
 ):
     """Получение товара для редактирования."""
     stmt = (
@@ -282,40 +400,251 @@ async def admin_delete_product(
     product_id: UUID,
     db: AsyncSession = Depends(get_db),
 ):
-    """Удаление товара (каскадно удаляет images, attachments, specs)."""
+    """Удаление товара (каскадно удаляет images, attachments, specs). 409 — есть активные резервы."""
     stmt = select(Product).where(Product.id == product_id)
     result = await db.execute(stmt)
     product = result.scalars().first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
+    if await products_with_holds(db, [product_id]):
+        raise HTTPException(status_code=409, detail="Product has held reservations")
     await db.delete(product)
     return {"deleted": str(product_id)}
 
 
+@router.post("/products/{product_id}/clone")
+async def admin_clone_product(
+    product_id: UUID,
+    db: AsyncSession = Depends(get_db),
+):
+    """Копия товара со всеми ТТХ, вариантами, фото и файлами (снята с публикации)."""
+    try:
+        return await clone_product(db, product_id)
+    except CloneError:
+        raise HTTPException(status_code=404, detail="Product not found")
+    except CloneConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/products/bulk")
+async def admin_bulk_products(
+    data: ProductBulkAction,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Массовая операция над товарами по списку ids или по фильтру списка.
+    Выполняется одним UPDATE/DELETE в одной транзакции, возвращает число затронутых товаров.
+    """
+    if (data.ids is None) == (data.filter is None):
+        raise HTTPException(status_code=400, detail="Specify either ids or filter")
+    if data.ids is not None:
+        criteria = [Product.id.in_(data.ids)]
+    else:
+        criteria = _product_filters(data.filter)
+        if not criteria:
+            # Пустой фильтр совпал бы со всем каталогом
+            raise HTTPException(status_code=400, detail="Filter must have at least one condition")
+    criteria.append(Product.slug != SYSTEM_PRODUCT_SLUG)
+
+    if data.operation == "delete":
+        # Пути файлов — до удаления строк (images/attachments удалятся каскадно в БД)
+        target_ids = select(Product.id).where(*criteria)
+        paths_stmt = union_all(
+            select(ProductImage.file_path).where(ProductImage.product_id.in_(target_ids)),
+            select(ProductAttachment.file_path).where(ProductAttachment.product_id.in_(target_ids)),
+        )
+        held = await products_with_holds(db, target_ids)
+        if held:
+            # Резервы удалились бы каскадом — покупатель получил бы 404 при подтверждении
+            raise HTTPException(status_code=409, detail=f"{len(held)} product(s) have held reservations")
+        file_paths = (await db.execute(paths_stmt)).scalars().all()
+        result = await db.execute(delete(Product).where(*criteria).execution_options(synchronize_session=False))
+        # Файлы удаляем только после фиксации: при ошибке коммита строки остаются вместе с файлами
+        await db.commit()
+        storage = get_storage()
+        for path in file_paths:
+            await storage.delete(path)
+        return {"operation": data.operation, "affected": result.rowcount, "files_deleted": len(file_paths)}
+
+    if data.operation in ("publish", "unpublish"):
+        values = {"is_published": data.operation == "publish"}
+    elif data.operation == "reprice":
+        if (data.price_amount is None) == (data.price_percent is None):
+            raise HTTPException(status_code=400, detail="Specify either price_amount or price_percent")
+        if data.price_amount is not None:
+            values = {"price_amount": data.price_amount}
+        else:
+            # Процент от нуля ничего не меняет; положительная цена не округляется до нуля
+            criteria.append(Product.price_amount > 0)
+            new_price = func.round(Product.price_amount * (1 + data.price_percent / 100), 2)
+            values = {"price_amount": func.greatest(new_price, Decimal("0.01"))}
+    else:  # recategorize
+        if "category_id" not in data.model_fields_set:
+            raise HTTPException(status_code=400, detail="category_id is required")
+        if data.category_id is not None:
+            exists = (await db.execute(select(ProductCategory.id).where(ProductCategory.id == data.category_id))).first()
+            if not exists:
+                raise HTTPException(status_code=404, detail="Category not found")
+        values = {"category_id": data.category_id}
+
+    stmt = update(Product).where(*criteria).values(**values).execution_options(synchronize_session=False)
+    result = await db.execute(stmt)
+    return {"operation": data.operation, "affected": result.rowcount}
+
+
+# --- Порядок (дробные sort_order) ---
+@router.post("/products/{product_id}/move")
+async def admin_move_product(product_id: UUID, data: MoveRequest, db: AsyncSession = Depends(get_db)):
+    """Переместить товар в общем порядке (меняется одна строка)."""
+    try:
+        sort_order = await move_item(db, Product, product_id, data.after_id, [])
+    except OrderingError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"id": str(product_id), "sort_order": sort_order}
+
+
+@router.post("/categories/{category_id}/move")
+async def admin_move_category(category_id: UUID, data: MoveRequest, db: AsyncSession = Depends(get_db)):
+    """Переместить категорию (меняется одна строка)."""
+    try:
+        sort_order = await move_item(db, ProductCategory, category_id, data.after_id, [])
+    except OrderingError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"id": str(category_id), "sort_order": sort_order}
+
+
+@router.post("/products/{product_id}/{collection}/{item_id}/move")
+async def admin_move_product_item(
+    product_id: UUID,
+    collection: Literal["images", "attachments", "specs", "variants"],
+    item_id: UUID,
+    data: MoveRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """Переместить фото, файл, ТТХ или вариант внутри товара (меняется одна строка)."""
+    model = PRODUCT_COLLECTIONS[collection]
+    try:
+        sort_order = await move_item(db, model, item_id, data.after_id, [model.product_id == product_id])
+    except OrderingError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"id": str(item_id), "sort_order": sort_order}
+
+
+@router.put("/products/{product_id}/{collection}/order")
+async def admin_reorder_product_items(
+    product_id: UUID,
+    collection: Literal["images", "attachments", "specs", "variants"],
+    data: ReorderRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """Задать порядок всей коллекции товара одним запросом (ids[i] -> sort_order = i)."""
+    model = PRODUCT_COLLECTIONS[collection]
+    try:
+        updated = await apply_order(db, model, data.ids, [model.product_id == product_id])
+    except OrderingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"updated": updated}
+
+
 # --- Statistics ---
 @router.get("/stats")
-async def admin_stats(db: AsyncSession = Depends(get_db)):
-    """Статистика: всего товаров, опубликовано, просмотры."""
-    from sqlalchemy import func
+async def admin_stats(db: AsyncSession = Depends(get_readonly_db)):
+    """Статистика: всего товаров, опубликовано, просмотры (строка счётчиков catalog_stats, без обхода products)."""
+    stats = (await db.execute(select(CatalogStats).where(CatalogStats.id == 1))).scalars().first()
+    if stats is None:
+        return {"total_products": 0, "published_count": 0, "total_views": 0}
+    return {
+        "total_products": stats.total_products,
+        "published_count": stats.published_count,
+        "total_views": stats.total_views,
+    }
 
-    total_stmt = select(func.count()).select_from(Product)
-    published_stmt = select(func.count()).select_from(Product).where(Product.is_published == True)
-    views_stmt = select(func.coalesce(func.sum(Product.view_count), 0)).select_from(Product)
 
-    total = (await db.execute(total_stmt)).scalar() or 0
-    published = (await db.execute(published_stmt)).scalar() or 0
-    total_views = (await db.execute(views_stmt)).scalar() or 0
-    return {"total_products": total, "published_count": published, "total_views": int(total_views)}
+@router.get("/stats/db-pool")
+async def admin_stats_db_pool():
+    """Пул соединений этого воркера: занято, overflow, ожидание выдачи соединения; состояние реплик."""
+    return {**pool_status(), "replicas": read_replicas.status()}
+
+
+@router.get("/stats/timeseries")
+async def admin_stats_timeseries(
+    db: AsyncSession = Depends(get_readonly_db),
+    days: int = Query(90, ge=1, le=366),
+    product_id: UUID | None = None,
+    limit: int = Query(20, ge=1, le=500),
+):
+    """
+    Просмотры по дням за последние `days` дней из дневных агрегатов.
+    Без product_id — общий ряд и ряды топ-`limit` товаров по просмотрам за период.
+    """
+    date_to = datetime.now(timezone.utc).date()
+    date_from = date_to - timedelta(days=days - 1)
+    period = [ProductViewDaily.day >= date_from, ProductViewDaily.day <= date_to]
+
+    if product_id is not None:
+        product_ids = [product_id]
+    else:
+        top_stmt = (
+            select(ProductViewDaily.product_id)
+            .where(*period)
+            .group_by(ProductViewDaily.product_id)
+            .order_by(func.sum(ProductViewDaily.views).desc())
+            .limit(limit)
+        )
+        product_ids = list((await db.execute(top_stmt)).scalars().all())
+
+    totals_stmt = select(ProductViewDaily.day, func.sum(ProductViewDaily.views)).where(*period)
+    if product_id is not None:
+        totals_stmt = totals_stmt.where(ProductViewDaily.product_id == product_id)
+    totals_stmt = totals_stmt.group_by(ProductViewDaily.day).order_by(ProductViewDaily.day)
+    totals = (await db.execute(totals_stmt)).all()
+
+    series: dict[UUID, dict] = {}
+    if product_ids:
+        series_stmt = (
+            select(ProductViewDaily.product_id, Product.title, ProductViewDaily.day, ProductViewDaily.views)
+            .join(Product, Product.id == ProductViewDaily.product_id)
+            .where(*period, ProductViewDaily.product_id.in_(product_ids))
+            .order_by(ProductViewDaily.day)
+        )
+        for pid, title, day, views in (await db.execute(series_stmt)).all():
+            item = series.setdefault(pid, {"product_id": str(pid), "title": title, "total": 0, "points": []})
+            item["total"] += views
+            item["points"].append({"day": day.isoformat(), "views": views})
+
+    return {
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "totals": [{"day": day.isoformat(), "views": int(views)} for day, views in totals],
+        "products": [series[pid] for pid in product_ids if pid in series],
+    }
 
 
 # --- Categories ---
 @router.get("/categories")
-async def admin_list_categories(db: AsyncSession = Depends(get_db)):
+async def admin_list_categories(db: AsyncSession = Depends(get_readonly_db)):
     """Список категорий."""
     stmt = select(ProductCategory).order_by(ProductCategory.sort_order, ProductCategory.name)
     result = await db.execute(stmt)
     categories = result.scalars().all()
-    return [{"id": str(c.id), "name": c.name, "slug": c.slug, "sort_order": c.sort_order, "parent_id": str(c.parent_id) if c.parent_id else None} for c in categories]
+    return [
+        {
+            "id": str(c.id),
+            "name": c.name,
+            "slug": c.slug,
+            "sort_order": c.sort_order,
+            "parent_id": str(c.parent_id) if c.parent_id else None,
+            "products_total": c.products_total,
+            "products_published": c.products_published,
+        }
+        for c in categories
+    ]
+
+
+@router.get("/categories/tree")
+async def admin_category_tree(db: AsyncSession = Depends(get_readonly_db)):
+    """Дерево категорий с числом всех товаров (включая неопубликованные)."""
+    return await category_tree(db, published_only=False)
 
 
 @router.post("/categories")
@@ -346,6 +675,13 @@ async def admin_update_category(
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     updates = data.model_dump(exclude_unset=True)
+    if updates.get("parent_id") is not None:
+        # Перенос в собственную ветку создал бы цикл (триггер БД тоже это запрещает)
+        parent_path = (await db.execute(select(ProductCategory.path).where(ProductCategory.id == updates["parent_id"]))).scalar()
+        if parent_path is None:
+            raise HTTPException(status_code=400, detail="Parent category not found")
+        if parent_path.startswith(category.path):
+            raise HTTPException(status_code=400, detail="Category cannot be moved into its own subtree")
     for k, v in updates.items():
         setattr(category, k, v)
     await db.flush()
@@ -366,7 +702,7 @@ async def admin_delete_category(category_id: UUID, db: AsyncSession = Depends(ge
 
 # --- Manufacturers (для фильтра) ---
 @router.get("/manufacturers")
-async def admin_list_manufacturers(db: AsyncSession = Depends(get_db)):
+async def admin_list_manufacturers(db: AsyncSession = Depends(get_readonly_db)):
     """Список уникальных производителей."""
     stmt = select(Product.manufacturer).where(Product.manufacturer.isnot(None)).distinct().order_by(Product.manufacturer)
     result = await db.execute(stmt)
@@ -374,6 +710,27 @@ async def admin_list_manufacturers(db: AsyncSession = Depends(get_db)):
 
 
 # --- Variants ---
+@router.put("/products/{product_id}/variants")
+async def admin_replace_variants(
+    product_id: UUID,
+    data: list[VariantItem],
+    db: AsyncSession = Depends(get_db),
+):
+    """Заменить все варианты товара: сервер сам вычисляет вставки, изменения и удаления."""
+    try:
+        return await replace_collection(
+            db,
+            ProductVariant,
+            product_id,
+            [v.model_dump() for v in data],
+            ("option_name", "option_value", "stock_qty", "sort_order"),
+        )
+    except ProductNotFoundError:
+        raise HTTPException(status_code=404, detail="Product not found")
+    except CollectionReplaceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/products/{product_id}/variants")
 async def admin_add_variant(
     product_id: UUID,
@@ -391,7 +748,6 @@ async def admin_add_variant(
         option_name=data.option_name,
         option_value=data.option_value,
         stock_qty=data.stock_qty,
-        in_order_qty=data.in_order_qty,
         sort_order=data.sort_order,
     )
     db.add(variant)
@@ -429,14 +785,17 @@ async def admin_delete_variant(
     db: AsyncSession = Depends(get_db),
 ):
     """Удаление варианта."""
+    # Блокировка строки: новый резерв ждёт удаления, а не проскакивает между проверкой и DELETE
     stmt = select(ProductVariant).where(
         ProductVariant.id == variant_id,
         ProductVariant.product_id == product_id,
-    )
+    ).with_for_update()
     result = await db.execute(stmt)
     variant = result.scalars().first()
     if not variant:
         raise HTTPException(status_code=404, detail="Variant not found")
+    if await variants_with_holds(db, [variant_id]):
+        raise HTTPException(status_code=409, detail="Variant has held reservations")
     await db.delete(variant)
     return {"deleted": str(variant_id)}
 
@@ -484,6 +843,76 @@ async def admin_upload_image(
     return {"id": str(img_id), "url": f"/api/files/{img_id}"}
 
 
+@router.post("/products/{product_id}/images/batch")
+async def admin_upload_images(
+    product_id: UUID,
+    files: list[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Загрузка нескольких изображений за один запрос.
+    Файлы проверяются и записываются в хранилище параллельно (не более UPLOAD_CONCURRENCY),
+    строки ProductImage вставляются одним INSERT. Возвращает результат по каждому файлу.
+    """
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"Max {MAX_BATCH_FILES} files per request")
+    product_exists = (await db.execute(select(Product.id).where(Product.id == product_id))).first()
+    if not product_exists:
+        raise HTTPException(status_code=404, detail="Product not found")
+    # Новые фото — в конец галереи, в порядке загрузки
+    stmt = select(func.coalesce(func.max(ProductImage.sort_order), -1)).where(ProductImage.product_id == product_id)
+    next_sort = (await db.execute(stmt)).scalar() + 1
+
+    storage = get_storage()
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+    async def process(index: int, file: UploadFile) -> dict:
+        result = {"filename": file.filename, "ok": False}
+        if file.content_type not in ALLOWED_IMAGE:
+            result["error"] = f"Allowed types: {ALLOWED_IMAGE}"
+            return result
+        if file.size is not None and file.size > MAX_FILE_MB * 1024 * 1024:
+            result["error"] = f"Max size {MAX_FILE_MB}MB"
+            return result
+        async with semaphore:
+            # Разбор заголовка — в пуле потоков (файл может лежать на диске)
+            info = await asyncio.to_thread(probe_image, file.file)
+            if info is None or info[0] != file.content_type:
+                result["error"] = "File content is not a valid image of the declared type"
+                return result
+            img_id = uuid.uuid4()
+            ext = Path(file.filename or "img").suffix or ".jpg"
+            rel_path = f"products/{product_id}/images/{img_id}{ext}"
+            await asyncio.to_thread(file.file.seek, 0)
+            size = await storage.save(rel_path, file.file, file.content_type)
+        _, width, height = info
+        result.update(ok=True, id=str(img_id), url=f"/api/files/{img_id}", width=width, height=height)
+        result["row"] = {
+            "id": img_id,
+            "product_id": product_id,
+            "file_path": rel_path,
+            "alt": None,
+            "sort_order": next_sort + index,
+            "width": width,
+            "height": height,
+            "mime": file.content_type,
+            "size_bytes": size,
+        }
+        return result
+
+    results = await asyncio.gather(*(process(i, f) for i, f in enumerate(files)))
+    rows = [r.pop("row") for r in results if r["ok"]]
+    if rows:
+        try:
+            await db.execute(insert(ProductImage), rows)
+        except Exception:
+            # Строки не записались — убираем уже сохранённые файлы
+            for row in rows:
+                await storage.delete(row["file_path"])
+            raise
+    return {"items": results, "uploaded": len(rows), "failed": len(results) - len(rows)}
+
+
 # --- Attachments ---
 @router.post("/products/{product_id}/attachments")
 async def admin_upload_attachment(
@@ -528,6 +957,27 @@ async def admin_upload_attachment(
 
 
 # --- Specs ---
+@router.put("/products/{product_id}/specs")
+async def admin_replace_specs(
+    product_id: UUID,
+    data: list[SpecItem],
+    db: AsyncSession = Depends(get_db),
+):
+    """Заменить все ТТХ товара: сервер сам вычисляет вставки, изменения и удаления."""
+    try:
+        return await replace_collection(
+            db,
+            ProductSpec,
+            product_id,
+            [sp.model_dump() for sp in data],
+            ("name", "value", "unit", "sort_order"),
+        )
+    except ProductNotFoundError:
+        raise HTTPException(status_code=404, detail="Product not found")
+    except CollectionReplaceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/products/{product_id}/specs")
 async def admin_add_spec(
     product_id: UUID,
@@ -657,7 +1107,7 @@ async def admin_upload_background_image(
         )
 
     # Удаляем старое изображение, если есть
-    s = get_settings()
+    s = runtime_settings.current()
     if s.miniapp_background_image and s.miniapp_background_image.startswith("/api/files/"):
         # Извлекаем UUID из пути /api/files/{uuid}
         try:
@@ -692,7 +1142,7 @@ async def admin_upload_background_image(
     
     # Создаём или находим системный продукт для фоновых изображений
     from app.models.product import Product
-    sys_product_slug = "__system_background__"
+    sys_product_slug = SYSTEM_PRODUCT_SLUG
     stmt = select(Product).where(Product.slug == sys_product_slug)
     result = await db.execute(stmt)
     sys_product = result.scalars().first()
@@ -720,53 +1170,15 @@ async def admin_upload_background_image(
     db.add(img)
     await db.flush()
 
-    # Обновляем настройку в .env
-    env_path = Path(".env")
-    if not env_path.exists():
-        current = Path(__file__).parent.parent.parent.parent
-        env_path = current / ".env"
-        if not env_path.exists():
-            env_path = current.parent / ".env"
-        if not env_path.exists():
-            raise HTTPException(status_code=500, detail=".env file not found")
-
-    env_lines = []
-    if env_path.exists():
-        with open(env_path, "r", encoding="utf-8") as f:
-            env_lines = f.readlines()
-
-    new_lines = []
-    updated = False
-    for line in env_lines:
-        stripped = line.strip()
-        if not stripped or stripped.startswith("#") or "=" not in stripped:
-            new_lines.append(line)
-            continue
-
-        parts = stripped.split("=", 1)
-        if len(parts) != 2:
-            new_lines.append(line)
-            continue
-
-        key = parts[0].strip().upper()
-        if key == "MINIAPP_BACKGROUND_IMAGE":
-            new_lines.append(f'MINIAPP_BACKGROUND_IMAGE="/api/files/{img_id}"\n')
-            updated = True
-        else:
-            new_lines.append(line)
-
-    if not updated:
-        new_lines.append(f'MINIAPP_BACKGROUND_IMAGE="/api/files/{img_id}"\n')
-
     try:
-        with open(env_path, "w", encoding="utf-8") as f:
-            f.writelines(new_lines)
-        get_settings.cache_clear()
+        await save_settings(db, {"miniapp_background_image": f"/api/files/{img_id}"})
         await db.commit()
     except Exception as e:
         await db.rollback()
-        logging.getLogger(__name__).exception("Failed to update .env file")
+        await storage.delete(rel_path)
+        logging.getLogger(__name__).exception("Failed to save background image setting")
         raise HTTPException(status_code=500, detail=f"Failed to update settings: {str(e)}")
+    await runtime_settings.refresh()
 
     return {"id": str(img_id), "url": f"/api/files/{img_id}"}
 
@@ -774,7 +1186,7 @@ async def admin_upload_background_image(
 @router.delete("/settings/background-image")
 async def admin_delete_background_image(db: AsyncSession = Depends(get_db)):
     """Удаление фонового изображения для мини-приложения."""
-    s = get_settings()
+    s = runtime_settings.current()
     if not s.miniapp_background_image or not s.miniapp_background_image.startswith("/api/files/"):
         raise HTTPException(status_code=404, detail="Background image not found")
 
@@ -790,56 +1202,19 @@ async def admin_delete_background_image(db: AsyncSession = Depends(get_db)):
             await db.delete(img)
             await db.flush()
 
-        # Очищаем настройку в .env
-        env_path = Path(".env")
-        if not env_path.exists():
-            current = Path(__file__).parent.parent.parent.parent
-            env_path = current / ".env"
-            if not env_path.exists():
-                env_path = current.parent / ".env"
-            if not env_path.exists():
-                raise HTTPException(status_code=500, detail=".env file not found")
-
-        env_lines = []
-        if env_path.exists():
-            with open(env_path, "r", encoding="utf-8") as f:
-                env_lines = f.readlines()
-
-        new_lines = []
-        for line in env_lines:
-            stripped = line.strip()
-            if not stripped or stripped.startswith("#") or "=" not in stripped:
-                new_lines.append(line)
-                continue
-
-            parts = stripped.split("=", 1)
-            if len(parts) != 2:
-                new_lines.append(line)
-                continue
-
-            key = parts[0].strip().upper()
-            if key == "MINIAPP_BACKGROUND_IMAGE":
-                new_lines.append('MINIAPP_BACKGROUND_IMAGE=""\n')
-            else:
-                new_lines.append(line)
-
-        with open(env_path, "w", encoding="utf-8") as f:
-            f.writelines(new_lines)
-        get_settings.cache_clear()
+        await save_settings(db, {"miniapp_background_image": ""})
         await db.commit()
     except Exception as e:
         await db.rollback()
         logging.getLogger(__name__).exception("Failed to delete background image")
         raise HTTPException(status_code=500, detail=f"Failed to delete background image: {str(e)}")
+    await runtime_settings.refresh()
 
     return {"deleted": True}
 
 
 # --- Settings ---
-@router.get("/settings", response_model=SettingsResponse)
-async def admin_get_settings():
-    """Получить текущие настройки."""
-    s = get_settings()
+def _settings_response(s) -> SettingsResponse:
     return SettingsResponse(
         contact_telegram_link=s.contact_telegram_link,
         storage_max_file_size_mb=s.storage_max_file_size_mb,
@@ -862,119 +1237,24 @@ async def admin_get_settings():
     )
 
 
+@router.get("/settings", response_model=SettingsResponse)
+async def admin_get_settings():
+    """Получить текущие настройки."""
+    return _settings_response(runtime_settings.current())
+
+
 @router.put("/settings", response_model=SettingsResponse)
-async def admin_update_settings(data: SettingsUpdate):
-    """Обновить безопасные настройки (сохраняет в .env файл)."""
-    import os
-    import shlex
-    from pathlib import Path
-
-    # Ищем .env в корне проекта (относительно services/api)
-    # В Docker контейнере рабочая директория обычно /app, .env должен быть в корне проекта
-    env_path = Path(".env")
-    # Если не найден, пробуем найти относительно корня проекта
-    if not env_path.exists():
-        # Пробуем найти .env в родительских директориях (для Docker)
-        current = Path(__file__).parent.parent.parent.parent  # services/api/app/api -> services/api
-        env_path = current / ".env"
-        if not env_path.exists():
-            # Пробуем корень проекта
-            env_path = current.parent / ".env"
-        if not env_path.exists():
-            raise HTTPException(status_code=500, detail=".env file not found")
-
-    # Читаем текущий .env
-    env_lines = []
-    if env_path.exists():
-        with open(env_path, "r", encoding="utf-8") as f:
-            env_lines = f.readlines()
-
-    # Обновляем значения
-    updates = data.model_dump(exclude_unset=True)
-    updated_keys = set()
-
-    new_lines = []
-    for line in env_lines:
-        stripped = line.strip()
-        # Сохраняем пустые строки и комментарии
-        if not stripped or stripped.startswith("#"):
-            new_lines.append(line)
-            continue
-
-        if "=" not in stripped:
-            new_lines.append(line)
-            continue
-
-        # Парсим ключ и значение (учитываем кавычки)
-        parts = stripped.split("=", 1)
-        if len(parts) != 2:
-            new_lines.append(line)
-            continue
-
-        key = parts[0].strip().upper()
-        original_value = parts[1].strip()
-
-        # Обновляем значение, если оно есть в updates
-        if key.lower() in updates:
-            value = updates[key.lower()]
-            # Форматируем значение
-            if isinstance(value, str):
-                # Если значение содержит пробелы или специальные символы, используем кавычки
-                if " " in value or "=" in value or "#" in value:
-                    # Экранируем кавычки внутри строки
-                    escaped_value = value.replace('\\', '\\\\').replace('"', '\\"')
-                    new_lines.append(f'{key}="{escaped_value}"\n')
-                else:
-                    new_lines.append(f"{key}={value}\n")
-            else:
-                new_lines.append(f"{key}={value}\n")
-            updated_keys.add(key.lower())
-        else:
-            # Сохраняем оригинальную строку
-            new_lines.append(line)
-
-    # Добавляем новые ключи, которых не было в .env
-    for key, value in updates.items():
-        if key not in updated_keys:
-            key_upper = key.upper()
-            if isinstance(value, str):
-                if " " in value or "=" in value or "#" in value:
-                    escaped_value = value.replace('\\', '\\\\').replace('"', '\\"')
-                    new_lines.append(f'{key_upper}="{escaped_value}"\n')
-                else:
-                    new_lines.append(f"{key_upper}={value}\n")
-            else:
-                new_lines.append(f"{key_upper}={value}\n")
-
-    # Сохраняем обновлённый .env
+async def admin_update_settings(data: SettingsUpdate, db: AsyncSession = Depends(get_db)):
+    """
+    Обновить безопасные настройки (таблица app_settings).
+    Остальные воркеры получают изменения через NOTIFY после коммита.
+    """
     try:
-        with open(env_path, "w", encoding="utf-8") as f:
-            f.writelines(new_lines)
-
-        # Перезагружаем настройки (сбрасываем кэш)
-        get_settings.cache_clear()
-        s = get_settings()
-
-        return SettingsResponse(
-            contact_telegram_link=s.contact_telegram_link,
-            storage_max_file_size_mb=s.storage_max_file_size_mb,
-            storage_allowed_image_types=s.storage_allowed_image_types,
-            storage_allowed_attachment_types=s.storage_allowed_attachment_types,
-            log_level=s.log_level,
-            log_max_bytes_mb=s.log_max_bytes_mb,
-            miniapp_section_title=s.miniapp_section_title,
-            miniapp_footer_text=s.miniapp_footer_text,
-            miniapp_background_color=s.miniapp_background_color,
-            miniapp_background_image=s.miniapp_background_image,
-            miniapp_text_color=s.miniapp_text_color,
-            miniapp_heading_color=s.miniapp_heading_color,
-            miniapp_price_color=s.miniapp_price_color,
-            miniapp_hint_color=s.miniapp_hint_color,
-            miniapp_card_bg_color=s.miniapp_card_bg_color,
-            api_port=s.api_port,
-            cors_origins=s.cors_origins,
-            storage_path=s.storage_path,
-        )
+        await save_settings(db, data.model_dump(exclude_unset=True))
+        await db.commit()
     except Exception as e:
-        logging.getLogger(__name__).exception("Failed to update .env file")
+        await db.rollback()
+        logging.getLogger(__name__).exception("Failed to update settings")
         raise HTTPException(status_code=500, detail=f"Failed to update settings: {str(e)}")
+    await runtime_settings.refresh()
+    return _settings_response(runtime_settings.current())
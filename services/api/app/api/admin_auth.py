@@ -1,6 +1,11 @@
 """
 JWT-зависимость и проверка пароля админа.
 """
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
 
@@ -10,14 +15,26 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from app.config import get_settings
+from app.metrics import cache_hit
+from app.tracing import span
 
 settings = get_settings()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 bearer = HTTPBearer(auto_error=False)
 
 
+# bcrypt — 100–300 мс CPU на вызов: только в отдельном пуле потоков (bcrypt отпускает GIL),
+# не больше password_hash_workers одновременно, ожидание очереди ограничено по времени
+_hash_pool = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt")
+_hash_slots = asyncio.Semaphore(settings.password_hash_workers)
+
+
+class PasswordCheckBusy(Exception):
+    """Очередь проверки паролей переполнена (ожидание дольше password_hash_queue_timeout_seconds)."""
+
+
 def verify_password(plain: str, hashed: str) -> bool:
-    """Проверка пароля против bcrypt hash."""
+    """Проверка пароля против bcrypt hash (синхронно — только вне event loop)."""
     return pwd_context.verify(plain, hashed)
 
 
@@ -26,6 +43,22 @@ def hash_password(plain: str) -> str:
     return pwd_context.hash(plain)
 
 
+async def _run_in_hash_pool(fn, *args):
+    try:
+        await asyncio.wait_for(_hash_slots.acquire(), timeout=settings.password_hash_queue_timeout_seconds)
+    except asyncio.TimeoutError:
+        raise PasswordCheckBusy("Password check queue is full")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+    finally:
+        _hash_slots.release()
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    """verify_password в пуле bcrypt, не блокируя event loop."""
+    return await _run_in_hash_pool(verify_password, plain, hashed)
+
+
 def create_access_token(subject: str) -> str:
     """Создание JWT токена."""
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.jwt_expire_minutes)
@@ -33,13 +66,43 @@ def create_access_token(subject: str) -> str:
     return jwt.encode(payload, settings.jwt_secret, algorithm=settings.jwt_algorithm)
 
 
+# Кэш проверенных токенов: sha256(token) -> (sub, exp). Запись живёт не дольше exp токена,
+# поэтому повторные запросы формы не проверяют подпись заново
+TOKEN_CACHE_SIZE = 256
+_token_cache: OrderedDict[bytes, tuple[str, float]] = OrderedDict()
+
+
+def clear_token_cache() -> None:
+    """Сбросить кэш проверенных токенов (например, после смены JWT_SECRET)."""
+    _token_cache.clear()
+
+
 def decode_token(token: str) -> str | None:
     """Декодирование JWT, возвращает sub (логин) или None."""
+    key = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+    with span("cache.jwt") as s:
+        cached = _token_cache.get(key)
+        hit = cached is not None and cached[1] > now
+        cache_hit("jwt", hit)
+        s.set("cache.hit", hit)
+    if hit:
+        _token_cache.move_to_end(key)
+        return cached[0]
+    if cached is not None:
+        del _token_cache[key]
     try:
         payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-        return payload.get("sub")
     except JWTError:
         return None
+    sub = payload.get("sub")
+    exp = payload.get("exp")
+    # Без exp токен не кэшируется: срок жизни записи нечем ограничить
+    if sub is not None and isinstance(exp, (int, float)) and exp > now:
+        _token_cache[key] = (sub, float(exp))
+        if len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return sub
 
 
 async def require_admin(
@@ -0,0 +1,19 @@
+"""
+API категорий — публичные эндпоинты для витрины.
+"""
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_read_db
+from app.repositories.category import category_tree
+
+router = APIRouter()
+
+
+@router.get("/tree")
+async def get_category_tree(db: AsyncSession = Depends(get_read_db)):
+    """
+    Дерево категорий с числом опубликованных товаров:
+    product_count — в категории, subtree_count — с учётом всех подкатегорий.
+    """
+    return await category_tree(db, published_only=True)
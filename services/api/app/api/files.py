@@ -1,13 +1,14 @@
 """
 API выдачи файлов — GET /api/files/{file_id}.
 """
+from urllib.parse import quote
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
+from app.db import async_session_maker, get_read_db, read_replicas
 from app.services.file_resolver import resolve_file
 from app.storage.local import get_storage
 
@@ -17,26 +18,43 @@ router = APIRouter()
 @router.get("/{file_id}")
 async def get_file(
     file_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Выдать файл по ID (image или attachment).
     Content-Type и Content-Disposition устанавливаются из метаданных.
     """
     resolved = await resolve_file(db, file_id)
+    if not resolved and read_replicas.serves(db.bind):
+        # Только что загруженный в админке файл может ещё не дойти до реплики
+        async with async_session_maker() as primary:
+            resolved = await resolve_file(primary, file_id)
     if not resolved:
         raise HTTPException(status_code=404, detail="File not found")
 
     file_path, mime, filename = resolved
+    media_type = mime or "application/octet-stream"
     storage = get_storage()
-    abs_path = storage.get_absolute_path(file_path)
-
-    try:
-        # Используем FileResponse для потоковой выдачи
-        return FileResponse(
-            path=abs_path,
-            media_type=mime or "application/octet-stream",
-            filename=filename,
-        )
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="File not found on disk")
+
+    # Локальный диск: FileResponse (Range, ETag, Last-Modified)
+    abs_path = storage.local_path(file_path)
+    if abs_path is not None:
+        try:
+            # Используем FileResponse для потоковой выдачи
+            return FileResponse(
+                path=abs_path,
+                media_type=media_type,
+                filename=filename,
+            )
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="File not found on disk")
+
+    # Драйверы без локального пути (S3 и т.п.): отдаём блоками, не буферизуя файл целиком
+    stream = await storage.open_stream(file_path)
+    if stream is None:
+        raise HTTPException(status_code=404, detail="File not found in storage")
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}"},
+    )
@@ -1,27 +1,28 @@
 """
 Публичные API для мини-приложения магазина (без авторизации).
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
 
-from app.config import get_settings
+from app.metrics import cache_hit
+from app.tracing import span
 from app.schemas.admin import MiniappSettingsResponse
+from app.services.runtime_settings import runtime_settings
 
 router = APIRouter()
 
 
 @router.get("/settings", response_model=MiniappSettingsResponse)
-async def get_miniapp_settings():
-    """Получить публичные настройки для мини-приложения магазина."""
-    s = get_settings()
-    return MiniappSettingsResponse(
-        section_title=s.miniapp_section_title,
-        footer_text=s.miniapp_footer_text,
-        background_color=s.miniapp_background_color,
-        background_image=s.miniapp_background_image,
-        text_color=s.miniapp_text_color,
-        heading_color=s.miniapp_heading_color,
-        price_color=s.miniapp_price_color,
-        hint_color=s.miniapp_hint_color,
-        card_bg_color=s.miniapp_card_bg_color,
-        contact_telegram_link=s.contact_telegram_link,
-    )
+async def get_miniapp_settings(request: Request):
+    """
+    Получить публичные настройки для мини-приложения магазина.
+    Ответ собран заранее (в памяти воркера); при совпадении If-None-Match — 304.
+    """
+    etag = runtime_settings.miniapp_etag
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    not_modified = request.headers.get("if-none-match") == etag
+    cache_hit("miniapp_settings", not_modified)
+    with span("cache.miniapp_settings") as s:
+        s.set("cache.hit", not_modified)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(content=runtime_settings.miniapp_body, media_type="application/json", headers=headers)
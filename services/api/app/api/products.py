@@ -7,7 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
+from app.db import get_read_db, get_readonly_db
 from app.models.product import Product
 from app.repositories.product import get_product_by_slug, list_products as repo_list_products
 from app.schemas.product import (
@@ -18,6 +18,7 @@ from app.schemas.product import (
     ProductListResponse,
     ProductSpecOut,
 )
+from app.services.view_stats import view_counter
 
 router = APIRouter()
 
@@ -29,13 +30,14 @@ def _file_url(file_id: UUID) -> str:
 
 @router.get("/", response_model=ProductListResponse)
 async def list_products(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
     sort: str = Query("sort_order"),
+    category: str | None = Query(None, description="slug категории (включая подкатегории)"),
 ):
     """Список опубликованных товаров с пагинацией."""
-    products, total = await repo_list_products(db, page=page, per_page=per_page, sort=sort)
+    products, total = await repo_list_products(db, page=page, per_page=per_page, sort=sort, category=category)
 
     items = []
     for p in products:
@@ -59,25 +61,24 @@ async def list_products(
 
 
 @router.post("/{slug}/view")
-async def increment_product_view(slug: str, db: AsyncSession = Depends(get_db)):
+async def increment_product_view(slug: str, db: AsyncSession = Depends(get_readonly_db)):
     """
     Инкремент счётчика просмотров товара.
     Вызывается при открытии карточки (без авторизации).
+    Просмотр копится в буфере процесса и пакетно сбрасывается в БД (см. app/services/view_stats.py).
     """
-    stmt = select(Product).where(Product.slug == slug, Product.is_published == True)
-    result = await db.execute(stmt)
-    product = result.scalars().first()
-    if not product:
+    stmt = select(Product.id, Product.view_count).where(Product.slug == slug, Product.is_published == True)
+    row = (await db.execute(stmt)).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Product not found")
-    product.view_count = (product.view_count or 0) + 1
-    await db.flush()
-    return {"view_count": product.view_count}
+    view_counter.record(row.id)
+    return {"view_count": row.view_count + view_counter.pending(row.id)}
 
 
 @router.get("/{slug}", response_model=ProductDetail)
 async def get_product(
     slug: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Карточка товара по slug."""
     product = await get_product_by_slug(db, slug)
@@ -0,0 +1,50 @@
+"""
+API резервирования остатков вариантов (для бота/системы заказов, с токеном администратора).
+
+POST /api/reservations                   — удержать
+POST /api/reservations/{key}/commit      — списать со склада
+POST /api/reservations/{key}/release     — снять удержание
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.admin_auth import require_admin
+from app.db import get_db
+from app.schemas.reservation import ReservationCreate, ReservationResponse
+from app.services import stock
+from app.services.stock import InsufficientStock, ReservationConflict, ReservationNotFound
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.post("", response_model=ReservationResponse)
+async def create_reservation(data: ReservationCreate, db: AsyncSession = Depends(get_db)):
+    """Удержать qty единиц варианта на ttl_seconds (по умолчанию RESERVATION_TTL_SECONDS)."""
+    try:
+        return await stock.reserve(db, data.idempotency_key, data.variant_id, data.qty, data.ttl_seconds)
+    except ReservationNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (InsufficientStock, ReservationConflict) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/{key}/commit", response_model=ReservationResponse)
+async def commit_reservation(key: str, db: AsyncSession = Depends(get_db)):
+    """Списать удержанное со склада (stock_qty и in_order_qty уменьшаются на qty)."""
+    try:
+        return await stock.commit(db, key)
+    except ReservationNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ReservationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/{key}/release", response_model=ReservationResponse)
+async def release_reservation(key: str, db: AsyncSession = Depends(get_db)):
+    """Снять удержание (in_order_qty уменьшается на qty)."""
+    try:
+        return await stock.release(db, key)
+    except ReservationNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ReservationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
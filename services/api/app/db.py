@@ -2,18 +2,107 @@
 Подключение к БД и сессии (async SQLAlchemy 2.0).
 Используются только параметризованные запросы — защита от SQL injection.
 """
+import asyncio
+import contextlib
+import logging
+import threading
+import time
+import uuid
 from collections.abc import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy import make_url, text
+from sqlalchemy.exc import DBAPIError, InterfaceError, InvalidRequestError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.config import get_settings
+from app.metrics import observe_pool_checkout
 
 settings = get_settings()
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.log_level.upper() == "DEBUG",
-)
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Счётчики ожидания соединения из пула (для метрик)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, waited: float, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.checkouts += 1
+            else:
+                self.timeouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        observe_pool_checkout(waited, ok)
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool с замером времени ожидания свободного соединения."""
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            pool_stats.record(time.perf_counter() - t0, ok=False)
+            raise
+        pool_stats.record(time.perf_counter() - t0, ok=True)
+        return conn
+
+
+def _connect_args() -> dict:
+    if settings.db_pgbouncer:
+        # PgBouncer (transaction) отдаёт запросы разным серверным соединениям:
+        # подготовленные запросы нельзя кэшировать и их имена не должны повторяться
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return {"statement_cache_size": settings.db_statement_cache_size}
+
+
+def _engine_kwargs() -> dict:
+    return {
+        "echo": settings.log_level.upper() == "DEBUG",
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "connect_args": _connect_args(),
+    }
+
+
+engine = create_async_engine(settings.database_url, poolclass=TimedQueuePool, **_engine_kwargs())
+
+
+def pool_status() -> dict:
+    """Состояние пула: занятые и свободные соединения, overflow, ожидание выдачи."""
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.db_max_overflow,
+        "checkouts": pool_stats.checkouts,
+        "checkout_timeouts": pool_stats.timeouts,
+        "checkout_wait_seconds_total": round(pool_stats.wait_seconds_total, 6),
+        "checkout_wait_seconds_max": round(pool_stats.wait_seconds_max, 6),
+    }
+
 
 # Фабрика сессий
 async_session_maker = async_sessionmaker(
@@ -25,6 +114,151 @@ async_session_maker = async_sessionmaker(
 )
 
 
+class ReadOnlySession(Session):
+    """Сессия только для чтения: ORM-изменения не сбрасываются в БД."""
+
+    def flush(self, objects=None) -> None:
+        if self._is_clean():
+            return
+        raise InvalidRequestError("Read-only session: changes cannot be flushed")
+
+
+def read_only_session_maker(bind: AsyncEngine) -> async_sessionmaker:
+    """
+    Фабрика сессий чтения: AUTOCOMMIT — драйвер не отправляет BEGIN и COMMIT, каждый запрос
+    выполняется сам по себе (на запрос витрины на два обмена с сервером меньше). Пул общий с bind.
+    """
+    return async_sessionmaker(
+        bind.execution_options(isolation_level="AUTOCOMMIT"),
+        class_=AsyncSession,
+        sync_session_class=ReadOnlySession,
+        expire_on_commit=False,
+        autoflush=False,
+    )
+
+
+read_only_session_maker_primary = read_only_session_maker(engine)
+
+
+class Replica:
+    """Реплика для чтения: свой движок, фабрика сессий и признак доступности."""
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.engine = create_async_engine(url, **_engine_kwargs())
+        self.session_maker = read_only_session_maker(self.engine)
+        self.healthy = True
+        self.lag_seconds: float | None = None
+        self.error: str | None = None
+
+
+class ReplicaSet:
+    """Круговой выбор здоровой реплики; без реплик (или если все недоступны) — основная БД."""
+
+    def __init__(self, urls: list[str]) -> None:
+        self.replicas = [Replica(u) for u in urls]
+        self._next = 0
+
+    def session_maker(self) -> async_sessionmaker:
+        n = len(self.replicas)
+        for i in range(n):
+            replica = self.replicas[(self._next + i) % n]
+            if replica.healthy:
+                self._next = (self._next + i + 1) % n
+                return replica.session_maker
+        return read_only_session_maker_primary
+
+    def _replica_for(self, bind) -> Replica | None:
+        # Сессии привязаны к engine.execution_options(...) — это другой объект, пул общий
+        for replica in self.replicas:
+            if replica.engine.sync_engine.pool is bind.sync_engine.pool:
+                return replica
+        return None
+
+    def serves(self, bind) -> bool:
+        """Сессия с этим bind обслуживается репликой (а не основной БД)."""
+        return bind is not None and self._replica_for(bind) is not None
+
+    def mark_failed(self, bind, error: BaseException) -> None:
+        """Ошибка соединения во время запроса — исключить реплику до следующей проверки."""
+        replica = self._replica_for(bind)
+        if replica is not None:
+            if replica.healthy:
+                logger.warning("Read replica %s marked unhealthy: %s", _safe_url(replica.url), error)
+            replica.healthy = False
+            replica.error = str(error)
+
+    async def check(self) -> None:
+        """Проверить все реплики: соединение и отставание воспроизведения WAL."""
+        for replica in self.replicas:
+            try:
+                lag = await asyncio.wait_for(_replica_lag(replica), timeout=settings.replica_health_interval_seconds)
+                healthy, error = lag <= settings.replica_max_lag_seconds, None
+                if not healthy:
+                    error = f"replication lag {lag:.1f}s"
+            except Exception as e:
+                lag, healthy, error = None, False, f"{type(e).__name__}: {e}"
+            if healthy != replica.healthy:
+                logger.warning(
+                    "Read replica %s is %s%s",
+                    _safe_url(replica.url),
+                    "healthy" if healthy else "unhealthy",
+                    f" ({error})" if error else "",
+                )
+            replica.healthy, replica.lag_seconds, replica.error = healthy, lag, error
+
+    def status(self) -> list[dict]:
+        return [
+            {"url": _safe_url(r.url), "healthy": r.healthy, "lag_seconds": r.lag_seconds, "error": r.error}
+            for r in self.replicas
+        ]
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+# Отставание реплики: 0, если всё полученное уже применено (простаивающий мастер не считается отставанием)
+_REPLICA_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+async def _replica_lag(replica: Replica) -> float:
+    async with replica.engine.connect() as conn:
+        return float(await conn.scalar(_REPLICA_LAG_SQL) or 0)
+
+
+def _is_connection_error(e: BaseException) -> bool:
+    if isinstance(e, (OSError, OperationalError, InterfaceError)):
+        return True
+    return isinstance(e, DBAPIError) and (e.connection_invalidated or isinstance(e.orig, OSError))
+
+
+def _safe_url(url: str) -> str:
+    return make_url(url).render_as_string(hide_password=True)
+
+
+read_replicas = ReplicaSet(settings.replica_urls_list)
+
+
+async def run_replica_health_worker() -> None:
+    """Фоновая задача процесса: периодическая проверка реплик."""
+    if not read_replicas.replicas:
+        return
+    while True:
+        try:
+            await read_replicas.check()
+        except Exception:
+            logger.exception("Read replica health check failed")
+        await asyncio.sleep(settings.replica_health_interval_seconds)
+
+
 class Base(DeclarativeBase):
     """Базовый класс для ORM-моделей."""
 
@@ -42,3 +276,33 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             raise
         finally:
             await session.close()
+
+
+@contextlib.asynccontextmanager
+async def _read_only_session(maker: async_sessionmaker) -> AsyncGenerator[AsyncSession, None]:
+    async with maker() as session:
+        try:
+            yield session
+        except Exception as e:
+            if _is_connection_error(e):
+                read_replicas.mark_failed(session.bind, e)
+            raise
+        finally:
+            # Транзакции нет — закрытие только возвращает соединение в пул
+            await session.close()
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Зависимость FastAPI для публичного чтения: сессия только для чтения (без BEGIN/COMMIT)
+    на реплике (по кругу среди здоровых), при отсутствии реплик — на основной БД.
+    Не использовать там, где нужно видеть только что записанные данные (админка, записи).
+    """
+    async with _read_only_session(read_replicas.session_maker()) as session:
+        yield session
+
+
+async def get_readonly_db() -> AsyncGenerator[AsyncSession, None]:
+    """Зависимость FastAPI: сессия только для чтения на основной БД (без BEGIN/COMMIT)."""
+    async with _read_only_session(read_only_session_maker_primary) as session:
+        yield session
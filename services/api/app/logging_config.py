@@ -1,10 +1,19 @@
 """
 Логирование с ротацией — общий объём логов ≤ 100 МБ.
 Уровни: DEBUG, INFO, WARNING, ERROR.
+
+Вызов логгера в обработчике запроса только кладёт запись в очередь (QueueHandler);
+консоль и файлы пишет отдельный поток QueueListener — диск и ротация не блокируют event loop.
+Несколько воркеров uvicorn: LOG_PER_WORKER=true — у каждого процесса свой файл logs/app-<pid>.log
+(без гонок при ротации), старые файлы удаляются так, чтобы общий объём оставался в пределах лимита.
+LOG_JSON=true — записи в JSON (python-json-logger).
 """
+import atexit
 import logging
+import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
 from app.config import get_settings
@@ -14,31 +23,108 @@ LOG_LEVEL = getattr(logging, settings.log_level.upper(), logging.INFO)
 # Ротация: 3 файла по ~33 МБ ≈ 100 МБ
 MAX_BYTES = int(settings.log_max_bytes_mb * 1024 * 1024 / 3)
 BACKUP_COUNT = 2
+LOGS_DIR = Path("logs")
 
+_listener: QueueListener | None = None
+_queue_handler: QueueHandler | None = None
 
-def setup_logging() -> None:
-    """Настройка логирования при старте приложения."""
-    root = logging.getLogger()
-    root.setLevel(LOG_LEVEL)
-    formatter = logging.Formatter(
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _prune_worker_logs(logs_dir: Path) -> None:
+    """
+    Удалить самые старые файлы воркеров, пока их общий объём больше лимита.
+    Текущий файл живого воркера не трогаем (он открыт на запись) — только архивы
+    ротации и файлы завершившихся процессов.
+    """
+    files = sorted(logs_dir.glob("app-*.log*"), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in files)
+    limit = settings.log_max_bytes_mb * 1024 * 1024
+    for path in files:
+        if total <= limit:
+            break
+        pid = path.name[len("app-"):].split(".", 1)[0]
+        if path.suffix == ".log" and pid.isdigit() and _pid_alive(int(pid)):
+            continue
+        total -= path.stat().st_size
+        path.unlink(missing_ok=True)
+
+
+class WorkerRotatingFileHandler(RotatingFileHandler):
+    """Файл одного воркера: после ротации подчищаются файлы всех воркеров до общего лимита."""
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        _prune_worker_logs(Path(self.baseFilename).parent)
+
+
+def _formatter() -> logging.Formatter:
+    if settings.log_json:
+        try:
+            from pythonjsonlogger.json import JsonFormatter
+        except ImportError:  # python-json-logger < 3
+            from pythonjsonlogger.jsonlogger import JsonFormatter
+        return JsonFormatter(
+            "%(asctime)s %(levelname)s %(name)s %(process)d %(message)s",
+            rename_fields={"levelname": "level", "name": "logger", "process": "pid"},
+        )
+    return logging.Formatter(
         "%(asctime)s [%(levelname)s] %(name)s: %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
-    # Консоль
+
+def _output_handlers() -> list[logging.Handler]:
+    """Консоль и файл с ротацией — работают в потоке QueueListener."""
+    formatter = _formatter()
     console = logging.StreamHandler(sys.stdout)
     console.setFormatter(formatter)
-    root.addHandler(console)
-
-    # Файл с ротацией (если указан путь)
-    logs_dir = Path("logs")
-    logs_dir.mkdir(exist_ok=True)
-    app_log = logs_dir / "app.log"
-    file_handler = RotatingFileHandler(
-        app_log,
-        maxBytes=MAX_BYTES,
-        backupCount=BACKUP_COUNT,
-        encoding="utf-8",
-    )
+
+    LOGS_DIR.mkdir(exist_ok=True)
+    if settings.log_per_worker:
+        file_handler = WorkerRotatingFileHandler(
+            LOGS_DIR / f"app-{os.getpid()}.log", maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8"
+        )
+        _prune_worker_logs(LOGS_DIR)
+    else:
+        file_handler = RotatingFileHandler(
+            LOGS_DIR / "app.log", maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8"
+        )
     file_handler.setFormatter(formatter)
-    root.addHandler(file_handler)
+    return [console, file_handler]
+
+
+def setup_logging() -> None:
+    """Настройка логирования при старте приложения (повторный вызов ничего не делает)."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = QueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    _listener = QueueListener(log_queue, *_output_handlers(), respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Дописать записи из очереди и остановить поток записи (при остановке воркера)."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = _queue_handler = None
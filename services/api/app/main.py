@@ -1,9 +1,12 @@
 """
 Точка входа FastAPI приложения.
 """
+import asyncio
+import contextlib
 import logging
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
@@ -11,7 +14,16 @@ from slowapi.errors import RateLimitExceeded
 from app.config import get_settings
 from app.limiter import limiter
 from app.logging_config import setup_logging
+from app.metrics import MetricsMiddleware, mark_process_dead, render as render_metrics, run_pool_gauge_worker
+from app.query_stats import QueryStatsMiddleware
 from app.api import router as api_router
+from app.db import read_replicas, run_replica_health_worker
+from app.tracing import TracingMiddleware, shutdown_tracing
+from app.services.ordering import run_rebalance_worker
+from app.services.readiness import loop_lag, readiness
+from app.services.runtime_settings import run_settings_listener, runtime_settings
+from app.services.stock import run_reservation_expiry_worker
+from app.services.view_stats import run_view_stats_worker
 
 # Логирование с ротацией (≤ 100 МБ)
 setup_logging()
@@ -35,15 +47,65 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Число SQL-запросов и время в БД на запрос (Server-Timing)
+app.add_middleware(QueryStatsMiddleware)
+
+# Профилирование по требованию — только при PROFILING_ENABLED (иначе middleware нет вовсе)
+if settings.profiling_enabled:
+    from app.profiling import ProfilingMiddleware
+
+    app.add_middleware(ProfilingMiddleware)
+
+# Трассировка: серверный спан запроса, продолжение трассы из traceparent
+if settings.tracing_enabled:
+    app.add_middleware(TracingMiddleware)
+
+# Метрики Prometheus (внешний слой — учитывает всё время обработки)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(api_router, prefix="/api", tags=["api"])
 
 
 @app.on_event("startup")
 async def startup():
-    """Создание директорий при старте."""
+    """Создание директорий и запуск фоновых задач при старте."""
     from pathlib import Path
     Path(settings.storage_path).mkdir(parents=True, exist_ok=True)
     logger.info("Storage path ready: %s", settings.storage_path)
+    try:
+        await runtime_settings.refresh()
+    except Exception:
+        # БД недоступна — значения из .env; слушатель перечитает таблицу после подключения
+        logger.exception("Failed to load runtime settings")
+    app.state.background_tasks = [
+        # Изменения настроек из других воркеров (LISTEN/NOTIFY)
+        asyncio.create_task(run_settings_listener()),
+        # Пакетный сброс просмотров и обслуживание секций статистики
+        asyncio.create_task(run_view_stats_worker()),
+        # Перенумерация дробных sort_order
+        asyncio.create_task(run_rebalance_worker()),
+        # Возврат просроченных удержаний остатков
+        asyncio.create_task(run_reservation_expiry_worker()),
+        # Проверка доступности и отставания реплик чтения
+        asyncio.create_task(run_replica_health_worker()),
+        # Состояние пула соединений в метриках
+        asyncio.create_task(run_pool_gauge_worker()),
+        # Задержка event loop для /ready
+        asyncio.create_task(loop_lag.run()),
+    ]
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Остановка фоновых задач (буфер просмотров сбрасывается в БД)."""
+    for task in app.state.background_tasks:
+        task.cancel()
+    for task in app.state.background_tasks:
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    await read_replicas.dispose()
+    mark_process_dead()
+    shutdown_tracing()
 
 
 @app.get("/health")
@@ -64,3 +126,25 @@ async def api_health():
     """
     logger.debug("API health check")
     return {"status": "ok"}
+
+
+@app.get("/ready")
+@app.get("/api/ready")
+async def ready():
+    """
+    Готовность принимать трафик: запрос к БД, загрузка пула, запись/чтение хранилища,
+    задержка event loop — каждое против порога READY_*. 503, если хотя бы одна проверка не прошла.
+    Результат кэшируется на READY_CACHE_SECONDS.
+    """
+    result = await readiness.check()
+    return JSONResponse(result, status_code=200 if result["status"] == "ready" else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Метрики в формате Prometheus (все воркеры при METRICS_MULTIPROC_DIR).
+    Наружу через nginx не публикуется — собирать напрямую с порта API.
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
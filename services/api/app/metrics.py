@@ -0,0 +1,175 @@
+"""
+Метрики Prometheus: задержки и размеры ответов по маршрутам, запросы в обработке,
+пул соединений БД, отданные байты файлов, попадания в кэши.
+
+Несколько воркеров uvicorn: при заданном METRICS_MULTIPROC_DIR prometheus_client пишет значения
+каждого процесса в mmap-файлы этой директории, а /metrics в любом воркере собирает их вместе.
+Директорию нужно очищать перед стартом сервиса (файлы завершившихся процессов).
+Модуль должен импортироваться раньше любого другого импорта prometheus_client.
+"""
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+
+from app.config import get_settings
+
+settings = get_settings()
+if settings.metrics_multiproc_dir:
+    Path(settings.metrics_multiproc_dir).mkdir(parents=True, exist_ok=True)
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.metrics_multiproc_dir)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+logger = logging.getLogger(__name__)
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Длительность обработки HTTP-запроса",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS = Counter("http_requests_total", "HTTP-запросы по статусу ответа", ["method", "route", "status"])
+IN_FLIGHT = Gauge("http_requests_in_flight", "Запросы в обработке", ["method"], multiprocess_mode="livesum")
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Размер тела ответа",
+    ["method", "route"],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000),
+)
+FILE_BYTES = Counter("file_bytes_sent_total", "Байты, отданные GET /api/files/{file_id}")
+CACHE_REQUESTS = Counter("cache_requests_total", "Обращения к кэшам: hit / miss", ["cache", "result"])
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_connections_in_use", "Соединения пула, выданные сессиям", multiprocess_mode="livesum"
+)
+DB_POOL_CHECKED_IN = Gauge("db_pool_connections_idle", "Свободные соединения пула", multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Соединения сверх pool_size", multiprocess_mode="livesum")
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Ожидание соединения из пула",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_TIMEOUTS = Counter("db_pool_checkout_timeouts_total", "Отказы выдачи соединения по таймауту пула")
+
+# Маршрут «не найден» — одной меткой, чтобы произвольные пути не раздували число рядов
+UNMATCHED_ROUTE = "unmatched"
+FILES_ROUTE = "/api/files/{file_id}"
+
+
+def route_template(scope) -> str:
+    """
+    Шаблон маршрута запроса (/api/files/{file_id}). У вложенных роутеров FastAPI в scope["route"]
+    путь без префиксов — префикс (без параметров) берётся из начала фактического пути.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return UNMATCHED_ROUTE
+    leaf = [p for p in template.split("/") if p]
+    actual = [p for p in scope["path"].split("/") if p]
+    prefix = actual[: len(actual) - len(leaf)]
+    return "/" + "/".join(prefix) + template if prefix else template
+
+
+def cache_hit(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def observe_pool_checkout(waited: float, ok: bool) -> None:
+    DB_POOL_WAIT.observe(waited)
+    if not ok:
+        DB_POOL_TIMEOUTS.inc()
+
+
+def refresh_pool_gauges() -> None:
+    from app.db import pool_status
+
+    status = pool_status()
+    DB_POOL_CHECKED_OUT.set(status["checked_out"])
+    DB_POOL_CHECKED_IN.set(status["checked_in"])
+    DB_POOL_OVERFLOW.set(status["overflow"])
+
+
+async def run_pool_gauge_worker() -> None:
+    """Фоновая задача процесса: состояние пула в gauges раз в metrics_pool_refresh_seconds."""
+    while True:
+        try:
+            refresh_pool_gauges()
+        except Exception:
+            logger.exception("Pool metrics refresh failed")
+        await asyncio.sleep(settings.metrics_pool_refresh_seconds)
+
+
+def mark_process_dead() -> None:
+    """При остановке воркера: убрать его live-gauges из общей директории."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def render() -> tuple[bytes, str]:
+    """Текст для /metrics: все процессы (multiprocess) или только текущий."""
+    refresh_pool_gauges()
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: длительность, статус, размер ответа и запросы в обработке по шаблону маршрута."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        size = 0
+        content_length = None
+        t0 = time.perf_counter()
+
+        async def send_measured(message):
+            nonlocal status, size, content_length
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"content-length":
+                        content_length = int(value)
+                        break
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        # Маршрут известен только после маршрутизации, поэтому in-flight — по методу
+        in_flight = IN_FLIGHT.labels(method)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_measured)
+        finally:
+            in_flight.dec()
+            route = route_template(scope)
+            # FileResponse через pathsend тело не передаёт — тогда берём Content-Length
+            sent = size or content_length or 0
+            REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - t0)
+            REQUESTS.labels(method, route, str(status)).inc()
+            RESPONSE_SIZE.labels(method, route).observe(sent)
+            if route == FILES_ROUTE:
+                FILE_BYTES.inc(sent)
+                if method == "GET" and status in (200, 206, 304):
+                    cache_hit("files_http", status == 304)
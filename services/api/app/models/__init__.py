@@ -1,5 +1,5 @@
 """
-ORM-модели (Product, ProductCategory, ProductImage, ProductAttachment, ProductSpec, ProductVariant).
+ORM-модели (Product, ProductCategory, ProductImage, ProductAttachment, ProductSpec, ProductVariant, ProductViewDaily, CatalogStats, AppSetting, StockReservation).
 """
 from app.models.product import (
     Product,
@@ -8,7 +8,11 @@ from app.models.product import (
     ProductAttachment,
     ProductSpec,
     ProductVariant,
+    ProductViewDaily,
+    CatalogStats,
 )
+from app.models.reservation import StockReservation
+from app.models.setting import AppSetting
 
 __all__ = [
     "Product",
@@ -17,4 +21,8 @@ __all__ = [
     "ProductAttachment",
     "ProductSpec",
     "ProductVariant",
+    "ProductViewDaily",
+    "CatalogStats",
+    "AppSetting",
+    "StockReservation",
 ]
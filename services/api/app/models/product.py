@@ -1,13 +1,14 @@
 """
-Модели товара: Product, ProductCategory, ProductImage, ProductAttachment, ProductSpec, ProductVariant.
+Модели товара: Product, ProductCategory, ProductImage, ProductAttachment, ProductSpec, ProductVariant,
+ProductViewDaily, CatalogStats.
 """
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from typing import TYPE_CHECKING, Optional
 from uuid import UUID
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, Numeric, String, Text
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, Float, ForeignKey, Index, Integer, Numeric, SmallInteger, String, Text
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -16,17 +17,26 @@ from app.db import Base
 if TYPE_CHECKING:
     pass
 
+# Служебный товар, к которому привязано фоновое изображение мини-приложения
+SYSTEM_PRODUCT_SLUG = "__system_background__"
+
 
 class ProductCategory(Base):
     """Категория товаров."""
 
     __tablename__ = "product_categories"
+    __table_args__ = (Index("ix_product_categories_path", "path", postgresql_ops={"path": "text_pattern_ops"}),)
 
     id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     slug: Mapped[str] = mapped_column(String(255), unique=True, index=True, nullable=False)
-    sort_order: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    sort_order: Mapped[float] = mapped_column(Float, default=0, nullable=False)
     parent_id: Mapped[Optional[UUID]] = mapped_column(PG_UUID(as_uuid=True), ForeignKey("product_categories.id", ondelete="SET NULL"), nullable=True)
+    # Материализованный путь «<id корня>/.../<id>/» (uuid без дефисов), ведётся триггером БД
+    path: Mapped[str] = mapped_column(Text, server_default="", nullable=False)
+    # Товаров непосредственно в категории (без подкатегорий), ведутся триггерами на products
+    products_total: Mapped[int] = mapped_column(Integer, server_default="0", nullable=False)
+    products_published: Mapped[int] = mapped_column(Integer, server_default="0", nullable=False)
 
     products: Mapped[list["Product"]] = relationship("Product", back_populates="category")
 
@@ -48,7 +58,7 @@ class Product(Base):
     price_amount: Mapped[Optional[Decimal]] = mapped_column(Numeric(14, 2), nullable=True)
     price_currency: Mapped[Optional[str]] = mapped_column(String(3), nullable=True)
     is_published: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
-    sort_order: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    sort_order: Mapped[float] = mapped_column(Float, default=0, nullable=False)
     hashtags: Mapped[Optional[str]] = mapped_column(String(1024), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -69,7 +79,7 @@ class ProductImage(Base):
     product_id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
     file_path: Mapped[str] = mapped_column(String(1024), nullable=False)
     alt: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
-    sort_order: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    sort_order: Mapped[float] = mapped_column(Float, default=0, nullable=False)
     width: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     height: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     mime: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
@@ -89,7 +99,7 @@ class ProductAttachment(Base):
     title: Mapped[str] = mapped_column(String(512), nullable=False)
     mime: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
     size_bytes: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
-    sort_order: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    sort_order: Mapped[float] = mapped_column(Float, default=0, nullable=False)
 
     product: Mapped["Product"] = relationship("Product", back_populates="attachments")
 
@@ -104,7 +114,7 @@ class ProductSpec(Base):
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     value: Mapped[str] = mapped_column(String(512), nullable=False)
     unit: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
-    sort_order: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    sort_order: Mapped[float] = mapped_column(Float, default=0, nullable=False)
 
     product: Mapped["Product"] = relationship("Product", back_populates="specs")
 
@@ -120,6 +130,28 @@ class ProductVariant(Base):
     option_value: Mapped[str] = mapped_column(String(255), nullable=False)
     stock_qty: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     in_order_qty: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
-    sort_order: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    sort_order: Mapped[float] = mapped_column(Float, default=0, nullable=False)
 
     product: Mapped["Product"] = relationship("Product", back_populates="variants")
+
+
+class ProductViewDaily(Base):
+    """Просмотры товара за день (секционирована по месяцам по полю day)."""
+
+    __tablename__ = "product_view_daily"
+    __table_args__ = {"postgresql_partition_by": "RANGE (day)"}
+
+    product_id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    views: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class CatalogStats(Base):
+    """Счётчики каталога (одна строка id = 1); ведутся триггером БД на products."""
+
+    __tablename__ = "catalog_stats"
+
+    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    total_products: Mapped[int] = mapped_column(BigInteger, server_default="0", nullable=False)
+    published_count: Mapped[int] = mapped_column(BigInteger, server_default="0", nullable=False)
+    total_views: Mapped[int] = mapped_column(BigInteger, server_default="0", nullable=False)
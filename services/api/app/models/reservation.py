@@ -0,0 +1,41 @@
+"""
+Модель StockReservation — резерв остатка варианта (удержание с ограниченным сроком).
+"""
+import uuid
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import CheckConstraint, DateTime, ForeignKey, Index, Integer, String, text
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+# Статусы резерва
+RESERVATION_HELD = "held"
+RESERVATION_COMMITTED = "committed"
+RESERVATION_RELEASED = "released"
+RESERVATION_EXPIRED = "expired"
+
+
+class StockReservation(Base):
+    """
+    Резерв: пока held, qty учтено в ProductVariant.in_order_qty.
+    committed — списано со stock_qty; released/expired — возвращено.
+    """
+
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        CheckConstraint("qty > 0", name="ck_stock_reservations_qty_positive"),
+        # Частичный индекс для фоновой отмены просроченных удержаний
+        Index("ix_stock_reservations_held_expires", "expires_at", postgresql_where=text("status = 'held'")),
+    )
+
+    id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    idempotency_key: Mapped[str] = mapped_column(String(128), unique=True, nullable=False)
+    variant_id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), ForeignKey("product_variants.id", ondelete="CASCADE"), nullable=False)
+    qty: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default=RESERVATION_HELD)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
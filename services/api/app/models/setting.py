@@ -0,0 +1,24 @@
+"""
+Модель AppSetting — редактируемые из админки настройки (переопределяют значения из .env).
+"""
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Sequence, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+# Общий счётчик версий: каждое изменение получает следующее значение
+SETTINGS_VERSION_SEQ = Sequence("app_settings_version_seq")
+
+
+class AppSetting(Base):
+    """Настройка: ключ — имя поля Settings, значение — JSON."""
+
+    __tablename__ = "app_settings"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[object] = mapped_column(JSONB, nullable=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
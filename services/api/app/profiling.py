@@ -0,0 +1,101 @@
+"""
+Профилирование запросов по требованию (pyinstrument, сэмплирование стека).
+
+Включается PROFILING_ENABLED=true; без него middleware не подключается вовсе.
+Профилируются:
+- запросы с заголовком X-Profile-Token: <JWT админа> (ответ получает X-Profile-File);
+- доля PROFILING_SAMPLE_RATE остальных запросов.
+Профиль сохраняется в PROFILING_DIR в формате speedscope (https://www.speedscope.app,
+flamegraph); хранятся последние PROFILING_MAX_FILES файлов.
+"""
+import asyncio
+import logging
+import random
+import re
+import time
+from pathlib import Path
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+PROFILE_FILE_HEADER = b"x-profile-file"
+PROFILE_SUFFIX = ".speedscope.json"
+
+
+def _is_admin_token(token: bytes) -> bool:
+    from app.api.admin_auth import decode_token
+
+    return decode_token(token.decode("latin-1")) == settings.admin_login
+
+
+def _profile_name(method: str, path: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_")[:80] or "root"
+    now = time.time()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+    return f"{stamp}-{int(now * 1000) % 1000:03d}_{method}_{slug}_{random.randrange(16**4):04x}{PROFILE_SUFFIX}"
+
+
+def _write_profile(directory: Path, name: str, body: str) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / name).write_text(body, encoding="utf-8")
+    # Ротация: удаляем самые старые сверх лимита (имена начинаются с отметки времени)
+    profiles = sorted(directory.glob(f"*{PROFILE_SUFFIX}"))
+    for old in profiles[: max(len(profiles) - settings.profiling_max_files, 0)]:
+        old.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """ASGI-middleware: профиль pyinstrument для выбранных запросов."""
+
+    def __init__(self, app) -> None:
+        from pyinstrument import Profiler
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        self.app = app
+        self._profiler_cls = Profiler
+        self._renderer_cls = SpeedscopeRenderer
+        self._dir = Path(settings.profiling_dir)
+
+    def _requested(self, scope) -> bool:
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_TOKEN_HEADER:
+                return _is_admin_token(value)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = self._requested(scope)
+        if not requested and random.random() >= settings.profiling_sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope["method"], scope["path"]
+        name = _profile_name(method, path)
+        profiler = self._profiler_cls(interval=settings.profiling_interval_ms / 1000, async_mode="enabled")
+
+        async def send_with_name(message):
+            if message["type"] == "http.response.start" and requested:
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_FILE_HEADER, name.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        t0 = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_name)
+        finally:
+            session = profiler.stop()
+            duration_ms = (time.perf_counter() - t0) * 1000
+            try:
+                body = self._renderer_cls().render(session)
+                await asyncio.to_thread(_write_profile, self._dir, name, body)
+            except Exception:
+                logger.exception("Failed to save profile for %s %s", method, path)
+            else:
+                logger.info("Profile %s %s (%.1f ms) saved: %s", method, path, duration_ms, name)
@@ -0,0 +1,132 @@
+"""
+Учёт SQL-запросов на HTTP-запрос: число запросов и время в БД.
+
+События before/after_cursor_execute всех движков складывают статистику в объект текущего
+запроса (ContextVar). Middleware отдаёт её в заголовке Server-Timing и в логе; если один и тот же
+запрос повторился sql_n_plus_one_threshold раз — подозрение на N+1 (WARNING в логе, а при
+SQL_N_PLUS_ONE_RAISE=true — исключение NPlusOneDetected, чтобы проверка падала в тестах).
+"""
+import contextlib
+import logging
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class NPlusOneDetected(RuntimeError):
+    """Один и тот же SQL-запрос выполнен за HTTP-запрос не меньше порога раз."""
+
+
+class QueryStats:
+    """Статистика SQL одного HTTP-запроса (или блока count_queries)."""
+
+    __slots__ = ("count", "db_seconds", "statements", "suspects")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.db_seconds = 0.0
+        self.statements: Counter[str] = Counter()
+        self.suspects: list[str] = []
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.db_seconds += seconds
+        self.statements[statement] += 1
+        threshold = settings.sql_n_plus_one_threshold
+        if threshold and self.statements[statement] == threshold:
+            self.suspects.append(statement)
+            if settings.sql_n_plus_one_raise:
+                raise NPlusOneDetected(f"Statement executed {threshold} times: {_short(statement)}")
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.db_seconds * 1000:.2f};desc="{self.count} queries"'
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def _short(statement: str, limit: int = 200) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "…"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info["query_stats_start"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.pop("query_stats_start", None)
+    if stats is None or started is None:
+        return
+    stats.record(statement, time.perf_counter() - started)
+
+
+@contextlib.contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """
+    Считать SQL-запросы внутри блока (тесты, бенчмарки):
+        with count_queries() as q:
+            await get_product_by_slug(db, slug)
+        assert q.count <= 3
+    """
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+class QueryStatsMiddleware:
+    """ASGI-middleware: статистика SQL в заголовке Server-Timing и в логе."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.sql_query_stats:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        status = 0
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if stats.count:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", stats.server_timing().encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if stats.count:
+                path = scope.get("path", "")
+                logger.debug(
+                    "%s %s %s: %d queries, %.2f ms in DB",
+                    scope.get("method"), path, status, stats.count, stats.db_seconds * 1000,
+                )
+                for statement in stats.suspects:
+                    logger.warning(
+                        "Possible N+1 on %s %s: %d× %s",
+                        scope.get("method"), path, stats.statements[statement], _short(statement),
+                    )
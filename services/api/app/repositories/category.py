@@ -0,0 +1,82 @@
+"""
+Репозиторий категорий — дерево и выборка ветки по материализованному пути.
+Пути и счётчики товаров ведутся триггерами БД (миграция 008).
+"""
+from uuid import UUID
+
+from sqlalchemy import Select, and_, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models.product import ProductCategory
+
+
+def _in_subtree(path, root_path):
+    """
+    path начинается с root_path. Диапазон [root, root без «/» + «0») с операторами
+    text_pattern_ops использует индекс и при непостоянном root (подзапрос, параметр).
+    """
+    return and_(path.op("~>=~")(root_path), path.op("~<~")(func.left(root_path, -1) + "0"))
+
+
+def subtree_ids(*, slug: str | None = None, category_id: UUID | None = None) -> Select:
+    """Подзапрос id категории (по slug или id) и всех её потомков — по пути, без рекурсии."""
+    root = aliased(ProductCategory)
+    root_path = (
+        select(root.path)
+        .where(root.slug == slug if slug is not None else root.id == category_id)
+        .scalar_subquery()
+    )
+    return select(ProductCategory.id).where(_in_subtree(ProductCategory.path, root_path))
+
+
+async def category_tree(db: AsyncSession, published_only: bool = True) -> list[dict]:
+    """
+    Дерево категорий одним рекурсивным запросом (обход от корней) с числом товаров:
+    product_count — в самой категории, subtree_count — вместе со всеми подкатегориями.
+    """
+    count_col = ProductCategory.products_published if published_only else ProductCategory.products_total
+    c = ProductCategory
+    tree = (
+        select(c.id, c.parent_id, c.name, c.slug, c.sort_order, c.path, count_col.label("product_count"), literal(0).label("depth"))
+        .where(c.parent_id.is_(None))
+        .cte("tree", recursive=True)
+    )
+    child = aliased(ProductCategory)
+    child_count = child.products_published if published_only else child.products_total
+    tree = tree.union_all(
+        select(
+            child.id, child.parent_id, child.name, child.slug, child.sort_order, child.path,
+            child_count, tree.c.depth + 1,
+        ).join(tree, child.parent_id == tree.c.id)
+    )
+    descendant = aliased(ProductCategory)
+    descendant_count = descendant.products_published if published_only else descendant.products_total
+    subtree_count = (
+        select(func.coalesce(func.sum(descendant_count), 0))
+        .where(_in_subtree(descendant.path, tree.c.path))
+        .scalar_subquery()
+    )
+    stmt = select(tree, subtree_count.label("subtree_count")).order_by(tree.c.depth, tree.c.sort_order, tree.c.name)
+    rows = (await db.execute(stmt)).all()
+
+    # Сборка вложенной структуры: строки упорядочены по глубине, родитель всегда раньше потомков
+    nodes: dict = {}
+    roots: list[dict] = []
+    for r in rows:
+        node = {
+            "id": str(r.id),
+            "name": r.name,
+            "slug": r.slug,
+            "sort_order": r.sort_order,
+            "depth": r.depth,
+            "product_count": r.product_count,
+            "subtree_count": int(r.subtree_count),
+            "children": [],
+        }
+        nodes[r.id] = node
+        if r.parent_id is None:
+            roots.append(node)
+        else:
+            nodes[r.parent_id]["children"].append(node)
+    return roots
@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.models.product import Product
+from app.repositories.category import subtree_ids
 
 
 async def list_products(
@@ -16,13 +17,18 @@ async def list_products(
     page: int = 1,
     per_page: int = 20,
     sort: str = "sort_order",
+    category: str | None = None,
 ) -> tuple[list[Product], int]:
     """
     Список опубликованных товаров с пагинацией.
+    category — slug категории: товары её и всех подкатегорий.
     Возвращает (список, total).
     """
+    filters = [Product.is_published == True]
+    if category:
+        filters.append(Product.category_id.in_(subtree_ids(slug=category)))
     # Подсчёт total
-    count_stmt = select(func.count()).select_from(Product).where(Product.is_published == True)
+    count_stmt = select(func.count()).select_from(Product).where(*filters)
     total_result = await db.execute(count_stmt)
     total = total_result.scalar() or 0
 
@@ -30,7 +36,7 @@ async def list_products(
     order_col = getattr(Product, sort, Product.sort_order)
     stmt = (
         select(Product)
-        .where(Product.is_published == True)
+        .where(*filters)
         .order_by(order_col)
         .offset((page - 1) * per_page)
         .limit(per_page)
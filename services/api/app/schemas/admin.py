@@ -2,9 +2,10 @@
 Схемы для админ API.
 """
 from decimal import Decimal
+from typing import Literal
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class LoginRequest(BaseModel):
@@ -34,7 +35,7 @@ class ProductCreate(BaseModel):
     price_amount: Decimal | None = None
     price_currency: str | None = "RUB"
     is_published: bool = False
-    sort_order: int = 0
+    sort_order: float = 0
     hashtags: str | None = None
 
 
@@ -51,16 +52,39 @@ class ProductUpdate(BaseModel):
     price_amount: Decimal | None = None
     price_currency: str | None = None
     is_published: bool | None = None
-    sort_order: int | None = None
+    sort_order: float | None = None
     hashtags: str | None = None
 
 
+class ProductFilter(BaseModel):
+    """Фильтр товаров (те же параметры, что у списка в админке)."""
+
+    search: str | None = None
+    category_id: UUID | None = None
+    include_subcategories: bool = False  # category_id вместе со всеми подкатегориями
+    is_published: bool | None = None
+    manufacturer: str | None = None
+
+
+class ProductBulkAction(BaseModel):
+    """Массовая операция над товарами: по списку ids или по фильтру."""
+
+    operation: Literal["publish", "unpublish", "reprice", "recategorize", "delete"]
+    ids: list[UUID] | None = None
+    filter: ProductFilter | None = None
+    # reprice: новая цена или изменение в процентах (+10, -15); цена не может стать нулевой или отрицательной
+    price_amount: Decimal | None = Field(default=None, ge=0, lt=Decimal("1e12"))
+    price_percent: Decimal | None = Field(default=None, gt=-100, le=1000)
+    # recategorize: новая категория (null — без категории)
+    category_id: UUID | None = None
+
+
 class CategoryCreate(BaseModel):
     """Создание категории."""
 
     name: str
     slug: str
-    sort_order: int = 0
+    sort_order: float = 0
     parent_id: UUID | None = None
 
 
@@ -69,7 +93,7 @@ class CategoryUpdate(BaseModel):
 
     name: str | None = None
     slug: str | None = None
-    sort_order: int | None = None
+    sort_order: float | None = None
     parent_id: UUID | None = None
 
 
@@ -79,8 +103,7 @@ class VariantCreate(BaseModel):
     option_name: str
     option_value: str
     stock_qty: int = 0
-    in_order_qty: int = 0
-    sort_order: int = 0
+    sort_order: float = 0
 
 
 class VariantUpdate(BaseModel):
@@ -89,8 +112,7 @@ class VariantUpdate(BaseModel):
     option_name: str | None = None
     option_value: str | None = None
     stock_qty: int | None = None
-    in_order_qty: int | None = None
-    sort_order: int | None = None
+    sort_order: float | None = None
 
 
 class SpecCreate(BaseModel):
@@ -99,7 +121,7 @@ class SpecCreate(BaseModel):
     name: str
     value: str
     unit: str | None = None
-    sort_order: int = 0
+    sort_order: float = 0
 
 
 class SpecUpdate(BaseModel):
@@ -108,13 +130,56 @@ class SpecUpdate(BaseModel):
     name: str | None = None
     value: str | None = None
     unit: str | None = None
-    sort_order: int | None = None
+    sort_order: float | None = None
+
+
+class SpecItem(BaseModel):
+    """ТТХ в полном списке: без id — создать, с id — обновить."""
+
+    id: UUID | None = None
+    name: str
+    value: str
+    unit: str | None = None
+    sort_order: float | None = None
+
+
+class VariantItem(BaseModel):
+    """Вариант в полном списке: без id — создать, с id — обновить."""
+
+    id: UUID | None = None
+    option_name: str
+    option_value: str
+    stock_qty: int = 0
+    sort_order: float | None = None
 
 
 class ImageSortUpdate(BaseModel):
     """Обновление порядка изображения."""
 
-    sort_order: int
+    sort_order: float
+
+
+class MoveRequest(BaseModel):
+    """Перемещение элемента: встать сразу после after_id (null — в начало)."""
+
+    after_id: UUID | None = None
+
+
+class ReorderRequest(BaseModel):
+    """Новый порядок всей коллекции — все id в нужной последовательности."""
+
+    ids: list[UUID]
+
+
+class ProductImportResult(BaseModel):
+    """Отчёт массового импорта товаров."""
+
+    processed: int = 0
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    dry_run: bool = False
+    errors: list[str] = []
 
 
 class SettingsResponse(BaseModel):
@@ -14,7 +14,7 @@ class ProductImageOut(BaseModel):
 
     id: UUID
     alt: str | None = None
-    sort_order: int
+    sort_order: float
     url: str  # /api/files/{id}
 
 
@@ -25,7 +25,7 @@ class ProductAttachmentOut(BaseModel):
 
     id: UUID
     title: str
-    sort_order: int
+    sort_order: float
     url: str  # /api/files/{id}
     mime: str | None = None
     size_bytes: int | None = None
@@ -40,7 +40,7 @@ class ProductSpecOut(BaseModel):
     name: str
     value: str
     unit: str | None = None
-    sort_order: int
+    sort_order: float
 
 
 class ProductListItem(BaseModel):
@@ -0,0 +1,27 @@
+"""
+Схемы API резервирования остатков.
+"""
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+
+class ReservationCreate(BaseModel):
+    """Удержание остатка варианта; повтор с тем же ключом возвращает тот же резерв."""
+
+    idempotency_key: str = Field(min_length=1, max_length=128)
+    variant_id: UUID
+    qty: int = Field(gt=0)
+    ttl_seconds: int | None = Field(default=None, gt=0)
+
+
+class ReservationResponse(BaseModel):
+    """Состояние резерва; available — свободный остаток варианта после операции (если она что-то изменила)."""
+
+    id: UUID
+    idempotency_key: str
+    variant_id: UUID
+    qty: int
+    status: str
+    expires_at: str
+    available: int | None = None
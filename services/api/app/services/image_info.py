@@ -0,0 +1,67 @@
+"""
+Определение формата и размеров изображения по заголовку файла (JPEG, PNG, WebP).
+Читает только служебные блоки в начале файла — без декодирования и внешних библиотек.
+"""
+import struct
+from typing import BinaryIO
+
+# Маркеры JPEG SOFn (кроме DHT, JPG, DAC), в которых лежат размеры кадра
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _probe_jpeg(f: BinaryIO) -> tuple[int, int] | None:
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            return None
+        marker = f.read(1)
+        while marker == b"\xff":  # заполняющие байты
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code == 0x01 or 0xD0 <= code <= 0xD8:  # маркеры без длины
+            continue
+        if code in (0xD9, 0xDA):  # конец файла / начало данных без SOF
+            return None
+        length_bytes = f.read(2)
+        if len(length_bytes) != 2:
+            return None
+        (length,) = struct.unpack(">H", length_bytes)
+        if code in _JPEG_SOF:
+            data = f.read(5)
+            if len(data) != 5:
+                return None
+            height, width = struct.unpack(">xHH", data)
+            return width, height
+        f.seek(length - 2, 1)
+
+
+def probe_image(f: BinaryIO) -> tuple[str, int, int] | None:
+    """
+    Определить (mime, width, height) по сигнатуре файла.
+    None — не JPEG/PNG/WebP или заголовок повреждён. Позиция в файле не сохраняется.
+    """
+    f.seek(0)
+    head = f.read(32)
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR" and len(head) >= 24:
+        width, height = struct.unpack(">II", head[16:24])
+        return "image/png", width, height
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP" and len(head) >= 30:
+        chunk = head[12:16]
+        if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+            width, height = struct.unpack("<HH", head[26:30])
+            return "image/webp", width & 0x3FFF, height & 0x3FFF
+        if chunk == b"VP8L" and head[20] == 0x2F:
+            bits = int.from_bytes(head[21:25], "little")
+            return "image/webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            return "image/webp", int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+        return None
+    if head[:2] == b"\xff\xd8":
+        size = _probe_jpeg(f)
+        return ("image/jpeg", *size) if size else None
+    return None
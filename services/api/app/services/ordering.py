@@ -0,0 +1,219 @@
+"""
+Порядок элементов с дробными ключами sort_order (double precision).
+
+- move_item: элемент встаёт между соседями, новый ключ — середина интервала,
+  изменяется ровно одна строка;
+- apply_order: новый порядок всей коллекции одним UPDATE ... FROM (VALUES ...);
+- rebalance: периодическое выравнивание ключей там, где интервалы между соседями измельчали
+  после многих перемещений. Переписываются только «тесные» участки [k, k + 1) внутри
+  коллекции, остальные строки не меняются.
+"""
+import asyncio
+import logging
+from uuid import UUID
+
+from sqlalchemy import Float, and_, column, func, select, text, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import async_session_maker
+from app.models.product import (
+    Product,
+    ProductAttachment,
+    ProductCategory,
+    ProductImage,
+    ProductSpec,
+    ProductVariant,
+)
+
+logger = logging.getLogger(__name__)
+
+# Коллекции товара, доступные для сортировки: сегмент URL -> модель
+PRODUCT_COLLECTIONS = {
+    "images": ProductImage,
+    "attachments": ProductAttachment,
+    "specs": ProductSpec,
+    "variants": ProductVariant,
+}
+# Минимальный интервал между соседями; меньше — сначала перенумеровать коллекцию
+MIN_GAP = 1e-6
+REBALANCE_INTERVAL_SECONDS = 6 * 60 * 60
+# Участок выравнивается, если минимальный интервал в нём меньше равномерного в REBALANCE_SLACK раз
+REBALANCE_SLACK = 1024
+# Ключ advisory-lock: выравнивание выполняет один воркер за раз
+REBALANCE_LOCK_KEY = 4_100_033
+
+
+class OrderingError(ValueError):
+    """Элементы не принадлежат коллекции или список неполный."""
+
+
+async def _renumber(db: AsyncSession, model, scope: list) -> None:
+    """Перенумеровать коллекцию 0, 1, 2, ... с сохранением порядка."""
+    ranked = (
+        select(model.id, (func.row_number().over(order_by=(model.sort_order, model.id)) - 1).label("pos"))
+        .where(*scope)
+        .subquery()
+    )
+    await db.execute(
+        update(model)
+        .where(model.id == ranked.c.id, model.sort_order != ranked.c.pos)
+        .values(sort_order=ranked.c.pos)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def move_item(db: AsyncSession, model, item_id: UUID, after_id: UUID | None, scope: list) -> float:
+    """
+    Поставить элемент сразу после after_id (None — в начало коллекции).
+    Возвращает новый sort_order. Обычно меняется одна строка.
+    """
+    if after_id == item_id:
+        raise OrderingError("after_id must differ from the moved item")
+    for _ in range(2):
+        if after_id is not None:
+            prev_key = (await db.execute(select(model.sort_order).where(model.id == after_id, *scope))).scalar()
+            if prev_key is None:
+                raise OrderingError("after_id not found in collection")
+            next_stmt = select(func.min(model.sort_order)).where(
+                *scope,
+                model.id != item_id,
+                model.id != after_id,
+                # Соседи с тем же ключом упорядочены по id (как в _renumber)
+                (model.sort_order > prev_key) | and_(model.sort_order == prev_key, model.id > after_id),
+            )
+        else:
+            prev_key = None
+            next_stmt = select(func.min(model.sort_order)).where(*scope, model.id != item_id)
+        next_key = (await db.execute(next_stmt)).scalar()
+
+        if prev_key is None and next_key is None:
+            new_key = 0.0
+        elif prev_key is None:
+            new_key = next_key - 1
+        elif next_key is None:
+            new_key = prev_key + 1
+        elif next_key - prev_key > MIN_GAP:
+            new_key = (prev_key + next_key) / 2
+        else:
+            # Интервал исчерпан (или ключи совпадают) — перенумеровать и повторить
+            await _renumber(db, model, scope)
+            continue
+
+        result = await db.execute(
+            update(model)
+            .where(model.id == item_id, *scope)
+            .values(sort_order=new_key)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            raise OrderingError("Item not found in collection")
+        return new_key
+    raise OrderingError("Could not compute position")
+
+
+async def apply_order(db: AsyncSession, model, ids: list[UUID], scope: list) -> int:
+    """
+    Применить новый порядок коллекции одним UPDATE: ids[i] получает sort_order = i.
+    Список должен содержать все элементы коллекции ровно по одному разу.
+    """
+    if len(set(ids)) != len(ids):
+        raise OrderingError("Duplicate ids")
+    total = (await db.execute(select(func.count()).select_from(model).where(*scope))).scalar()
+    if total != len(ids):
+        raise OrderingError("ids must list every item of the collection")
+    if not ids:
+        return 0
+    positions = values(
+        column("id", PG_UUID(as_uuid=True)),
+        column("pos", Float),
+        name="o",
+    ).data([(item_id, float(i)) for i, item_id in enumerate(ids)])
+    result = await db.execute(
+        update(model)
+        .where(model.id == positions.c.id, *scope)
+        .values(sort_order=positions.c.pos)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(ids):
+        raise OrderingError("ids must list every item of the collection")
+    return result.rowcount
+
+
+# --- Периодическая перенумерация ---
+# таблица -> колонка-владелец коллекции (None — одна коллекция на таблицу)
+_REBALANCE_TABLES = {
+    Product.__tablename__: None,
+    ProductCategory.__tablename__: None,
+    ProductImage.__tablename__: "product_id",
+    ProductAttachment.__tablename__: "product_id",
+    ProductSpec.__tablename__: "product_id",
+    ProductVariant.__tablename__: "product_id",
+}
+
+
+async def rebalance_all() -> int:
+    """
+    Выровнять тесные участки коллекций. Возвращает число изменённых строк.
+
+    Участок — строки одной коллекции с общим floor(sort_order). Если интервал между соседями
+    в нём стал меньше равномерного (1 / n) в REBALANCE_SLACK раз, ключи участка
+    распределяются равномерно: floor + i / n. Порядок сохраняется (участки не пересекаются),
+    целые ключи и все прочие строки не меняются — одно перемещение не переписывает таблицу.
+    """
+    changed = 0
+    async with async_session_maker() as db:
+        locked = (
+            await db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": REBALANCE_LOCK_KEY})
+        ).scalar()
+        if not locked:
+            logger.debug("Sort order rebalance is running in another worker")
+            return 0
+        for table, owner in _REBALANCE_TABLES.items():
+            # Участок: (владелец коллекции, floor(sort_order)); у товаров и категорий одна коллекция
+            segment = f"{owner}, floor(sort_order)" if owner else "floor(sort_order)"
+            owner_column = f"{owner}, " if owner else ""
+            result = await db.execute(
+                text(
+                    f"""
+                    UPDATE {table} AS t SET sort_order = r.new_key
+                    FROM (
+                        SELECT id,
+                               floor(sort_order) + (row_number() OVER w - 1)::float8 / count(*) OVER w AS new_key,
+                               min(gap) OVER w AS min_gap,
+                               count(*) OVER w AS n
+                        FROM (
+                            SELECT id, sort_order, {owner_column}
+                                   sort_order - lag(sort_order) OVER (PARTITION BY {segment} ORDER BY sort_order, id) AS gap
+                            FROM {table}
+                            WHERE ({segment}) IN (
+                                SELECT {segment} FROM {table} WHERE sort_order <> floor(sort_order)
+                            )
+                        ) AS g
+                        WINDOW w AS (
+                            PARTITION BY {segment} ORDER BY sort_order, id
+                            ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+                        )
+                    ) AS r
+                    WHERE t.id = r.id
+                      AND r.min_gap < 1.0 / (r.n * :slack)
+                      AND t.sort_order <> r.new_key
+                    """
+                ),
+                {"slack": REBALANCE_SLACK},
+            )
+            changed += result.rowcount
+        await db.commit()
+    if changed:
+        logger.info("Sort order rebalanced: %d rows", changed)
+    return changed
+
+
+async def run_rebalance_worker() -> None:
+    """Фоновая задача процесса: перенумерация раз в REBALANCE_INTERVAL_SECONDS."""
+    while True:
+        await asyncio.sleep(REBALANCE_INTERVAL_SECONDS)
+        try:
+            await rebalance_all()
+        except Exception:
+            logger.exception("Sort order rebalance failed")
@@ -0,0 +1,175 @@
+"""
+Копирование товара на сервере: строки — пакетными INSERT ... SELECT, файлы — жёсткими ссылками.
+
+Число запросов не зависит от количества ТТХ, вариантов и файлов; файлы не перечитываются
+и не занимают места на диске (см. LocalStorageDriver.copy).
+"""
+import logging
+import re
+import uuid
+from uuid import UUID
+
+from sqlalchemy import String, column, func, insert, literal, select, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product import (
+    SYSTEM_PRODUCT_SLUG,
+    Product,
+    ProductAttachment,
+    ProductImage,
+    ProductSpec,
+    ProductVariant,
+)
+from app.storage.local import get_storage
+
+logger = logging.getLogger(__name__)
+
+CLONE_TITLE_SUFFIX = " (копия)"
+SLUG_MAX_LEN = 255  # products.slug
+# Попытки занять slug, если параллельная копия успела взять тот же
+CLONE_SLUG_ATTEMPTS = 3
+
+
+class CloneError(LookupError):
+    """Исходный товар не найден."""
+
+
+class CloneConflict(Exception):
+    """Не удалось занять свободный slug: параллельные копии того же товара."""
+
+
+async def _free_slug(db: AsyncSession, slug: str) -> str:
+    """slug-copy, slug-copy-2, ... — первый свободный (один запрос), не длиннее колонки."""
+    # Запас под «-copy» и номер копии
+    base = f"{slug[: SLUG_MAX_LEN - len('-copy') - 8].rstrip('-')}-copy"
+    taken = set(
+        (await db.execute(select(Product.slug).where(Product.slug.like(f"{base}%")))).scalars().all()
+    )
+    if base not in taken:
+        return base
+    n = 2
+    while f"{base}-{n}" in taken:
+        n += 1
+    return f"{base}-{n}"
+
+
+async def _clone_files(db: AsyncSession, model, kind: str, columns: tuple[str, ...], src_id: UUID, new_id: UUID) -> list[tuple[str, str]]:
+    """
+    Скопировать строки файлов (images/attachments) одним INSERT ... SELECT
+    через таблицу соответствий (old_id, new_id, new_path). Возвращает пары путей (старый, новый).
+    """
+    rows = (await db.execute(select(model.id, model.file_path).where(model.product_id == src_id))).all()
+    if not rows:
+        return []
+    mapping = []
+    for old_id, old_path in rows:
+        file_id = uuid.uuid4()
+        m = re.search(r"\.[^./]*$", old_path)
+        mapping.append((old_id, file_id, f"products/{new_id}/{kind}/{file_id}{m.group(0) if m else ''}"))
+    pairs = values(
+        column("old_id", PG_UUID(as_uuid=True)),
+        column("new_id", PG_UUID(as_uuid=True)),
+        column("new_path", String),
+        name="m",
+    ).data(mapping)
+    table = model.__table__
+    await db.execute(
+        insert(model).from_select(
+            ["id", "product_id", "file_path", *columns],
+            select(pairs.c.new_id, literal(new_id, PG_UUID(as_uuid=True)), pairs.c.new_path, *(table.c[c] for c in columns))
+            .join(pairs, pairs.c.old_id == model.id),
+        )
+    )
+    old_paths = dict(rows)
+    return [(old_paths[old_id], new_path) for old_id, _, new_path in mapping]
+
+
+async def _insert_product(db: AsyncSession, src_id: UUID, new_id: UUID, new_slug: str) -> None:
+    """Строка товара-копии одним INSERT ... SELECT."""
+    await db.execute(
+        insert(Product).from_select(
+            [
+                "id", "slug", "title", "sku", "manufacturer", "category_id", "view_count",
+                "short_description", "description", "price_amount", "price_currency",
+                "is_published", "sort_order", "hashtags", "created_at", "updated_at",
+            ],
+            select(
+                literal(new_id, PG_UUID(as_uuid=True)),
+                literal(new_slug),
+                func.left(Product.title + CLONE_TITLE_SUFFIX, 512),
+                literal(None, String),
+                Product.manufacturer,
+                Product.category_id,
+                literal(0),
+                Product.short_description,
+                Product.description,
+                Product.price_amount,
+                Product.price_currency,
+                literal(False),
+                Product.sort_order,
+                Product.hashtags,
+                func.now(),
+                func.now(),
+            ).where(Product.id == src_id),
+        )
+    )
+
+
+async def clone_product(db: AsyncSession, src_id: UUID) -> dict:
+    """
+    Создать копию товара (снят с публикации, без артикула и просмотров) со всеми
+    ТТХ, вариантами, фото и файлами и зафиксировать транзакцию.
+    Возвращает {"id", "slug"} новой карточки.
+    """
+    src_slug = (
+        await db.execute(select(Product.slug).where(Product.id == src_id, Product.slug != SYSTEM_PRODUCT_SLUG))
+    ).scalar()
+    if src_slug is None:
+        raise CloneError("Product not found")
+    new_id = uuid.uuid4()
+    for attempt in range(CLONE_SLUG_ATTEMPTS):
+        new_slug = await _free_slug(db, src_slug)
+        try:
+            # Точка сохранения: при занятом slug откатывается только эта вставка
+            async with db.begin_nested():
+                await _insert_product(db, src_id, new_id, new_slug)
+            break
+        except IntegrityError:
+            logger.info("Clone %s: slug %s taken concurrently (attempt %d)", src_id, new_slug, attempt + 1)
+    else:
+        raise CloneConflict("Could not allocate a free slug, retry")
+
+    for model, cols in (
+        (ProductSpec, ("name", "value", "unit", "sort_order")),
+        (ProductVariant, ("option_name", "option_value", "stock_qty", "sort_order")),
+    ):
+        table = model.__table__
+        await db.execute(
+            insert(model).from_select(
+                ["id", "product_id", *cols],
+                select(func.gen_random_uuid(), literal(new_id, PG_UUID(as_uuid=True)), *(table.c[c] for c in cols))
+                .where(model.product_id == src_id),
+            )
+        )
+
+    copies = await _clone_files(db, ProductImage, "images", ("alt", "sort_order", "width", "height", "mime", "size_bytes"), src_id, new_id)
+    copies += await _clone_files(db, ProductAttachment, "attachments", ("title", "mime", "size_bytes", "sort_order"), src_id, new_id)
+
+    storage = get_storage()
+    done: list[str] = []
+    try:
+        for old_path, new_path in copies:
+            if await storage.copy(old_path, new_path):
+                done.append(new_path)
+            else:
+                logger.warning("Clone %s: source file missing: %s", src_id, old_path)
+        # Коммит здесь, а не в get_db: при его ошибке копии файлов ещё можно убрать
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        for path in done:
+            await storage.delete(path)
+        raise
+    return {"id": str(new_id), "slug": new_slug}
@@ -0,0 +1,102 @@
+"""
+Замена вложенных коллекций товара (ТТХ, варианты) целиком.
+
+Клиент присылает желаемый список; сервер сравнивает его с текущими строками и
+применяет разницу тремя пакетными запросами в одной транзакции:
+DELETE ... WHERE id IN (...), UPDATE ... FROM (VALUES ...) и INSERT (executemany).
+Элементы без id создаются, с id — обновляются (только если что-то изменилось),
+отсутствующие в списке — удаляются. Варианты с активными удержаниями остатка не удаляются
+(CollectionReplaceError): их резервы ушли бы каскадом вместе со строкой.
+"""
+import uuid
+from uuid import UUID
+
+from sqlalchemy import column, delete, insert, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product import Product, ProductVariant
+from app.services.stock import variants_with_holds
+
+
+class CollectionReplaceError(ValueError):
+    """id элемента не принадлежит товару или повторяется."""
+
+
+class ProductNotFoundError(CollectionReplaceError):
+    """Товар не найден."""
+
+
+async def replace_collection(
+    db: AsyncSession,
+    model,
+    product_id: UUID,
+    items: list[dict],
+    fields: tuple[str, ...],
+) -> dict:
+    """
+    Привести коллекцию товара к списку items (dict с ключами fields и необязательным id).
+    sort_order, если не задан, берётся из позиции в списке.
+    Возвращает {"created", "updated", "deleted", "ids"} — ids в порядке items.
+    """
+    # Блокировка товара: параллельные замены одной коллекции выполняются по очереди
+    exists = (await db.execute(select(Product.id).where(Product.id == product_id).with_for_update())).scalar()
+    if exists is None:
+        raise ProductNotFoundError("Product not found")
+
+    table = model.__table__
+    result = await db.execute(select(model.id, *(table.c[f] for f in fields)).where(model.product_id == product_id))
+    current = {row.id: tuple(getattr(row, f) for f in fields) for row in result}
+
+    to_insert: list[dict] = []
+    to_update: list[tuple] = []
+    seen: set[UUID] = set()
+    ids: list[UUID] = []
+    for i, item in enumerate(items):
+        data = {f: item.get(f) for f in fields}
+        if data.get("sort_order") is None:
+            data["sort_order"] = float(i)
+        item_id = item.get("id")
+        if item_id is None:
+            item_id = uuid.uuid4()
+            to_insert.append({"id": item_id, "product_id": product_id, **data})
+        else:
+            if item_id not in current:
+                raise CollectionReplaceError(f"Item {item_id} does not belong to product")
+            if item_id in seen:
+                raise CollectionReplaceError(f"Duplicate item {item_id}")
+            row = tuple(data[f] for f in fields)
+            if row != current[item_id]:
+                to_update.append((item_id, *row))
+        seen.add(item_id)
+        ids.append(item_id)
+
+    to_delete = [item_id for item_id in current if item_id not in seen]
+    if model is ProductVariant:
+        held = await variants_with_holds(db, to_delete)
+        if held:
+            raise CollectionReplaceError(f"Variant {next(iter(held))} has held reservations")
+    if to_delete:
+        await db.execute(
+            delete(model).where(model.id.in_(to_delete)).execution_options(synchronize_session=False)
+        )
+    if to_update:
+        changes = values(
+            column("id", table.c.id.type),
+            *(column(f, table.c[f].type) for f in fields),
+            name="v",
+        ).data(to_update)
+        await db.execute(
+            update(model)
+            .where(model.id == changes.c.id)
+            .values({f: changes.c[f] for f in fields})
+            .execution_options(synchronize_session=False)
+        )
+    if to_insert:
+        await db.execute(insert(model), to_insert)
+
+    return {
+        "created": len(to_insert),
+        "updated": len(to_update),
+        "deleted": len(to_delete),
+        "ids": [str(i) for i in ids],
+    }
@@ -0,0 +1,307 @@
+"""
+Потоковая выгрузка каталога: CSV, NDJSON и YML-фид для маркетплейсов.
+
+Товары читаются серверным курсором (stream + yield_per) пачками по EXPORT_FETCH_SIZE,
+ТТХ, варианты и первое фото подтягиваются в том же запросе (коррелированные подзапросы),
+поэтому потребление памяти не зависит от размера каталога.
+Колонки CSV совпадают с форматом импорта (см. app/services/product_import.py).
+"""
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Iterable
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape, quoteattr
+
+from sqlalchemy import JSON, Select, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.engine import Row
+
+from app.config import get_settings
+from app.db import async_session_maker
+from app.models.product import (
+    SYSTEM_PRODUCT_SLUG,
+    Product,
+    ProductCategory,
+    ProductImage,
+    ProductSpec,
+    ProductVariant,
+)
+from app.services.product_import import escape_cell
+from app.services.runtime_settings import runtime_settings
+
+# Строк, забираемых с сервера за один раз (и объём одного блока ответа)
+EXPORT_FETCH_SIZE = 1000
+
+# формат -> (Content-Type, имя файла)
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "products.csv"),
+    "ndjson": ("application/x-ndjson", "products.ndjson"),
+    "yml": ("application/xml; charset=utf-8", "products.yml"),
+}
+
+CSV_COLUMNS = [
+    "slug",
+    "sku",
+    "title",
+    "manufacturer",
+    "category",
+    "short_description",
+    "description",
+    "price_amount",
+    "price_currency",
+    "is_published",
+    "sort_order",
+    "hashtags",
+    "specs",
+    "variants",
+]
+
+
+def _export_stmt(is_published: bool | None) -> Select:
+    """Один запрос: товар + категория + первое фото + ТТХ и варианты в JSON."""
+    specs = (
+        select(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object("name", ProductSpec.name, "value", ProductSpec.value, "unit", ProductSpec.unit),
+                    ProductSpec.sort_order,
+                ),
+                type_=JSON,
+            )
+        )
+        .where(ProductSpec.product_id == Product.id)
+        .scalar_subquery()
+    )
+    variants = (
+        select(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        "option_name", ProductVariant.option_name,
+                        "option_value", ProductVariant.option_value,
+                        "stock_qty", ProductVariant.stock_qty,
+                        "in_order_qty", ProductVariant.in_order_qty,
+                    ),
+                    ProductVariant.sort_order,
+                ),
+                type_=JSON,
+            )
+        )
+        .where(ProductVariant.product_id == Product.id)
+        .scalar_subquery()
+    )
+    first_image = (
+        select(ProductImage.id)
+        .where(ProductImage.product_id == Product.id)
+        .order_by(ProductImage.sort_order)
+        .limit(1)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(
+            Product.id,
+            Product.slug,
+            Product.sku,
+            Product.title,
+            Product.manufacturer,
+            Product.category_id,
+            ProductCategory.name.label("category"),
+            Product.short_description,
+            Product.description,
+            Product.price_amount,
+            Product.price_currency,
+            Product.is_published,
+            Product.sort_order,
+            Product.view_count,
+            Product.hashtags,
+            first_image.label("image_id"),
+            specs.label("specs"),
+            variants.label("variants"),
+        )
+        .outerjoin(ProductCategory, ProductCategory.id == Product.category_id)
+        .where(Product.slug != SYSTEM_PRODUCT_SLUG)  # служебный товар не выгружается
+        .order_by(Product.sort_order, Product.created_at.desc())
+    )
+    if is_published is not None:
+        stmt = stmt.where(Product.is_published == is_published)
+    return stmt
+
+
+async def _stream_partitions(is_published: bool | None) -> AsyncIterator[list[Row]]:
+    """Пачки строк из серверного курсора (своя сессия — живёт всё время отдачи ответа)."""
+    async with async_session_maker() as db:
+        stmt = _export_stmt(is_published).execution_options(yield_per=EXPORT_FETCH_SIZE)
+        result = await db.stream(stmt)
+        async for partition in result.partitions():
+            yield partition
+
+
+def _file_url(file_id) -> str:
+    return f"{get_settings().public_base_url.rstrip('/')}/api/files/{file_id}"
+
+
+def _specs_cell(specs: list[dict] | None) -> str:
+    """ТТХ в формате импорта: «Название=Значение|Ед.; ...» (разделители в значениях экранированы)."""
+    return "; ".join(
+        f"{escape_cell(s['name'], ';=')}={escape_cell(s['value'], ';|')}"
+        + (f"|{escape_cell(s['unit'], ';')}" if s["unit"] else "")
+        for s in specs or []
+    )
+
+
+def _variants_cell(variants: list[dict] | None) -> str:
+    """Варианты в формате импорта: «Опция:Значение=Остаток; ...» (разделители в значениях экранированы)."""
+    return "; ".join(
+        f"{escape_cell(v['option_name'], ';:=')}:{escape_cell(v['option_value'], ';=')}={v['stock_qty']}"
+        for v in variants or []
+    )
+
+
+# --- CSV ---
+async def export_csv(is_published: bool | None = None) -> AsyncIterator[str]:
+    """CSV (UTF-8 с BOM — корректно открывается в Excel)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_COLUMNS)
+    yield "\ufeff" + buf.getvalue()
+    async for partition in _stream_partitions(is_published):
+        buf.seek(0)
+        buf.truncate()
+        for r in partition:
+            writer.writerow(
+                [
+                    r.slug,
+                    r.sku or "",
+                    r.title,
+                    r.manufacturer or "",
+                    r.category or "",
+                    r.short_description or "",
+                    r.description or "",
+                    "" if r.price_amount is None else str(r.price_amount),
+                    r.price_currency or "",
+                    "1" if r.is_published else "0",
+                    r.sort_order,
+                    r.hashtags or "",
+                    _specs_cell(r.specs),
+                    _variants_cell(r.variants),
+                ]
+            )
+        yield buf.getvalue()
+
+
+# --- NDJSON ---
+def _json_default(value):
+    """UUID и Decimal — строками (без потери точности цены)."""
+    return str(value)
+
+
+async def export_ndjson(is_published: bool | None = None) -> AsyncIterator[str]:
+    """JSON Lines: один товар — одна строка."""
+    async for partition in _stream_partitions(is_published):
+        lines = []
+        for r in partition:
+            item = {
+                "id": r.id,
+                "slug": r.slug,
+                "sku": r.sku,
+                "title": r.title,
+                "manufacturer": r.manufacturer,
+                "category_id": r.category_id,
+                "category": r.category,
+                "short_description": r.short_description,
+                "description": r.description,
+                "price_amount": r.price_amount,
+                "price_currency": r.price_currency,
+                "is_published": r.is_published,
+                "sort_order": r.sort_order,
+                "view_count": r.view_count,
+                "hashtags": r.hashtags,
+                "image_url": _file_url(r.image_id) if r.image_id else None,
+                "specs": r.specs or [],
+                "variants": r.variants or [],
+            }
+            lines.append(json.dumps(item, ensure_ascii=False, default=_json_default))
+        yield "\n".join(lines) + "\n"
+
+
+# --- YML (Яндекс Маркет и совместимые площадки) ---
+def _tag(name: str, value) -> str:
+    return f"<{name}>{escape(str(value))}</{name}>" if value not in (None, "") else ""
+
+
+def _yml_header(categories: Iterable[tuple], currencies: Iterable[str]) -> str:
+    s = runtime_settings.current()
+    # Базовая валюта — RUB (rate="1"), остальные по курсу ЦБ РФ
+    extra = sorted(set(currencies) - {"RUB"})
+    currency_tags = '<currency id="RUB" rate="1"/>' + "".join(
+        f"<currency id={quoteattr(c)} rate=\"CBRF\"/>" for c in extra
+    )
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M%z")
+    cats = "".join(
+        f"<category id={quoteattr(str(cid))}"
+        + (f" parentId={quoteattr(str(parent_id))}" if parent_id else "")
+        + f">{escape(name)}</category>\n"
+        for cid, name, parent_id in categories
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f"<yml_catalog date={quoteattr(now)}>\n<shop>\n"
+        f"{_tag('name', s.miniapp_section_title)}\n"
+        f"{_tag('url', s.public_base_url)}\n"
+        f"<currencies>{currency_tags}</currencies>\n"
+        f"<categories>\n{cats}</categories>\n<offers>\n"
+    )
+
+
+def _yml_offer(r: Row) -> str:
+    base = get_settings().public_base_url.rstrip("/")
+    params = "".join(
+        f"<param name={quoteattr(sp['name'])}" + (f" unit={quoteattr(sp['unit'])}" if sp["unit"] else "") + f">{escape(sp['value'])}</param>"
+        for sp in r.specs or []
+    )
+    return (
+        f"<offer id={quoteattr(str(r.id))} available=\"{'true' if r.is_published else 'false'}\">"
+        f"{_tag('name', r.title)}"
+        f"{_tag('url', f'{base}/miniapp/product/{r.slug}')}"
+        f"{_tag('price', r.price_amount)}"
+        f"{_tag('currencyId', r.price_currency or 'RUB')}"
+        f"{_tag('categoryId', r.category_id)}"
+        f"{_tag('picture', _file_url(r.image_id) if r.image_id else None)}"
+        f"{_tag('vendor', r.manufacturer)}"
+        f"{_tag('vendorCode', r.sku)}"
+        f"{_tag('description', r.short_description or r.description)}"
+        f"{params}</offer>\n"
+    )
+
+
+async def export_yml(is_published: bool | None = None) -> AsyncIterator[str]:
+    """YML-фид: шапка с категориями, затем офферы потоком."""
+    async with async_session_maker() as db:
+        result = await db.execute(
+            select(ProductCategory.id, ProductCategory.name, ProductCategory.parent_id).order_by(ProductCategory.sort_order, ProductCategory.name)
+        )
+        categories = result.all()
+        # Все валюты офферов должны быть объявлены в шапке
+        currency_stmt = (
+            select(func.coalesce(Product.price_currency, "RUB")).where(Product.slug != SYSTEM_PRODUCT_SLUG).distinct()
+        )
+        if is_published is not None:
+            currency_stmt = currency_stmt.where(Product.is_published == is_published)
+        currencies = (await db.execute(currency_stmt)).scalars().all()
+    yield _yml_header(categories, currencies)
+    async for partition in _stream_partitions(is_published):
+        yield "".join(_yml_offer(r) for r in partition)
+    yield "</offers>\n</shop>\n</yml_catalog>\n"
+
+
+EXPORTERS = {
+    "csv": export_csv,
+    "ndjson": export_ndjson,
+    "yml": export_yml,
+}
+
+
+def export_products(fmt: str, is_published: bool | None = None) -> AsyncIterator[str]:
+    """Асинхронный итератор блоков выгрузки в нужном формате."""
+    return EXPORTERS[fmt](is_published)
@@ -0,0 +1,575 @@
+"""
+Массовый импорт товаров из CSV/XLSX.
+
+Файл читается построчно (csv / openpyxl read_only) и обрабатывается пачками:
+- категории — INSERT ... ON CONFLICT (slug) DO NOTHING;
+- товары — INSERT ... ON CONFLICT (slug) DO UPDATE (upsert по slug, при пустом slug — по sku;
+  без совпадения — новый товар с незанятым slug);
+- ТТХ — замена набора: один DELETE и один пакетный INSERT на пачку;
+- варианты — сопоставление с текущими по (опция, значение): остаток и порядок обновляются
+  на месте, новые вставляются, лишние удаляются (кроме вариантов с активными удержаниями).
+  in_order_qty импортом не меняется — им управляет только app/services/stock.py.
+
+Колонки (первая строка — заголовок, регистр не важен):
+slug, sku, title, manufacturer, category, short_description, description,
+price_amount (или price), price_currency, is_published, sort_order, hashtags,
+specs — «Название=Значение|Ед.; ...», variants — «Опция:Значение=Остаток; ...»
+(разделитель внутри значения экранируется обратной косой чертой: «Размер:10\\;12=5»).
+Обновляются только колонки, присутствующие в файле.
+"""
+import asyncio
+import csv
+import io
+import itertools
+import logging
+import math
+import re
+import uuid
+from collections.abc import Awaitable, Callable, Iterator
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import BinaryIO
+
+from sqlalchemy import column, delete, insert, select, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product import Product, ProductCategory, ProductSpec, ProductVariant
+from app.schemas.admin import ProductImportResult
+from app.services.stock import variants_with_holds
+
+logger = logging.getLogger(__name__)
+
+# Строк в одной пачке (≈15 параметров на строку — с запасом до лимита asyncpg в 32767)
+IMPORT_BATCH_SIZE = 500
+# Сколько ошибок валидации возвращать в отчёте
+MAX_REPORTED_ERRORS = 100
+
+# Простые колонки товара: имя в файле -> поле модели
+PRODUCT_COLUMNS = {
+    "slug": "slug",
+    "sku": "sku",
+    "title": "title",
+    "manufacturer": "manufacturer",
+    "short_description": "short_description",
+    "description": "description",
+    "price_amount": "price_amount",
+    "price": "price_amount",
+    "price_currency": "price_currency",
+    "is_published": "is_published",
+    "sort_order": "sort_order",
+    "hashtags": "hashtags",
+}
+# Ограничения длины строковых полей (по схеме БД)
+MAX_LENGTHS = {"slug": 255, "title": 512, "sku": 64, "manufacturer": 255, "hashtags": 1024}
+# Numeric(14, 2)
+MAX_PRICE = Decimal("1e12")
+# Integer (int4)
+MAX_INT = 2**31 - 1
+TRUE_VALUES = {"1", "true", "yes", "y", "да", "+"}
+FALSE_VALUES = {"", "0", "false", "no", "n", "нет", "-"}
+
+ProgressCallback = Callable[[ProductImportResult], Awaitable[None] | None]
+
+
+class ImportFormatError(ValueError):
+    """Файл не удалось разобрать (формат, заголовок)."""
+
+
+def slugify(s: str) -> str:
+    """Преобразование в slug."""
+    s = s.lower().strip()
+    s = re.sub(r"[^\w\s-]", "", s)
+    s = re.sub(r"[-\s]+", "-", s)
+    return s[:255]
+
+
+# --- Чтение файла ---
+def _normalize_header(header: list) -> list[str]:
+    """Имена колонок: нижний регистр, без пробелов по краям."""
+    return [str(h or "").strip().lower() for h in header]
+
+
+def _row_dict(columns: list[str], values) -> dict[str, str]:
+    """
+    Строка -> {колонка: значение} по всем колонкам заголовка: недостающие ячейки в конце
+    короткой строки — пустые, лишние и колонки без имени отбрасываются.
+    Набор ключей у всех строк одинаковый — пачка пишется по одному набору колонок.
+    """
+    return {
+        c: ("" if v is None else str(v))
+        for c, v in itertools.zip_longest(columns, values[: len(columns)])
+        if c
+    }
+
+
+def iter_csv_rows(file: BinaryIO) -> Iterator[dict[str, str]]:
+    """Построчное чтение CSV (UTF-8, разделитель `,`, `;` или табуляция)."""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        # Разделитель определяем по строке заголовка (Excel в русской локали сохраняет с `;`)
+        first_line = text.readline()
+        text.seek(0)
+        delimiter = max(",;\t", key=first_line.count)
+        reader = csv.reader(text, delimiter=delimiter)
+        header = next(reader, None)
+        if not header:
+            raise ImportFormatError("Empty file")
+        columns = _normalize_header(header)
+        for values in reader:
+            if not any(v.strip() for v in values):
+                continue
+            yield _row_dict(columns, values)
+    except UnicodeDecodeError as e:
+        raise ImportFormatError("CSV must be UTF-8 encoded") from e
+    finally:
+        # Не закрываем исходный файл вместе с обёрткой
+        text.detach()
+
+
+def iter_xlsx_rows(file: BinaryIO) -> Iterator[dict[str, str]]:
+    """Построчное чтение первого листа XLSX (openpyxl в режиме read_only)."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ImportFormatError("XLSX import requires openpyxl") from e
+    try:
+        wb = load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFormatError(f"Invalid XLSX file: {e}") from e
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            raise ImportFormatError("Empty file")
+        columns = _normalize_header(list(header))
+        for values in rows:
+            if all(v is None or str(v).strip() == "" for v in values):
+                continue
+            yield _row_dict(columns, values)
+    finally:
+        wb.close()
+
+
+def iter_rows(file: BinaryIO, filename: str) -> Iterator[dict[str, str]]:
+    """Выбор парсера по расширению файла."""
+    name = filename.lower()
+    if name.endswith(".xlsx"):
+        return iter_xlsx_rows(file)
+    if name.endswith((".csv", ".txt")):
+        return iter_csv_rows(file)
+    raise ImportFormatError("Supported formats: .csv, .xlsx")
+
+
+# --- Разбор строки ---
+def _parse_decimal(value: str) -> Decimal | None:
+    value = value.strip().replace(" ", "").replace(",", ".")
+    if not value:
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"invalid price: {value!r}")
+    if not price.is_finite() or price < 0 or price >= MAX_PRICE:
+        raise ValueError(f"invalid price: {value!r}")
+    return price
+
+
+def _parse_bool(value: str) -> bool:
+    v = value.strip().lower()
+    if v in TRUE_VALUES:
+        return True
+    if v in FALSE_VALUES:
+        return False
+    raise ValueError(f"invalid boolean: {value!r}")
+
+
+def _parse_int(value: str, field: str) -> int:
+    v = value.strip()
+    if not v:
+        return 0
+    try:
+        number = int(float(v))
+    except (ValueError, OverflowError):
+        raise ValueError(f"invalid {field}: {value!r}")
+    if not 0 <= number <= MAX_INT:
+        raise ValueError(f"{field} out of range: {value!r}")
+    return number
+
+
+def _parse_float(value: str, field: str) -> float:
+    v = value.strip().replace(",", ".")
+    if not v:
+        return 0.0
+    try:
+        number = float(v)
+    except ValueError:
+        raise ValueError(f"invalid {field}: {value!r}")
+    if not math.isfinite(number):
+        raise ValueError(f"invalid {field}: {value!r}")
+    return number
+
+
+# Спецсимволы ячеек specs/variants; внутри значения экранируются обратной косой чертой (\;)
+CELL_ESCAPABLE = "\\;=|:"
+_UNESCAPE_RE = re.compile(r"\\([\\;=|:])")
+
+
+def escape_cell(value: str, specials: str) -> str:
+    """Экранировать в значении обратную косую черту и разделители specials (для выгрузки)."""
+    return "".join("\\" + ch if ch == "\\" or ch in specials else ch for ch in value)
+
+
+def _split_cell(value: str, sep: str, maxsplit: int = -1) -> list[str]:
+    """Разбить по неэкранированному sep; части остаются экранированными."""
+    parts, current, i = [], [], 0
+    while i < len(value):
+        ch = value[i]
+        if ch == "\\" and i + 1 < len(value) and value[i + 1] in CELL_ESCAPABLE:
+            current.append(value[i : i + 2])
+            i += 2
+            continue
+        if ch == sep and maxsplit != 0:
+            parts.append("".join(current))
+            current = []
+            maxsplit -= 1
+        else:
+            current.append(ch)
+        i += 1
+    parts.append("".join(current))
+    return parts
+
+
+def _unescape(value: str) -> str:
+    return _UNESCAPE_RE.sub(r"\1", value).strip()
+
+
+def _parse_specs(value: str) -> list[dict]:
+    """«Мощность=100|Вт; Вес=2|кг» -> список ТТХ."""
+    specs = []
+    for i, part in enumerate(p for p in _split_cell(value, ";") if p.strip()):
+        pieces = _split_cell(part, "=", 1)
+        if len(pieces) != 2:
+            raise ValueError(f"invalid spec: {part.strip()!r}")
+        name, rest = pieces
+        val, *unit = _split_cell(rest, "|", 1)
+        name, val, unit = _unescape(name), _unescape(val), _unescape(unit[0]) if unit else ""
+        if not name or not val:
+            raise ValueError(f"invalid spec: {part.strip()!r}")
+        specs.append({"name": name[:255], "value": val[:512], "unit": unit[:64] or None, "sort_order": i})
+    return specs
+
+
+def _parse_variants(value: str) -> list[dict]:
+    """«Цвет:Красный=10; Цвет:Синий=5» -> список вариантов с остатком."""
+    variants = []
+    for i, part in enumerate(p for p in _split_cell(value, ";") if p.strip()):
+        option, *qty = _split_cell(part, "=", 1)
+        pieces = _split_cell(option, ":", 1)
+        if len(pieces) != 2 or not _unescape(pieces[0]) or not _unescape(pieces[1]):
+            raise ValueError(f"invalid variant: {part.strip()!r}")
+        variants.append(
+            {
+                "option_name": _unescape(pieces[0])[:128],
+                "option_value": _unescape(pieces[1])[:255],
+                "stock_qty": _parse_int(qty[0] if qty else "", "variant stock"),
+                "sort_order": i,
+            }
+        )
+    return variants
+
+
+def parse_row(row: dict[str, str]) -> dict:
+    """
+    Проверить и преобразовать строку файла.
+    Возвращает {"product": {...}, "category": str | None, "specs": [...] | None, "variants": [...] | None}.
+    """
+    product: dict = {}
+    for column, field in PRODUCT_COLUMNS.items():
+        if column not in row:
+            continue
+        raw = row[column].strip()
+        if field == "price_amount":
+            product[field] = _parse_decimal(raw)
+        elif field == "is_published":
+            product[field] = _parse_bool(raw)
+        elif field == "sort_order":
+            product[field] = _parse_float(raw, "sort_order")
+        elif field == "price_currency":
+            if raw and len(raw) != 3:
+                raise ValueError(f"invalid currency: {raw!r}")
+            product[field] = raw.upper() or None
+        else:
+            product[field] = raw or None
+
+    if not product.get("title"):
+        raise ValueError("title is required")
+    for field, max_len in MAX_LENGTHS.items():
+        if product.get(field) and len(product[field]) > max_len:
+            raise ValueError(f"{field} is longer than {max_len} characters")
+    if product.get("slug"):
+        product["slug"] = slugify(product["slug"])
+
+    category = row.get("category", "").strip() or None
+    if category and not slugify(category):
+        raise ValueError(f"invalid category: {category!r}")
+    specs = _parse_specs(row["specs"]) if "specs" in row else None
+    variants = _parse_variants(row["variants"]) if "variants" in row else None
+    return {"product": product, "category": category, "specs": specs, "variants": variants}
+
+
+# --- Запись в БД ---
+async def _upsert_categories(db: AsyncSession, names: set[str]) -> dict[str, uuid.UUID]:
+    """
+    Создать недостающие категории; вернуть имя -> id.
+    Категория определяется slug: имена с одинаковым slug («Ножи», «ножи») — одна категория.
+    """
+    if not names:
+        return {}
+    slugs = {n: slugify(n) for n in names}
+    first_name: dict[str, str] = {}
+    for name in sorted(names):
+        first_name.setdefault(slugs[name], name)
+    stmt = pg_insert(ProductCategory).values(
+        [{"id": uuid.uuid4(), "name": name[:255], "slug": slug, "sort_order": 0} for slug, name in first_name.items()]
+    ).on_conflict_do_nothing(index_elements=[ProductCategory.slug])
+    await db.execute(stmt)
+    result = await db.execute(select(ProductCategory.slug, ProductCategory.id).where(ProductCategory.slug.in_(first_name)))
+    ids = dict(result.all())
+    return {name: ids[slug] for name, slug in slugs.items()}
+
+
+def _slug_source(product: dict) -> str:
+    """Из чего генерировать slug: sku (колонки может не быть в файле), иначе title."""
+    return product.get("sku") or product["title"]
+
+
+async def _resolve_slugs(db: AsyncSession, rows: list[dict]) -> None:
+    """
+    Строкам без slug подставить slug существующего товара с тем же sku.
+    Остальным — новый slug из sku/title, не занятый ни в БД, ни в пачке: upsert по slug
+    не должен перезаписать посторонний товар, у которого slug случайно совпал.
+    """
+    skus = {r["product"].get("sku") for r in rows if not r["product"].get("slug")} - {None}
+    existing: dict[str, str] = {}
+    if skus:
+        stmt = select(Product.sku, Product.slug).where(Product.sku.in_(skus)).order_by(Product.created_at)
+        for sku, slug in (await db.execute(stmt)).all():
+            existing.setdefault(sku, slug)
+
+    new_rows = []
+    for r in rows:
+        p = r["product"]
+        if p.get("slug"):
+            continue
+        sku = p.get("sku")
+        if sku and sku in existing:
+            p["slug"] = existing[sku]
+        else:
+            new_rows.append(r)
+    if not new_rows:
+        return
+
+    bases = {_slug_source(r["product"]) for r in new_rows}
+    bases = {b: slugify(b)[:240] or "product" for b in bases}
+    taken = {r["product"]["slug"] for r in rows if r["product"].get("slug")}
+    result = await db.execute(select(Product.slug).where(Product.slug.in_(set(bases.values()))))
+    taken.update(result.scalars().all())
+    by_sku: dict[str, str] = {}  # новый sku, повторённый в пачке, — один товар
+    for r in new_rows:
+        p = r["product"]
+        sku = p.get("sku")
+        if sku and sku in by_sku:
+            p["slug"] = by_sku[sku]
+            continue
+        base = bases[_slug_source(p)]
+        slug = base
+        while slug in taken:
+            slug = f"{base}-{uuid.uuid4().hex[:8]}"
+        taken.add(slug)
+        p["slug"] = slug
+        if sku:
+            by_sku[sku] = slug
+
+
+async def _write_batch(db: AsyncSession, rows: list[dict], columns: set[str]) -> tuple[int, int, list[str]]:
+    """Upsert пачки товаров с ТТХ и вариантами. Возвращает (создано, обновлено, предупреждения)."""
+    await _resolve_slugs(db, rows)
+    # Повтор slug внутри пачки — побеждает последняя строка (ON CONFLICT не обновляет строку дважды)
+    by_slug = {r["product"]["slug"]: r for r in rows}
+    rows = list(by_slug.values())
+
+    categories = await _upsert_categories(db, {r["category"] for r in rows if r["category"]})
+    if "category" in columns:
+        for r in rows:
+            r["product"]["category_id"] = categories.get(r["category"]) if r["category"] else None
+
+    now = datetime.now(timezone.utc)
+    values = []
+    for r in rows:
+        values.append(
+            {
+                "id": uuid.uuid4(),
+                "is_published": False,
+                "sort_order": 0,
+                "price_currency": "RUB",
+                "view_count": 0,
+                "created_at": now,
+                **r["product"],
+                "updated_at": now,
+            }
+        )
+    # Обновляем только колонки, присутствующие в файле
+    update_fields = {k for k in values[0] if k not in ("id", "slug", "view_count", "created_at")}
+    if "price_currency" not in columns:
+        update_fields.discard("price_currency")
+    if "is_published" not in columns:
+        update_fields.discard("is_published")
+    if "sort_order" not in columns:
+        update_fields.discard("sort_order")
+    stmt = pg_insert(Product).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Product.slug],
+        set_={f: stmt.excluded[f] for f in update_fields},
+    ).returning(Product.id, Product.slug, (Product.created_at == now).label("created"))
+    result = await db.execute(stmt)
+    ids: dict[str, uuid.UUID] = {}
+    created = 0
+    for pid, slug, is_new in result.all():
+        ids[slug] = pid
+        created += int(bool(is_new))
+
+    # ТТХ: замена целиком для товаров, где колонка есть в файле
+    if "specs" in columns:
+        product_ids = [ids[r["product"]["slug"]] for r in rows]
+        await db.execute(delete(ProductSpec).where(ProductSpec.product_id.in_(product_ids)))
+        specs = [
+            {"id": uuid.uuid4(), "product_id": ids[r["product"]["slug"]], **spec}
+            for r in rows
+            for spec in r["specs"]
+        ]
+        if specs:
+            await db.execute(insert(ProductSpec), specs)
+    warnings = await _sync_variants(db, rows, ids) if "variants" in columns else []
+
+    return created, len(rows) - created, warnings
+
+
+async def _sync_variants(db: AsyncSession, rows: list[dict], ids: dict[str, uuid.UUID]) -> list[str]:
+    """
+    Привести варианты товаров пачки к файлу, не пересоздавая строки (резервы ссылаются на id).
+    Возвращает предупреждения о вариантах, оставленных из-за активных удержаний.
+    """
+    wanted: dict[tuple, dict] = {}
+    for r in rows:
+        pid = ids[r["product"]["slug"]]
+        for v in r["variants"]:
+            # Повтор опции у товара — побеждает последний
+            wanted[(pid, v["option_name"], v["option_value"])] = v
+
+    result = await db.execute(
+        select(ProductVariant.id, ProductVariant.product_id, ProductVariant.option_name, ProductVariant.option_value)
+        .where(ProductVariant.product_id.in_({ids[r["product"]["slug"]] for r in rows}))
+    )
+    current = {(pid, name, value): vid for vid, pid, name, value in result.all()}
+
+    to_update = [
+        (current[key], v["stock_qty"], v["sort_order"]) for key, v in wanted.items() if key in current
+    ]
+    to_insert = [
+        {
+            "id": uuid.uuid4(),
+            "product_id": key[0],
+            "option_name": v["option_name"],
+            "option_value": v["option_value"],
+            "stock_qty": v["stock_qty"],
+            "sort_order": v["sort_order"],
+        }
+        for key, v in wanted.items()
+        if key not in current
+    ]
+    stale = {vid: key for key, vid in current.items() if key not in wanted}
+    held = await variants_with_holds(db, list(stale))
+    to_delete = [vid for vid in stale if vid not in held]
+
+    if to_delete:
+        await db.execute(delete(ProductVariant).where(ProductVariant.id.in_(to_delete)))
+    if to_update:
+        table = ProductVariant.__table__
+        changes = values(
+            column("id", table.c.id.type),
+            column("stock_qty", table.c.stock_qty.type),
+            column("sort_order", table.c.sort_order.type),
+            name="v",
+        ).data(sorted(to_update))  # порядок id — одинаковый порядок блокировок в параллельных импортах
+        await db.execute(
+            update(ProductVariant)
+            .where(ProductVariant.id == changes.c.id)
+            .values(stock_qty=changes.c.stock_qty, sort_order=changes.c.sort_order)
+            .execution_options(synchronize_session=False)
+        )
+    if to_insert:
+        await db.execute(insert(ProductVariant), to_insert)
+
+    slugs = {pid: slug for slug, pid in ids.items()}
+    return [
+        f"product {slugs[stale[vid][0]]}: variant {stale[vid][1]}:{stale[vid][2]} has held reservations, kept"
+        for vid in held
+    ]
+
+
+def _take(rows: Iterator[dict[str, str]], n: int) -> list[dict[str, str]]:
+    return list(itertools.islice(rows, n))
+
+
+async def import_products(
+    db: AsyncSession,
+    file: BinaryIO,
+    filename: str,
+    *,
+    dry_run: bool = False,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    on_progress: ProgressCallback | None = None,
+) -> ProductImportResult:
+    """
+    Импорт товаров из файла. Каждая пачка коммитится отдельно,
+    строки с ошибками пропускаются и попадают в отчёт.
+    """
+    report = ProductImportResult(dry_run=dry_run)
+    rows = iter_rows(file, filename)
+    row_num = 1  # строка 1 — заголовок
+    while True:
+        # Чтение и разбор файла — в пуле потоков, чтобы не блокировать event loop
+        raw_batch = await asyncio.to_thread(_take, rows, batch_size)
+        if not raw_batch:
+            break
+        columns = set(raw_batch[0])  # у всех строк ключи = колонки заголовка (см. _row_dict)
+        batch = []
+        for raw in raw_batch:
+            row_num += 1
+            try:
+                batch.append({**parse_row(raw), "row": row_num})
+            except ValueError as e:
+                report.failed += 1
+                if len(report.errors) < MAX_REPORTED_ERRORS:
+                    report.errors.append(f"row {row_num}: {e}")
+        report.processed += len(raw_batch)
+
+        if batch and not dry_run:
+            created, updated, warnings = await _write_batch(db, batch, columns)
+            await db.commit()
+            report.created += created
+            report.updated += updated
+            for warning in warnings:
+                if len(report.errors) < MAX_REPORTED_ERRORS:
+                    report.errors.append(warning)
+
+        logger.info(
+            "Import %s: processed=%d created=%d updated=%d failed=%d",
+            filename, report.processed, report.created, report.updated, report.failed,
+        )
+        if on_progress:
+            res = on_progress(report)
+            if res is not None:
+                await res
+    return report
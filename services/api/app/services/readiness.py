@@ -0,0 +1,129 @@
+"""
+Готовность воркера принимать трафик (GET /ready): БД, пул соединений, хранилище, event loop.
+
+Каждая проверка сравнивается со своим порогом из настроек (READY_*). Результат кэшируется
+на ready_cache_seconds, параллельные пробы ждут одну общую проверку — частые запросы
+балансировщика почти ничего не стоят.
+"""
+import asyncio
+import os
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.db import engine, pool_status
+
+settings = get_settings()
+
+
+class LoopLagMonitor:
+    """Задержка event loop: насколько позже положенного просыпается периодическая корутина."""
+
+    def __init__(self) -> None:
+        self.last_ms = 0.0
+        self.max_ms = 0.0  # максимум за текущее окно (сбрасывается при чтении)
+
+    def take(self) -> tuple[float, float]:
+        last, peak = self.last_ms, max(self.max_ms, self.last_ms)
+        self.max_ms = 0.0
+        return last, peak
+
+    async def run(self) -> None:
+        interval = settings.ready_loop_probe_seconds
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.last_ms = max((time.perf_counter() - t0 - interval) * 1000, 0.0)
+            self.max_ms = max(self.max_ms, self.last_ms)
+
+
+loop_lag = LoopLagMonitor()
+
+
+def _result(ok: bool, **details) -> dict:
+    return {"ok": ok, **details}
+
+
+async def _check_db() -> dict:
+    limit = settings.ready_db_max_ms
+    t0 = time.perf_counter()
+    try:
+        async with asyncio.timeout(settings.ready_check_timeout_seconds):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+    except Exception as e:
+        return _result(False, error=f"{type(e).__name__}: {e}"[:300])
+    ms = (time.perf_counter() - t0) * 1000
+    return _result(ms <= limit, latency_ms=round(ms, 2), max_ms=limit)
+
+
+def _check_pool() -> dict:
+    status = pool_status()
+    capacity = status["size"] + max(status["max_overflow"], 0)
+    utilization = status["checked_out"] / capacity if capacity else 0.0
+    limit = settings.ready_pool_max_utilization
+    return _result(
+        utilization <= limit,
+        checked_out=status["checked_out"],
+        capacity=capacity,
+        utilization=round(utilization, 3),
+        max_utilization=limit,
+    )
+
+
+def _storage_roundtrip() -> None:
+    probe = Path(settings.storage_path) / ".ready" / f"{os.getpid()}.probe"
+    probe.parent.mkdir(parents=True, exist_ok=True)
+    payload = os.urandom(64)
+    probe.write_bytes(payload)
+    if probe.read_bytes() != payload:
+        raise OSError("Storage read-back mismatch")
+    probe.unlink()
+
+
+async def _check_storage() -> dict:
+    limit = settings.ready_storage_max_ms
+    t0 = time.perf_counter()
+    try:
+        async with asyncio.timeout(settings.ready_check_timeout_seconds):
+            await asyncio.to_thread(_storage_roundtrip)
+    except Exception as e:
+        return _result(False, error=f"{type(e).__name__}: {e}"[:300])
+    ms = (time.perf_counter() - t0) * 1000
+    return _result(ms <= limit, latency_ms=round(ms, 2), max_ms=limit)
+
+
+def _check_loop() -> dict:
+    last, peak = loop_lag.take()
+    limit = settings.ready_loop_lag_max_ms
+    return _result(last <= limit, lag_ms=round(last, 2), peak_ms=round(peak, 2), max_ms=limit)
+
+
+class Readiness:
+    """Кэш результата проверки готовности на ready_cache_seconds."""
+
+    def __init__(self) -> None:
+        self._result: dict | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def check(self) -> dict:
+        if self._result is not None and time.monotonic() - self._checked_at < settings.ready_cache_seconds:
+            return self._result
+        async with self._lock:
+            # Пока ждали блокировку, проверку мог выполнить другой запрос
+            if self._result is not None and time.monotonic() - self._checked_at < settings.ready_cache_seconds:
+                return self._result
+            db, storage = await asyncio.gather(_check_db(), _check_storage())
+            checks = {"db": db, "pool": _check_pool(), "storage": storage, "event_loop": _check_loop()}
+            self._result = {
+                "status": "ready" if all(c["ok"] for c in checks.values()) else "not_ready",
+                "checks": checks,
+            }
+            self._checked_at = time.monotonic()
+            return self._result
+
+
+readiness = Readiness()
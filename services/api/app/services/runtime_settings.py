@@ -0,0 +1,146 @@
+"""
+Редактируемые настройки в БД (таблица app_settings) с копией в памяти каждого воркера.
+
+- значения из .env — умолчания, строки app_settings их переопределяют;
+- каждое изменение получает номер из app_settings_version_seq и NOTIFY в канал app_settings;
+- каждый воркер слушает канал отдельным соединением asyncpg и перечитывает таблицу,
+  поэтому все воркеры uvicorn видят одни и те же значения;
+- изменение определяется по набору пар (ключ, номер), а не по максимальному номеру:
+  транзакции коммитятся не в порядке получения номеров, и сохранение с меньшим номером,
+  закоммиченное позже, не изменило бы максимум;
+- ответ /api/miniapp/settings собирается один раз на версию и отдаётся из памяти с ETag.
+"""
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Settings, get_settings
+from app.db import async_session_maker
+from app.models.setting import SETTINGS_VERSION_SEQ, AppSetting
+from app.schemas.admin import MiniappSettingsResponse, SettingsUpdate
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "app_settings"
+# Ключи, которые можно менять из админки
+EDITABLE_KEYS = frozenset(SettingsUpdate.model_fields)
+# Проверка живости соединения-слушателя
+LISTENER_PING_SECONDS = 30.0
+LISTENER_RETRY_SECONDS = 5.0
+
+
+class RuntimeSettings:
+    """Настройки .env + переопределения из БД; пересобираются только при смене версии."""
+
+    def __init__(self) -> None:
+        self.version = 0
+        self._state: frozenset[tuple[str, int]] = frozenset()
+        self._settings = get_settings()
+        self._lock = asyncio.Lock()
+        self._build_miniapp()
+
+    def current(self) -> Settings:
+        """Действующие настройки (без обращения к БД)."""
+        return self._settings
+
+    def _build_miniapp(self) -> None:
+        s = self._settings
+        self.miniapp_body = MiniappSettingsResponse(
+            section_title=s.miniapp_section_title,
+            footer_text=s.miniapp_footer_text,
+            background_color=s.miniapp_background_color,
+            background_image=s.miniapp_background_image,
+            text_color=s.miniapp_text_color,
+            heading_color=s.miniapp_heading_color,
+            price_color=s.miniapp_price_color,
+            hint_color=s.miniapp_hint_color,
+            card_bg_color=s.miniapp_card_bg_color,
+            contact_telegram_link=s.contact_telegram_link,
+        ).model_dump_json().encode()
+        # ETag по содержимому: совпадает у всех воркеров и не меняется после перезапуска
+        self.miniapp_etag = f'"{hashlib.sha256(self.miniapp_body).hexdigest()[:32]}"'
+
+    async def refresh(self) -> bool:
+        """Перечитать app_settings. Возвращает True, если изменилась хотя бы одна строка."""
+        async with self._lock:
+            async with async_session_maker() as db:
+                rows = (await db.execute(select(AppSetting.key, AppSetting.value, AppSetting.version))).all()
+            state = frozenset((r.key, r.version) for r in rows)
+            if state == self._state:
+                return False
+            version = max((r.version for r in rows), default=0)
+            overrides = {r.key: r.value for r in rows if r.key in EDITABLE_KEYS and r.value is not None}
+            self._settings = get_settings().model_copy(update=overrides)
+            self.version = version
+            self._state = state
+            self._build_miniapp()
+            logger.info("Runtime settings loaded: version=%d, overrides=%d", version, len(overrides))
+            return True
+
+
+runtime_settings = RuntimeSettings()
+
+
+async def save_settings(db: AsyncSession, updates: dict) -> None:
+    """
+    Записать изменения одним INSERT ... ON CONFLICT и поставить NOTIFY
+    (доставляется слушателям при коммите транзакции).
+    """
+    unknown = set(updates) - EDITABLE_KEYS
+    if unknown:
+        raise ValueError(f"Not editable: {', '.join(sorted(unknown))}")
+    if not updates:
+        return
+    now = datetime.utcnow()
+    stmt = pg_insert(AppSetting).values(
+        [{"key": k, "value": v, "version": SETTINGS_VERSION_SEQ.next_value(), "updated_at": now} for k, v in updates.items()]
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[AppSetting.key],
+            set_={"value": stmt.excluded.value, "version": stmt.excluded.version, "updated_at": stmt.excluded.updated_at},
+        )
+    )
+    await db.execute(select(func.pg_notify(NOTIFY_CHANNEL, "")))
+
+
+def _listen_dsn() -> str:
+    """DSN для asyncpg из DB_LISTEN_URL или DATABASE_URL (postgresql+asyncpg:// -> postgresql://)."""
+    s = get_settings()
+    url = make_url(s.db_listen_url or s.database_url).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+async def run_settings_listener() -> None:
+    """Фоновая задача воркера: LISTEN app_settings и перечитывание таблицы по уведомлению."""
+    changed = asyncio.Event()
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(_listen_dsn())
+            await conn.add_listener(NOTIFY_CHANNEL, lambda *_: changed.set())
+            # Изменения, пропущенные пока слушатель был отключён
+            await runtime_settings.refresh()
+            while True:
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=LISTENER_PING_SECONDS)
+                except asyncio.TimeoutError:
+                    await conn.execute("SELECT 1")
+                    continue
+                changed.clear()
+                await runtime_settings.refresh()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Settings listener failed, reconnecting")
+            await asyncio.sleep(LISTENER_RETRY_SECONDS)
+        finally:
+            if conn is not None:
+                await conn.close()
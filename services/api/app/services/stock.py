@@ -0,0 +1,255 @@
+"""
+Резервирование остатков вариантов: reserve / commit / release с ключом идемпотентности.
+
+Остаток меняется только условными UPDATE без предварительного чтения строки:
+    UPDATE product_variants SET in_order_qty = in_order_qty + :n
+    WHERE id = :id AND stock_qty - in_order_qty >= :n RETURNING ...
+Конкурирующие покупатели одного варианта сериализуются блокировкой строки внутри UPDATE,
+перепродажа невозможна. Удержание (held) истекает через ttl; фоновая задача возвращает
+просроченные резервы одним запросом.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy import Select, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.db import async_session_maker
+from app.models.product import ProductVariant
+from app.models.reservation import (
+    RESERVATION_COMMITTED,
+    RESERVATION_EXPIRED,
+    RESERVATION_HELD,
+    RESERVATION_RELEASED,
+    StockReservation,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ReservationError(Exception):
+    """Базовая ошибка резервирования."""
+
+
+class ReservationNotFound(ReservationError):
+    """Нет резерва с таким ключом (или варианта)."""
+
+
+class InsufficientStock(ReservationError):
+    """Свободного остатка меньше запрошенного."""
+
+
+class ReservationConflict(ReservationError):
+    """Ключ уже использован с другими параметрами или резерв в неподходящем статусе."""
+
+
+def _as_dict(r: StockReservation, available: int | None = None) -> dict:
+    return {
+        "id": str(r.id),
+        "idempotency_key": r.idempotency_key,
+        "variant_id": str(r.variant_id),
+        "qty": r.qty,
+        "status": r.status,
+        "expires_at": r.expires_at.isoformat(),
+        "available": available,
+    }
+
+
+async def _get(db: AsyncSession, key: str) -> StockReservation | None:
+    result = await db.execute(select(StockReservation).where(StockReservation.idempotency_key == key))
+    return result.scalars().first()
+
+
+async def reserve(db: AsyncSession, key: str, variant_id: UUID, qty: int, ttl_seconds: int | None = None) -> dict:
+    """
+    Удержать qty единиц варианта. Повтор с тем же ключом возвращает существующий резерв.
+    При нехватке остатка — InsufficientStock (вызывающий откатывает транзакцию, ключ не занят).
+    """
+    s = get_settings()
+    ttl = min(ttl_seconds or s.reservation_ttl_seconds, s.reservation_max_ttl_seconds)
+    now = datetime.now(timezone.utc)
+    # Сначала занимаем ключ: параллельный запрос с тем же ключом ждёт на уникальном индексе
+    stmt = (
+        pg_insert(StockReservation)
+        .values(
+            idempotency_key=key,
+            variant_id=variant_id,
+            qty=qty,
+            status=RESERVATION_HELD,
+            expires_at=now + timedelta(seconds=ttl),
+            created_at=now,
+            updated_at=now,
+        )
+        .on_conflict_do_nothing(index_elements=[StockReservation.idempotency_key])
+        .returning(StockReservation.id)
+    )
+    try:
+        inserted = (await db.execute(stmt)).scalar()
+    except IntegrityError:
+        # Нарушение внешнего ключа — варианта нет
+        raise ReservationNotFound("Variant not found")
+    if inserted is None:
+        existing = await _get(db, key)
+        if existing is None or existing.variant_id != variant_id or existing.qty != qty:
+            raise ReservationConflict("Idempotency key already used with different parameters")
+        return _as_dict(existing)
+
+    available = (
+        await db.execute(
+            update(ProductVariant)
+            .where(ProductVariant.id == variant_id, ProductVariant.stock_qty - ProductVariant.in_order_qty >= qty)
+            .values(in_order_qty=ProductVariant.in_order_qty + qty)
+            .returning(ProductVariant.stock_qty - ProductVariant.in_order_qty)
+            .execution_options(synchronize_session=False)
+        )
+    ).scalar()
+    if available is None:
+        raise InsufficientStock("Not enough stock")
+    return {
+        "id": str(inserted),
+        "idempotency_key": key,
+        "variant_id": str(variant_id),
+        "qty": qty,
+        "status": RESERVATION_HELD,
+        "expires_at": (now + timedelta(seconds=ttl)).isoformat(),
+        "available": available,
+    }
+
+
+# Переход held -> status и изменение остатков варианта одним запросом
+_FINISH_SQL = {
+    RESERVATION_COMMITTED: text(
+        """
+        WITH r AS (
+            UPDATE stock_reservations SET status = 'committed', updated_at = now()
+            WHERE idempotency_key = :key AND status = 'held' AND expires_at > now()
+            RETURNING variant_id, qty
+        )
+        UPDATE product_variants v
+        SET stock_qty = v.stock_qty - r.qty, in_order_qty = v.in_order_qty - r.qty
+        FROM r WHERE v.id = r.variant_id
+        RETURNING v.stock_qty - v.in_order_qty
+        """
+    ),
+    RESERVATION_RELEASED: text(
+        """
+        WITH r AS (
+            UPDATE stock_reservations SET status = 'released', updated_at = now()
+            WHERE idempotency_key = :key AND status = 'held'
+            RETURNING variant_id, qty
+        )
+        UPDATE product_variants v
+        SET in_order_qty = v.in_order_qty - r.qty
+        FROM r WHERE v.id = r.variant_id
+        RETURNING v.stock_qty - v.in_order_qty
+        """
+    ),
+}
+
+
+async def _finish(db: AsyncSession, key: str, status: str) -> dict:
+    available = (await db.execute(_FINISH_SQL[status], {"key": key})).scalar()
+    existing = await _get(db, key)
+    if existing is None:
+        raise ReservationNotFound("Reservation not found")
+    if status == RESERVATION_RELEASED and existing.status == RESERVATION_EXPIRED:
+        # Удержание уже снято по сроку — результат тот же
+        return _as_dict(existing, available)
+    if available is None and existing.status != status:
+        # Повтор с тем же ключом допустим, смена исхода — нет
+        if existing.status == RESERVATION_HELD:
+            raise ReservationConflict("Reservation expired")
+        raise ReservationConflict(f"Reservation is {existing.status}")
+    return _as_dict(existing, available)
+
+
+async def commit(db: AsyncSession, key: str) -> dict:
+    """Списать удержанное количество со склада (повтор — без изменений)."""
+    return await _finish(db, key, RESERVATION_COMMITTED)
+
+
+async def release(db: AsyncSession, key: str) -> dict:
+    """Снять удержание (повтор — без изменений)."""
+    return await _finish(db, key, RESERVATION_RELEASED)
+
+
+_EXPIRE_SQL = text(
+    """
+    WITH expired AS (
+        UPDATE stock_reservations SET status = 'expired', updated_at = now()
+        WHERE status = 'held' AND expires_at <= now()
+        RETURNING variant_id, qty
+    ), per_variant AS (
+        SELECT variant_id, sum(qty) AS qty FROM expired GROUP BY variant_id
+    )
+    UPDATE product_variants v
+    SET in_order_qty = v.in_order_qty - p.qty
+    FROM per_variant p WHERE v.id = p.variant_id
+    """
+)
+
+
+async def expire_holds() -> int:
+    """Вернуть в свободный остаток все просроченные удержания. Возвращает число затронутых вариантов."""
+    async with async_session_maker() as db:
+        result = await db.execute(_EXPIRE_SQL)
+        await db.commit()
+    if result.rowcount:
+        logger.info("Expired stock holds released on %d variants", result.rowcount)
+    return result.rowcount
+
+
+async def run_reservation_expiry_worker() -> None:
+    """Фоновая задача процесса: отмена просроченных удержаний раз в reservation_sweep_seconds."""
+    interval = get_settings().reservation_sweep_seconds
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await expire_holds()
+        except Exception:
+            logger.exception("Stock hold expiry failed")
+
+
+async def held_qty(db: AsyncSession, variant_id: UUID) -> int:
+    """Сумма активных удержаний варианта (сверка с in_order_qty)."""
+    result = await db.execute(
+        select(func.coalesce(func.sum(StockReservation.qty), 0)).where(
+            StockReservation.variant_id == variant_id, StockReservation.status == RESERVATION_HELD
+        )
+    )
+    return result.scalar()
+
+
+async def variants_with_holds(db: AsyncSession, variant_ids: list[UUID]) -> set[UUID]:
+    """Варианты из списка с активными удержаниями (их нельзя удалять: резервы пропали бы каскадом)."""
+    if not variant_ids:
+        return set()
+    result = await db.execute(
+        select(StockReservation.variant_id)
+        .where(StockReservation.variant_id.in_(variant_ids), StockReservation.status == RESERVATION_HELD)
+        .distinct()
+    )
+    return set(result.scalars().all())
+
+
+async def products_with_holds(db: AsyncSession, product_ids: list[UUID] | Select) -> set[UUID]:
+    """
+    Товары с активными удержаниями (удаление товара каскадно удалило бы резервы).
+    Варианты товаров блокируются до конца транзакции: новый reserve() ждёт на внешнем ключе
+    и после удаления получает «Variant not found», а не теряет резерв молча.
+    """
+    await db.execute(
+        select(ProductVariant.id).where(ProductVariant.product_id.in_(product_ids)).with_for_update()
+    )
+    result = await db.execute(
+        select(ProductVariant.product_id)
+        .join(StockReservation, StockReservation.variant_id == ProductVariant.id)
+        .where(ProductVariant.product_id.in_(product_ids), StockReservation.status == RESERVATION_HELD)
+        .distinct()
+    )
+    return set(result.scalars().all())
@@ -0,0 +1,188 @@
+"""
+Статистика просмотров товаров по дням.
+
+POST /products/{slug}/view не пишет в БД: просмотр попадает в буфер процесса
+(product_id, день UTC) -> n. Фоновая задача раз в view_stats_flush_seconds сбрасывает буфер
+двумя пакетными запросами — upsert в секционированную product_view_daily (views += n)
+и UPDATE products.view_count. Каждый uvicorn-воркер сбрасывает свой буфер, инкременты
+складываются в БД, поэтому воркеры не конфликтуют. При аварийном завершении теряются
+просмотры за последний интервал.
+
+Rollup-задача (раз в сутки) создаёт секции на ближайшие месяцы и удаляет секции старше
+view_stats_retention_months.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from uuid import UUID
+
+from sqlalchemy import Date, Integer, column, select, text, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.config import get_settings
+from app.db import async_session_maker
+from app.models.product import Product, ProductViewDaily
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-lock для обслуживания секций (одновременно из нескольких воркеров)
+PARTITION_LOCK_KEY = 4_100_031
+# Сколько месяцев вперёд держать созданные секции
+PARTITIONS_AHEAD = 2
+ROLLUP_INTERVAL_SECONDS = 24 * 60 * 60
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def _month_start(d: date, shift: int = 0) -> date:
+    m = d.year * 12 + d.month - 1 + shift
+    return date(m // 12, m % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"product_view_daily_y{month.year}m{month.month:02d}"
+
+
+class ViewCounter:
+    """Буфер просмотров процесса с пакетным сбросом в БД."""
+
+    def __init__(self) -> None:
+        self._buffer: dict[tuple[UUID, date], int] = defaultdict(int)
+        # Те же просмотры по товару — для ответа на запрос без обхода буфера
+        self._pending: dict[UUID, int] = defaultdict(int)
+        self._lock = asyncio.Lock()
+
+    def record(self, product_id: UUID) -> None:
+        """Учесть просмотр (без обращения к БД)."""
+        self._buffer[(product_id, _today())] += 1
+        self._pending[product_id] += 1
+
+    def pending(self, product_id: UUID) -> int:
+        """Ещё не сброшенные в БД просмотры товара."""
+        return self._pending.get(product_id, 0)
+
+    async def flush(self) -> int:
+        """Сбросить буфер в БД. Возвращает число учтённых просмотров."""
+        async with self._lock:
+            if not self._buffer:
+                return 0
+            buffer, self._buffer = self._buffer, defaultdict(int)
+            pending, self._pending = self._pending, defaultdict(int)
+            try:
+                await self._write(buffer)
+            except Exception:
+                logger.exception("View stats flush failed, %d entries kept for retry", len(buffer))
+                for key, n in buffer.items():
+                    self._buffer[key] += n
+                for pid, n in pending.items():
+                    self._pending[pid] += n
+                return 0
+            return sum(buffer.values())
+
+    @staticmethod
+    async def _write(buffer: dict[tuple[UUID, date], int]) -> None:
+        # Строки блокируются в порядке product_id: параллельные сбросы воркеров
+        # ждут друг друга, а не взаимоблокируются
+        rows = sorted(buffer.items())
+        daily = values(
+            column("product_id", PG_UUID(as_uuid=True)),
+            column("day", Date),
+            column("views", Integer),
+            name="v",
+        ).data([(pid, day, n) for (pid, day), n in rows])
+        totals: dict[UUID, int] = defaultdict(int)
+        for (pid, _), n in rows:
+            totals[pid] += n
+        product_ids = list(totals)  # уже по возрастанию
+        per_product = values(
+            column("product_id", PG_UUID(as_uuid=True)),
+            column("views", Integer),
+            name="t",
+        ).data(list(totals.items()))
+
+        # Товары, удалённые после просмотра, отсекаются JOIN'ом
+        insert_stmt = pg_insert(ProductViewDaily).from_select(
+            ["product_id", "day", "views"],
+            select(daily.c.product_id, daily.c.day, daily.c.views)
+            .join(Product, Product.id == daily.c.product_id)
+            .order_by(daily.c.product_id, daily.c.day),
+        )
+        insert_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[ProductViewDaily.product_id, ProductViewDaily.day],
+            set_={"views": ProductViewDaily.views + insert_stmt.excluded.views},
+        )
+        update_stmt = (
+            update(Product)
+            .where(Product.id == per_product.c.product_id)
+            # Просмотр — не изменение товара: updated_at не трогаем
+            .values(view_count=Product.view_count + per_product.c.views, updated_at=Product.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        # Порядок строк в UPDATE ... FROM выбирает планировщик — товары блокируются заранее по id
+        # (FOR NO KEY UPDATE — та же блокировка, что берёт UPDATE view_count)
+        lock_stmt = (
+            select(Product.id).where(Product.id.in_(product_ids)).order_by(Product.id).with_for_update(key_share=True)
+        )
+        async with async_session_maker() as db:
+            await db.execute(lock_stmt)
+            await db.execute(insert_stmt)
+            await db.execute(update_stmt)
+            await db.commit()
+
+
+view_counter = ViewCounter()
+
+
+async def maintain_partitions() -> None:
+    """Rollup-задача: секции на текущий и следующие месяцы, удаление секций старше срока хранения."""
+    settings = get_settings()
+    today = _today()
+    async with async_session_maker() as db:
+        await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+        for shift in range(0, PARTITIONS_AHEAD + 1):
+            start, end = _month_start(today, shift), _month_start(today, shift + 1)
+            await db.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {_partition_name(start)} PARTITION OF product_view_daily "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+            )
+        oldest_kept = _month_start(today, -settings.view_stats_retention_months)
+        result = await db.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = 'product_view_daily' AND c.relname ~ '^product_view_daily_y[0-9]{4}m[0-9]{2}$'"
+            )
+        )
+        for (name,) in result.all():
+            month = date(int(name[-7:-3]), int(name[-2:]), 1)
+            if month < oldest_kept:
+                await db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                logger.info("Dropped view stats partition %s", name)
+        await db.commit()
+
+
+async def run_view_stats_worker() -> None:
+    """Фоновая задача процесса: периодический сброс буфера и ежесуточное обслуживание секций."""
+    settings = get_settings()
+    last_rollup = 0.0
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            if loop.time() - last_rollup >= ROLLUP_INTERVAL_SECONDS:
+                try:
+                    await maintain_partitions()
+                    last_rollup = loop.time()
+                except Exception:
+                    logger.exception("View stats partition maintenance failed")
+            await asyncio.sleep(settings.view_stats_flush_seconds)
+            await view_counter.flush()
+    finally:
+        # Остановка приложения — сбросить то, что накопилось
+        await view_counter.flush()
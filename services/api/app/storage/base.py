@@ -1,10 +1,14 @@
 """
 Абстракция хранилища файлов — для локального диска и будущего S3.
 """
+import io
 from abc import ABC, abstractmethod
-from pathlib import Path
+from collections.abc import AsyncIterator
 from typing import BinaryIO
 
+# Размер блока при потоковом чтении файлов
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class StorageDriver(ABC):
     """Базовый интерфейс хранилища файлов."""
@@ -22,6 +26,31 @@ class StorageDriver(ABC):
         """Прочитать файл по относительному пути."""
         ...
 
+    @abstractmethod
+    async def open_stream(
+        self,
+        relative_path: str,
+        offset: int = 0,
+        length: int | None = None,
+    ) -> AsyncIterator[bytes] | None:
+        """
+        Открыть файл для потокового чтения блоками (без загрузки целиком в память).
+        offset — смещение начала, length — сколько байт отдать (None — до конца файла).
+        Возвращает асинхронный итератор блоков или None, если файла нет.
+        """
+        ...
+
+    async def copy(self, src_path: str, dst_path: str) -> bool:
+        """
+        Скопировать файл внутри хранилища. Возвращает False, если исходного файла нет.
+        Базовая реализация читает файл целиком; драйверы переопределяют её дешёвым способом.
+        """
+        data = await self.read(src_path)
+        if data is None:
+            return False
+        await self.save(dst_path, io.BytesIO(data))
+        return True
+
     @abstractmethod
     async def delete(self, relative_path: str) -> bool:
         """Удалить файл. Возвращает True если удалён."""
@@ -32,6 +61,13 @@ class StorageDriver(ABC):
         """Проверить существование файла."""
         ...
 
+    def local_path(self, relative_path: str) -> str | None:
+        """
+        Путь в локальной файловой системе, если драйвер его может дать.
+        Для удалённых хранилищ (S3) — None, файл отдаётся через open_stream.
+        """
+        return None
+
     def get_absolute_path(self, relative_path: str) -> str:
         """
         Вернуть полный путь (для локального хранилища) или URL (для S3).
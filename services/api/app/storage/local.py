@@ -4,14 +4,27 @@
            storage/products/{product_id}/attachments/{attachment_id}/filename
 """
 import asyncio
+import os
+import shutil
+import sys
+from collections.abc import AsyncIterator
 from pathlib import Path
 from typing import BinaryIO
 
 from app.config import get_settings
-from app.storage.base import StorageDriver
+from app.storage.base import STREAM_CHUNK_SIZE, StorageDriver
+from app.tracing import traced
 
 settings = get_settings()
 
+# ioctl FICLONE (Linux): reflink — общие блоки данных до первой записи
+if sys.platform.startswith("linux"):
+    import fcntl
+
+    _FICLONE = 0x40049409
+else:
+    _FICLONE = None
+
 
 class LocalStorageDriver(StorageDriver):
     """Локальный диск — хранение в директории storage_path."""
@@ -28,14 +41,24 @@ class LocalStorageDriver(StorageDriver):
             raise ValueError("Path traversal not allowed")
         return full
 
+    @traced("storage.save")
     async def save(self, relative_path: str, content: BinaryIO, content_type: str | None = None) -> int:
-        """Сохранить файл, создать директории при необходимости."""
+        """Сохранить файл, создать директории при необходимости (копирование блоками, без чтения целиком)."""
         path = self._full_path(relative_path)
-        path.parent.mkdir(parents=True, exist_ok=True)
-        data = content.read()
-        await asyncio.to_thread(path.write_bytes, data)
-        return len(data)
 
+        def _write() -> int:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Запись во временный файл и замена: файл мог быть общим (жёсткая ссылка после copy)
+            tmp = path.with_name(f".{path.name}.tmp")
+            with tmp.open("wb") as out:
+                shutil.copyfileobj(content, out, STREAM_CHUNK_SIZE)
+                size = out.tell()
+            os.replace(tmp, path)
+            return size
+
+        return await asyncio.to_thread(_write)
+
+    @traced("storage.read")
     async def read(self, relative_path: str) -> bytes | None:
         """Прочитать файл."""
         path = self._full_path(relative_path)
@@ -43,6 +66,72 @@ class LocalStorageDriver(StorageDriver):
             return None
         return await asyncio.to_thread(path.read_bytes)
 
+    @traced("storage.open")
+    async def open_stream(
+        self,
+        relative_path: str,
+        offset: int = 0,
+        length: int | None = None,
+    ) -> AsyncIterator[bytes] | None:
+        """Открыть файл для чтения блоками; дескриптор закрывается по окончании итерации."""
+        path = self._full_path(relative_path)
+        try:
+            f = await asyncio.to_thread(path.open, "rb")
+        except FileNotFoundError:
+            return None
+        return self._iter_chunks(f, offset, length)
+
+    @staticmethod
+    async def _iter_chunks(f: BinaryIO, offset: int, length: int | None) -> AsyncIterator[bytes]:
+        """Чтение блоков в пуле потоков, чтобы не блокировать event loop."""
+        try:
+            if offset:
+                await asyncio.to_thread(f.seek, offset)
+            remaining = length
+            while remaining is None or remaining > 0:
+                size = STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining)
+                chunk = await asyncio.to_thread(f.read, size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            await asyncio.to_thread(f.close)
+
+    @traced("storage.copy")
+    async def copy(self, src_path: str, dst_path: str) -> bool:
+        """
+        Копия без дублирования данных: жёсткая ссылка, при невозможности (другая ФС,
+        запрет ссылок) — reflink (copy-on-write, btrfs/XFS), в крайнем случае обычное копирование.
+        Файлы хранилища не изменяются на месте (save пишет новый файл), поэтому общая
+        ссылка безопасна; удаление одной копии не затрагивает другую.
+        """
+        src = self._full_path(src_path)
+        dst = self._full_path(dst_path)
+
+        def _copy() -> bool:
+            if not src.exists():
+                return False
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(src, dst)
+                return True
+            except OSError:
+                pass
+            with src.open("rb") as fin, dst.open("wb") as fout:
+                if _FICLONE is not None:
+                    try:
+                        fcntl.ioctl(fout.fileno(), _FICLONE, fin.fileno())
+                        return True
+                    except OSError:
+                        pass
+                shutil.copyfileobj(fin, fout, STREAM_CHUNK_SIZE)
+            return True
+
+        return await asyncio.to_thread(_copy)
+
+    @traced("storage.delete")
     async def delete(self, relative_path: str) -> bool:
         """Удалить файл."""
         path = self._full_path(relative_path)
@@ -56,6 +145,10 @@ class LocalStorageDriver(StorageDriver):
         path = self._full_path(relative_path)
         return path.exists()
 
+    def local_path(self, relative_path: str) -> str | None:
+        """Файл лежит на диске — отдаётся напрямую через FileResponse."""
+        return str(self._full_path(relative_path))
+
     def get_absolute_path(self, relative_path: str) -> str:
         """Полный путь на диске (для локальной выдачи через API)."""
         return str(self._full_path(relative_path))
@@ -0,0 +1,322 @@
+"""
+Лёгкая трассировка запросов: спаны обработчика, SQL, хранилища и кэшей.
+
+Контекст передаётся заголовком W3C traceparent (00-<trace_id>-<span_id>-<flags>): входящий
+запрос продолжает трассу nginx/клиента, ответ получает traceresponse с id серверного спана.
+Решение о записи принимается один раз на трассу: флаг sampled из traceparent, иначе
+доля TRACE_SAMPLE_RATE. Вне выбранной трассы span() возвращает общий пустой спан — без затрат.
+
+Экспортёр подключаемый: TRACE_EXPORTER=jsonl (по умолчанию, файл TRACE_FILE, запись в
+отдельном потоке) или путь к классу «package.module:ClassName» с методами export(span_dict)
+и shutdown().
+"""
+import contextlib
+import functools
+import importlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections.abc import Iterator
+from contextvars import ContextVar
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import get_settings
+from app.metrics import route_template
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+TRACEPARENT_HEADER = b"traceparent"
+TRACERESPONSE_HEADER = b"traceresponse"
+STATEMENT_MAX_LEN = 500
+
+
+class Span:
+    """Записываемый спан."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, attributes: dict) -> None:
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.status = "ok"
+
+    def set(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def error(self, exc: BaseException) -> None:
+        self.status = "error"
+        self.attributes["error.type"] = type(exc).__name__
+        self.attributes["error.message"] = str(exc)[:STATEMENT_MAX_LEN]
+
+    def end(self) -> None:
+        self.end_ns = time.time_ns()
+        _exporter.export(
+            {
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "name": self.name,
+                "start_ns": self.start_ns,
+                "duration_ms": round((self.end_ns - self.start_ns) / 1_000_000, 3),
+                "status": self.status,
+                "attributes": self.attributes,
+                "pid": os.getpid(),
+            }
+        )
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+class _NoopSpan:
+    """Спан вне записываемой трассы: все операции пустые."""
+
+    __slots__ = ()
+    traceparent = None
+
+    def set(self, key: str, value) -> None:
+        pass
+
+    def error(self, exc: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+_current: ContextVar[Span | None] = ContextVar("trace_span", default=None)
+
+
+# --- Экспорт ---
+
+
+class JsonlExporter:
+    """Спаны построчно в JSONL-файл; запись и ротация — в отдельном потоке."""
+
+    def __init__(self, path: str | None = None, max_bytes: int | None = None) -> None:
+        self._path = Path(path or settings.trace_file)
+        self._max_bytes = max_bytes or int(settings.trace_file_max_mb * 1024 * 1024)
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def export(self, span: dict) -> None:
+        if self._thread is None:
+            self._start()
+        self._queue.put(span)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        out = self._path.open("a", encoding="utf-8")
+        try:
+            while True:
+                span = self._queue.get()
+                if span is None:
+                    break
+                out.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+                if self._queue.empty():
+                    out.flush()
+                    if out.tell() > self._max_bytes:
+                        # Одна резервная копия: общий объём ≤ 2 × TRACE_FILE_MAX_MB
+                        out.close()
+                        os.replace(self._path, self._path.with_name(self._path.name + ".1"))
+                        out = self._path.open("a", encoding="utf-8")
+        finally:
+            out.close()
+
+    def shutdown(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+def _load_exporter():
+    name = settings.trace_exporter
+    if name == "jsonl":
+        return JsonlExporter()
+    module_name, _, attr = name.partition(":")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+_exporter = _load_exporter() if settings.tracing_enabled else None
+
+
+def shutdown_tracing() -> None:
+    """Дописать оставшиеся спаны (при остановке воркера)."""
+    if _exporter is not None:
+        _exporter.shutdown()
+
+
+# --- API спанов ---
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes) -> Iterator[Span | _NoopSpan]:
+    """Дочерний спан текущей трассы; вне записываемой трассы — NOOP_SPAN."""
+    parent = _current.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    s = Span(name, parent.trace_id, parent.span_id, attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error(e)
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
+
+
+def traced(name: str):
+    """Декоратор корутины: вызов оборачивается в спан name."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return await fn(*args, **kwargs)
+            with span(name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def outgoing_traceparent() -> str | None:
+    """Заголовок traceparent для исходящих запросов из текущего спана."""
+    s = _current.get()
+    return s.traceparent if s is not None else None
+
+
+def _parse_traceparent(value: bytes) -> tuple[str, str, bool] | None:
+    parts = value.decode("latin-1").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[0] == "ff":
+        return None
+    trace_id, parent_id, flags = parts[1].lower(), parts[2].lower(), parts[3]
+    try:
+        int(trace_id, 16), int(parent_id, 16)
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, sampled
+
+
+# --- SQL ---
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current.get()
+    if parent is None:
+        return
+    s = Span("db.query", parent.trace_id, parent.span_id, {"db.statement": statement[:STATEMENT_MAX_LEN]})
+    if executemany:
+        s.set("db.executemany", True)
+    conn.info["trace_span"] = s
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    s = conn.info.pop("trace_span", None)
+    if s is not None:
+        s.end()
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    s = conn.info.pop("trace_span", None) if conn is not None else None
+    if s is not None:
+        s.error(exception_context.original_exception)
+        s.end()
+
+
+if settings.tracing_enabled:
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+
+
+# --- HTTP ---
+
+
+class TracingMiddleware:
+    """ASGI-middleware: серверный спан запроса с продолжением трассы из traceparent."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope.get("headers", ()):
+            if name == TRACEPARENT_HEADER:
+                incoming = _parse_traceparent(value)
+                break
+        if incoming is not None:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id, sampled = None, None, random.random() < settings.trace_sample_rate
+        if not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        server_span = Span(
+            f"{method} {scope['path']}",
+            trace_id or os.urandom(16).hex(),
+            parent_id,
+            {"http.method": method, "url.path": scope["path"]},
+        )
+
+        async def send_traced(message):
+            if message["type"] == "http.response.start":
+                server_span.set("http.status_code", message["status"])
+                headers = list(message.get("headers", []))
+                headers.append((TRACERESPONSE_HEADER, server_span.traceparent.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current.set(server_span)
+        try:
+            await self.app(scope, receive, send_traced)
+        except BaseException as e:
+            server_span.error(e)
+            raise
+        finally:
+            _current.reset(token)
+            if scope.get("route") is not None:
+                server_span.name = f"{method} {route_template(scope)}"
+                server_span.set("http.route", route_template(scope))
+            server_span.end()
@@ -0,0 +1,7 @@
+"""
+Бенчмарки API. Запускаются из services/api против локального PostgreSQL (DATABASE_URL из .env):
+    python -m benchmarks.<имя> --help
+Служебные данные создаются с префиксом slug `bench-` (свой на каждый прогон) и удаляются после него.
+Общие расчёты (перцентили задержек) — benchmarks.stats.
+Сквозной прогон API на синтетическом каталоге — benchmarks.api_load (каталог — benchmarks.catalog).
+"""
@@ -0,0 +1,350 @@
+"""
+Нагрузочный прогон API: засев каталога и сценарии витрины и админки.
+Использование:
+    python -m benchmarks.api_load --products 5000 --requests 2000 --concurrency 32
+    python -m benchmarks.api_load --mode http --base-url http://127.0.0.1:8000 --output bench.json
+
+Режимы:
+- inprocess — запросы идут прямо в ASGI-приложение app.main:app в этом процессе (без сети и
+  сервера; видна стоимость самого приложения, события lifespan запускаются как в uvicorn);
+- http — запросы к запущенному серверу по HTTP/1.1 keep-alive (одно соединение на поток нагрузки);
+- both — оба режима подряд.
+Сервер для режима http должен смотреть в ту же БД и STORAGE_PATH, что и этот скрипт (засев
+выполняется отсюда).
+
+Сценарии (--scenarios): list, detail, file, view, admin_list. Выбор товаров и страниц
+детерминирован (--seed), поэтому прогоны разных коммитов сопоставимы.
+Результат — JSON (stdout и --output): для каждого сценария p50/p95/p99/mean/max задержки в мс,
+запросов в секунду и коды ответов; плюс коммит, размер каталога и параметры прогона.
+Если доля ошибок (не 2xx/3xx) в каком-либо сценарии больше --max-error-rate — код выхода 1.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import asdict
+from urllib.parse import urlsplit
+
+from benchmarks.catalog import Catalog, add_size_arguments, cleanup, seed, size_from_args
+from benchmarks.stats import percentile
+
+SCENARIOS = ("list", "detail", "file", "view", "admin_list")
+
+Request = tuple[str, str, dict[str, str]]  # method, path (с query), заголовки
+
+
+# --- Клиенты ---
+
+
+class AsgiClient:
+    """Вызов ASGI-приложения в текущем процессе; тело ответа вычитывается целиком."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def request(self, method: str, target: str, headers: dict[str, str]) -> tuple[int, int]:
+        path, _, query = target.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+            "client": ("127.0.0.1", 50000),
+            "server": ("127.0.0.1", 8000),
+        }
+        status = 0
+        size = 0
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Event().wait()  # клиент не отключается
+
+        async def send(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, size
+
+    async def close(self) -> None:
+        pass
+
+
+class HttpConnection:
+    """Минимальный клиент HTTP/1.1 с keep-alive (Content-Length и chunked)."""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host, self.port = host, port
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def request(self, method: str, target: str, headers: dict[str, str]) -> tuple[int, int]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {self.host}:{self.port}", "Content-Length: 0"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            await self.close()
+            raise ConnectionError("Server closed connection")
+        status = int(status_line.split()[1])
+        length, chunked, close = None, False, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding" and "chunked" in value:
+                chunked = True
+            elif name == "connection" and value == "close":
+                close = True
+
+        size = 0
+        if chunked:
+            while True:
+                chunk_len = int((await self.reader.readline()).split(b";")[0], 16)
+                if chunk_len == 0:
+                    await self.reader.readline()
+                    break
+                size += len(await self.reader.readexactly(chunk_len))
+                await self.reader.readline()
+        elif length:
+            size = len(await self.reader.readexactly(length))
+        if close:
+            await self.close()
+        return status, size
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class HttpClient:
+    """Пул соединений: каждый поток нагрузки берёт своё соединение."""
+
+    def __init__(self, base_url: str) -> None:
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname or "127.0.0.1", parts.port or 80
+        self._free: list[HttpConnection] = []
+
+    async def request(self, method: str, target: str, headers: dict[str, str]) -> tuple[int, int]:
+        conn = self._free.pop() if self._free else HttpConnection(self.host, self.port)
+        try:
+            result = await conn.request(method, target, headers)
+        except Exception:
+            await conn.close()
+            raise
+        self._free.append(conn)
+        return result
+
+    async def close(self) -> None:
+        for conn in self._free:
+            await conn.close()
+        self._free.clear()
+
+
+# --- Сценарии ---
+
+
+def build_requests(scenario: str, catalog: Catalog, count: int, rng: random.Random, admin_token: str) -> list[Request]:
+    slugs, images = catalog.slugs, catalog.image_ids
+    list_pages = max(len(slugs) // 20, 1)
+    admin_pages = max(catalog.size.products // 50, 1)
+    admin = {"Authorization": f"Bearer {admin_token}"}
+    makers: dict[str, Callable[[], Request]] = {
+        # Первые страницы популярнее: половина запросов — страницы 1–3
+        "list": lambda: ("GET", f"/api/products/?page={rng.randint(1, 3) if rng.random() < 0.5 else rng.randint(1, list_pages)}&per_page=20", {}),
+        "detail": lambda: ("GET", f"/api/products/{rng.choice(slugs)}", {}),
+        "file": lambda: ("GET", f"/api/files/{rng.choice(images)}", {}),
+        "view": lambda: ("POST", f"/api/products/{rng.choice(slugs)}/view", {}),
+        "admin_list": lambda: ("GET", f"/api/admin/products?page={rng.randint(1, admin_pages)}&per_page=50", admin),
+    }
+    return [makers[scenario]() for _ in range(count)]
+
+
+async def run_scenario(client, warmup: list[Request], requests: list[Request], concurrency: int) -> dict:
+    for method, target, headers in warmup:
+        await client.request(method, target, headers)
+
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+    bytes_total = 0
+    queue = iter(requests)
+
+    async def worker() -> None:
+        nonlocal bytes_total
+        for method, target, headers in queue:
+            t0 = time.perf_counter()
+            try:
+                status, size = await client.request(method, target, headers)
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+                continue
+            latencies.append((time.perf_counter() - t0) * 1000)
+            statuses[str(status)] += 1
+            bytes_total += size
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    errors = sum(n for s, n in statuses.items() if not (s.isdigit() and 200 <= int(s) < 400))
+    return {
+        "requests": len(requests),
+        "seconds": round(elapsed, 3),
+        "rps": round(len(requests) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "mean": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+        "statuses": dict(statuses),
+        "error_rate": round(errors / len(requests), 4) if requests else 0.0,
+        "bytes": bytes_total,
+    }
+
+
+async def run_mode(mode: str, args, catalog: Catalog, admin_token: str) -> dict:
+    if mode == "inprocess":
+        from app.main import app
+
+        client = AsgiClient(app)
+    else:
+        client = HttpClient(args.base_url)
+    results = {}
+    try:
+        for scenario in args.scenarios:
+            rng = random.Random(f"{args.seed}-{scenario}")
+            requests = build_requests(scenario, catalog, args.requests + args.warmup, rng, admin_token)
+            results[scenario] = await run_scenario(
+                client, requests[: args.warmup], requests[args.warmup :], args.concurrency
+            )
+    finally:
+        await client.close()
+    return results
+
+
+class Lifespan:
+    """События startup/shutdown ASGI-приложения (фоновые задачи как под uvicorn)."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._incoming: asyncio.Queue = asyncio.Queue()
+        self._outgoing: asyncio.Queue = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+
+    async def _call(self, event: str) -> None:
+        await self._incoming.put({"type": f"lifespan.{event}"})
+        message = await self._outgoing.get()
+        if message["type"].endswith("failed"):
+            raise RuntimeError(message.get("message", f"lifespan {event} failed"))
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(
+            self.app({"type": "lifespan", "asgi": {"version": "3.0"}}, self._incoming.get, self._outgoing.put)
+        )
+        await self._call("startup")
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._call("shutdown")
+        await self._task
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    from app.api.admin_auth import create_access_token, settings
+    from app.db import engine
+
+    admin_token = create_access_token(settings.admin_login)
+    catalog = await seed(size_from_args(args))
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "catalog": {**asdict(catalog.size), "prefix": catalog.prefix, "published": len(catalog.slugs), "seed_seconds": round(catalog.seed_seconds, 2)},
+        "params": {
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "modes": {},
+    }
+    try:
+        modes = ("inprocess", "http") if args.mode == "both" else (args.mode,)
+        for mode in modes:
+            if mode == "inprocess":
+                from app.main import app
+
+                async with Lifespan(app):
+                    report["modes"][mode] = await run_mode(mode, args, catalog, admin_token)
+            else:
+                report["modes"][mode] = await run_mode(mode, args, catalog, admin_token)
+    finally:
+        if not args.keep:
+            await cleanup(catalog.prefix)
+        await engine.dispose()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон API на синтетическом каталоге")
+    add_size_arguments(parser)
+    parser.add_argument("--mode", choices=("inprocess", "http", "both"), default="inprocess")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="адрес сервера для --mode http")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=2000, help="запросов на сценарий")
+    parser.add_argument("--warmup", type=int, default=50, help="запросов прогрева (не учитываются)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="дополнительно записать JSON в файл")
+    parser.add_argument("--keep", action="store_true", help="не удалять засеянный каталог")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    body = json.dumps(report, ensure_ascii=False, indent=2)
+    print(body)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(body + "\n")
+    rates = [r["error_rate"] for m in report["modes"].values() for r in m.values()]
+    if any(rate > args.max_error_rate for rate in rates):
+        sys.exit(1)
@@ -0,0 +1,233 @@
+"""
+Синтетический каталог для нагрузочных прогонов: категории, товары, изображения, ТТХ, варианты.
+Использование отдельно: python -m benchmarks.catalog --products 10000
+                        python -m benchmarks.catalog --cleanup bench-api-<id>-
+
+Строки создаются INSERT ... SELECT из generate_series на стороне БД (десятки тысяч товаров — секунды).
+Файлы изображений: --image-files разных файлов по --image-kb КБ в STORAGE_PATH/bench-api/<префикс>/,
+строки product_images ссылаются на них по кругу. Каждый засев получает свой префикс slug
+(CATALOG_PREFIX + случайный id); cleanup(prefix) удаляет только его данные.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.db import async_session_maker, engine
+
+CATALOG_PREFIX = "bench-api-"
+STORAGE_DIR = "bench-api"
+
+
+@dataclass
+class CatalogSize:
+    products: int = 1000
+    categories: int = 20
+    images: int = 3  # на товар
+    specs: int = 8
+    variants: int = 3
+    image_files: int = 16
+    image_kb: int = 64
+    published_share: float = 0.9
+
+
+@dataclass
+class Catalog:
+    """Идентификаторы засеянного каталога для генерации запросов."""
+
+    size: CatalogSize
+    prefix: str
+    slugs: list[str]  # опубликованные товары
+    image_ids: list[str]
+    seed_seconds: float
+
+
+def _storage_dir(prefix: str) -> Path:
+    return Path(get_settings().storage_path) / STORAGE_DIR / prefix.rstrip("-")
+
+
+def _write_image_files(size: CatalogSize, prefix: str) -> list[str]:
+    base = _storage_dir(prefix)
+    base.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(size.image_files):
+        rel = f"{STORAGE_DIR}/{base.name}/image-{i}.jpg"
+        (base / f"image-{i}.jpg").write_bytes(os.urandom(size.image_kb * 1024))
+        paths.append(rel)
+    return paths
+
+
+async def seed(size: CatalogSize) -> Catalog:
+    """Засеять каталог под новым префиксом slug (чужие товары и другие засевы не затрагиваются)."""
+    prefix = f"{CATALOG_PREFIX}{uuid.uuid4().hex[:12]}-"
+    t0 = time.perf_counter()
+    try:
+        return await _seed(size, prefix, t0)
+    except BaseException:
+        await cleanup(prefix)
+        raise
+
+
+async def _seed(size: CatalogSize, prefix: str, t0: float) -> Catalog:
+    file_paths = await asyncio.to_thread(_write_image_files, size, prefix)
+    params = {"prefix": prefix, "pattern": f"{prefix}%"}
+    async with async_session_maker() as db:
+        await db.execute(
+            text(
+                """
+                INSERT INTO product_categories (id, name, slug, sort_order)
+                SELECT gen_random_uuid(), 'Bench category ' || g, :prefix || 'cat-' || g, g
+                FROM generate_series(1, :n) AS g
+                """
+            ),
+            {**params, "n": size.categories},
+        )
+        await db.execute(
+            text(
+                """
+                WITH cats AS (
+                    SELECT id, row_number() OVER (ORDER BY sort_order) - 1 AS idx
+                    FROM product_categories WHERE slug LIKE :pattern
+                )
+                INSERT INTO products (id, slug, title, sku, manufacturer, category_id, short_description,
+                                      description, price_amount, price_currency, is_published, sort_order,
+                                      view_count, created_at, updated_at)
+                SELECT gen_random_uuid(), :prefix || g, 'Bench product ' || g, 'BENCH-API-' || g,
+                       'Bench ' || (g % 7), cats.id, repeat('Кратко ', 8), repeat('Описание товара. ', 40),
+                       (g % 10000) + 0.99, 'RUB', (g % 100) < :published_pct, g, 0, now(), now()
+                FROM generate_series(1, :n) AS g
+                LEFT JOIN cats ON cats.idx = g % :categories
+                """
+            ),
+            {
+                **params,
+                "n": size.products,
+                "categories": max(size.categories, 1),
+                "published_pct": int(size.published_share * 100),
+            },
+        )
+        children = (
+            ("product_specs", "name, value, unit", "'Параметр ' || n, (n * 7)::text, 'мм'", size.specs),
+            (
+                "product_variants",
+                "option_name, option_value, stock_qty, in_order_qty",
+                "'Размер', 'Вариант ' || n, 100, 0",
+                size.variants,
+            ),
+            (
+                "product_images",
+                "file_path, alt, mime, size_bytes",
+                "(CAST(:files AS text[]))[1 + ((p.sort_order::int + n) % :file_count)], p.title, 'image/jpeg', "
+                ":image_bytes",
+                size.images,
+            ),
+        )
+        for table, columns, values, per_product in children:
+            if per_product <= 0:
+                continue
+            await db.execute(
+                text(
+                    f"""
+                    INSERT INTO {table} (id, product_id, {columns}, sort_order)
+                    SELECT gen_random_uuid(), p.id, {values}, n
+                    FROM products p CROSS JOIN generate_series(1, :per_product) AS n
+                    WHERE p.slug LIKE :pattern
+                    """
+                ),
+                {
+                    **params,
+                    "per_product": per_product,
+                    "files": file_paths,
+                    "file_count": len(file_paths),
+                    "image_bytes": size.image_kb * 1024,
+                },
+            )
+        await db.commit()
+
+        slugs = (
+            await db.execute(
+                text("SELECT slug FROM products WHERE slug LIKE :pattern AND is_published ORDER BY sort_order"),
+                params,
+            )
+        ).scalars().all()
+        image_ids = (
+            await db.execute(
+                text(
+                    """
+                    SELECT i.id::text FROM product_images i JOIN products p ON p.id = i.product_id
+                    WHERE p.slug LIKE :pattern ORDER BY p.sort_order, i.sort_order
+                    """
+                ),
+                params,
+            )
+        ).scalars().all()
+    return Catalog(
+        size=size, prefix=prefix, slugs=list(slugs), image_ids=list(image_ids), seed_seconds=time.perf_counter() - t0
+    )
+
+
+async def cleanup(prefix: str) -> None:
+    """Удалить товары, категории и файлы одного засева."""
+    if not prefix.startswith(CATALOG_PREFIX) or prefix == CATALOG_PREFIX:
+        raise ValueError(f"Not a catalog run prefix: {prefix!r}")
+    pattern = f"{prefix}%"
+    async with async_session_maker() as db:
+        await db.execute(text("DELETE FROM products WHERE slug LIKE :pattern"), {"pattern": pattern})
+        await db.execute(text("DELETE FROM product_categories WHERE slug LIKE :pattern"), {"pattern": pattern})
+        await db.commit()
+    await asyncio.to_thread(shutil.rmtree, _storage_dir(prefix), True)
+
+
+def add_size_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = CatalogSize()
+    parser.add_argument("--products", type=int, default=defaults.products)
+    parser.add_argument("--categories", type=int, default=defaults.categories)
+    parser.add_argument("--images", type=int, default=defaults.images, help="изображений на товар")
+    parser.add_argument("--specs", type=int, default=defaults.specs, help="ТТХ на товар")
+    parser.add_argument("--variants", type=int, default=defaults.variants, help="вариантов на товар")
+    parser.add_argument("--image-files", type=int, default=defaults.image_files)
+    parser.add_argument("--image-kb", type=int, default=defaults.image_kb)
+
+
+def size_from_args(args: argparse.Namespace) -> CatalogSize:
+    return CatalogSize(
+        products=args.products,
+        categories=args.categories,
+        images=args.images,
+        specs=args.specs,
+        variants=args.variants,
+        image_files=args.image_files,
+        image_kb=args.image_kb,
+    )
+
+
+async def _main(args: argparse.Namespace) -> dict:
+    try:
+        if args.cleanup:
+            await cleanup(args.cleanup)
+            return {"cleaned": args.cleanup}
+        catalog = await seed(size_from_args(args))
+        return {
+            "prefix": catalog.prefix,
+            "size": asdict(catalog.size),
+            "published": len(catalog.slugs),
+            "images": len(catalog.image_ids),
+            "seed_seconds": round(catalog.seed_seconds, 2),
+        }
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Засев синтетического каталога")
+    add_size_arguments(parser)
+    parser.add_argument("--cleanup", metavar="PREFIX", help="только удалить засев с этим префиксом slug")
+    print(json.dumps(asyncio.run(_main(parser.parse_args())), ensure_ascii=False, indent=2))
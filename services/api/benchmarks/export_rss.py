@@ -0,0 +1,127 @@
+"""
+Бенчмарк потоковой выгрузки: RSS процесса при экспорте большого каталога.
+Использование: python -m benchmarks.export_rss --rows 1000000 --format csv --max-rss-mb 150
+
+Засевает N товаров (generate_series на стороне БД, с ТТХ и вариантами), прогоняет
+export_products() до конца, замеряет прирост RSS, скорость и объём. Результат — JSON в stdout.
+Товары прогона получают уникальный префикс slug (bench-export-<id>-) — удаляются только они.
+"""
+import argparse
+import asyncio
+import json
+import resource
+import sys
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app.db import async_session_maker, engine
+from app.services.product_export import EXPORT_FORMATS, export_products
+
+BENCH_PREFIX = "bench-export-"
+
+
+def current_rss_mb() -> float:
+    """Текущий RSS (Linux: /proc/self/statm), иначе пиковый из getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_prefix() -> str:
+    """Префикс slug этого прогона: параллельные прогоны и чужие товары не пересекаются с ним."""
+    return f"{BENCH_PREFIX}{uuid.uuid4().hex[:12]}-"
+
+
+async def seed(prefix: str, rows: int) -> None:
+    """Товары + по 2 ТТХ и 2 варианта на товар, одним INSERT ... SELECT на таблицу."""
+    async with async_session_maker() as db:
+        await db.execute(
+            text(
+                """
+                INSERT INTO products (id, slug, title, sku, manufacturer, short_description, price_amount,
+                                      price_currency, is_published, sort_order, view_count, created_at, updated_at)
+                SELECT gen_random_uuid(), :prefix || g, 'Bench product ' || g, 'BENCH-' || g, 'Bench',
+                       repeat('Описание ', 10), (g % 10000) + 0.99, 'RUB', true, g, 0, now(), now()
+                FROM generate_series(1, :rows) AS g
+                """
+            ),
+            {"prefix": prefix, "rows": rows},
+        )
+        for table, columns, values in (
+            ("product_specs", "name, value, unit", "'Параметр ' || n, n::text, 'шт'"),
+            ("product_variants", "option_name, option_value, stock_qty, in_order_qty", "'Цвет', 'Вариант ' || n, 10, 0"),
+        ):
+            await db.execute(
+                text(
+                    f"""
+                    INSERT INTO {table} (id, product_id, {columns}, sort_order)
+                    SELECT gen_random_uuid(), p.id, {values}, n
+                    FROM products p CROSS JOIN generate_series(1, 2) AS n
+                    WHERE p.slug LIKE :pattern
+                    """
+                ),
+                {"pattern": f"{prefix}%"},
+            )
+        await db.commit()
+
+
+async def cleanup(prefix: str) -> None:
+    """Удалить товары прогона (ТТХ и варианты — каскадом)."""
+    async with async_session_maker() as db:
+        await db.execute(text("DELETE FROM products WHERE slug LIKE :pattern"), {"pattern": f"{prefix}%"})
+        await db.commit()
+
+
+async def run(rows: int, fmt: str, keep: bool) -> dict:
+    prefix = run_prefix()
+    t0 = time.perf_counter()
+    await seed(prefix, rows)
+    seed_s = time.perf_counter() - t0
+
+    rss_start = current_rss_mb()
+    rss_peak = rss_start
+    out_bytes = 0
+    chunks = 0
+    t0 = time.perf_counter()
+    try:
+        async for chunk in export_products(fmt):
+            out_bytes += len(chunk.encode("utf-8"))
+            chunks += 1
+            rss_peak = max(rss_peak, current_rss_mb())
+        export_s = time.perf_counter() - t0
+    finally:
+        if not keep:
+            await cleanup(prefix)
+        await engine.dispose()
+    return {
+        "format": fmt,
+        "slug_prefix": prefix,
+        "rows": rows,
+        "seed_seconds": round(seed_s, 2),
+        "export_seconds": round(export_s, 2),
+        "rows_per_second": round(rows / export_s) if export_s else None,
+        "output_mb": round(out_bytes / 1024 / 1024, 1),
+        "chunks": chunks,
+        "rss_start_mb": round(rss_start, 1),
+        "rss_peak_mb": round(rss_peak, 1),
+        "rss_growth_mb": round(rss_peak - rss_start, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RSS при потоковой выгрузке каталога")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--max-rss-mb", type=float, default=None, help="порог прироста RSS; превышение — код выхода 1")
+    parser.add_argument("--keep", action="store_true", help="не удалять засеянные товары")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.rows, args.format, args.keep))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.max_rss_mb is not None and report["rss_growth_mb"] > args.max_rss_mb:
+        sys.exit(1)
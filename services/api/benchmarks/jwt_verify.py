@@ -0,0 +1,47 @@
+"""
+Микробенчмарк зависимости require_admin: проверка JWT с кэшем и без.
+Использование: python -m benchmarks.jwt_verify --iterations 20000
+
+cold — кэш сбрасывается перед каждым вызовом (подпись проверяется каждый раз, как раньше);
+warm — один и тот же токен (повторные запросы одной формы).
+Результат — JSON в stdout (мкс на вызов). БД не нужна.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.api.admin_auth import clear_token_cache, create_access_token, require_admin, settings
+
+
+async def measure(iterations: int, cold: bool) -> float:
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token(settings.admin_login))
+    clear_token_cache()
+    await require_admin(credentials)
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        if cold:
+            clear_token_cache()
+        await require_admin(credentials)
+    return (time.perf_counter() - t0) / iterations * 1_000_000
+
+
+async def run(iterations: int) -> dict:
+    cold = await measure(iterations, cold=True)
+    warm = await measure(iterations, cold=False)
+    return {
+        "iterations": iterations,
+        "algorithm": settings.jwt_algorithm,
+        "cold_us_per_call": round(cold, 2),
+        "warm_us_per_call": round(warm, 2),
+        "speedup": round(cold / warm, 1) if warm else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Накладные расходы require_admin")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.iterations)), ensure_ascii=False, indent=2))
@@ -0,0 +1,121 @@
+"""
+Бенчмарк: стоимость вызова логгера на пути запроса — прямые обработчики против очереди.
+Использование: python -m benchmarks.logging_cost --records 20000 --slow-write-ms 2 --max-queued-us 50
+
+Два режима записи в файл с ротацией во временной директории:
+- direct — RotatingFileHandler на корневом логгере (прежняя схема: диск в потоке вызова);
+- queued — QueueHandler + QueueListener (схема app.logging_config): вызов кладёт запись в очередь.
+Каждый режим прогоняется на обычном диске и на «медленном» (каждая запись в файл задерживается
+на --slow-write-ms, как при загруженном диске или ротации). Время — мкс на вызов logger.info
+в вызывающем потоке; для queued дополнительно — время до записи всех строк потоком-писателем.
+Результат — JSON в stdout; если вызов в режиме queued на медленном диске дороже --max-queued-us —
+код выхода 1. БД не нужна.
+"""
+import argparse
+import json
+import logging
+import queue
+import statistics
+import sys
+import tempfile
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+
+from benchmarks.stats import percentile
+
+
+class SlowRotatingFileHandler(RotatingFileHandler):
+    """Файловый обработчик с искусственной задержкой записи."""
+
+    def __init__(self, *args, delay_s: float = 0.0, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.delay_s = delay_s
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        super().emit(record)
+
+
+def _file_handler(directory: Path, delay_s: float) -> logging.Handler:
+    handler = SlowRotatingFileHandler(
+        directory / "bench.log", maxBytes=1024 * 1024, backupCount=2, encoding="utf-8", delay_s=delay_s
+    )
+    handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s"))
+    return handler
+
+
+def _measure(logger: logging.Logger, records: int) -> list[float]:
+    samples = []
+    for i in range(records):
+        t0 = time.perf_counter()
+        logger.info("GET /api/products/%s 200: %d queries, %.2f ms in DB", "slug-%d" % i, 3, 1.25)
+        samples.append((time.perf_counter() - t0) * 1_000_000)
+    return samples
+
+
+def _summary(samples: list[float]) -> dict:
+    return {
+        "mean_us": round(statistics.fmean(samples), 2),
+        "p50_us": percentile(samples, 0.5, 2),
+        "p99_us": percentile(samples, 0.99, 2),
+        "max_us": round(max(samples), 2),
+    }
+
+
+def run_mode(mode: str, records: int, delay_s: float) -> dict:
+    logger = logging.getLogger(f"bench.{mode}.{delay_s}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        handler = _file_handler(Path(tmp), delay_s)
+        listener = None
+        if mode == "queued":
+            log_queue: queue.SimpleQueue = queue.SimpleQueue()
+            logger.addHandler(QueueHandler(log_queue))
+            listener = QueueListener(log_queue, handler)
+            listener.start()
+        else:
+            logger.addHandler(handler)
+        samples = _measure(logger, records)
+        t0 = time.perf_counter()
+        if listener is not None:
+            listener.stop()  # дожидается записи всех строк из очереди
+        drain_s = time.perf_counter() - t0
+        handler.close()
+        logger.handlers.clear()
+    result = _summary(samples)
+    if mode == "queued":
+        result["writer_drain_seconds"] = round(drain_s, 3)
+    return result
+
+
+def run(records: int, slow_write_ms: float) -> dict:
+    slow_records = max(records // 20, 100)  # на медленном диске direct идёт records * delay секунд
+    return {
+        "records": records,
+        "fast_disk": {
+            "direct": run_mode("direct", records, 0.0),
+            "queued": run_mode("queued", records, 0.0),
+        },
+        "slow_disk": {
+            "records": slow_records,
+            "write_delay_ms": slow_write_ms,
+            "direct": run_mode("direct", slow_records, slow_write_ms / 1000),
+            "queued": run_mode("queued", slow_records, slow_write_ms / 1000),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Стоимость вызова логгера: прямая запись и очередь")
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--slow-write-ms", type=float, default=2.0)
+    parser.add_argument("--max-queued-us", type=float, default=50.0, help="порог среднего вызова queued на медленном диске")
+    args = parser.parse_args()
+
+    report = run(args.records, args.slow_write_ms)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if report["slow_disk"]["queued"]["mean_us"] > args.max_queued_us:
+        sys.exit(1)
@@ -0,0 +1,85 @@
+"""
+Бенчмарк: задержка витрины во время всплеска логинов (проверка bcrypt вне event loop).
+Использование: python -m benchmarks.login_burst --logins 20 --max-p99-ms 50
+
+В одном event loop параллельно идут --logins проверок пароля и «запрос витрины» — корутина,
+которая каждые --probe-ms мс засыпает и замеряет опоздание пробуждения (задержку, которую
+получил бы любой запрос на этом воркере). Два прогона:
+- inline — verify_password прямо в корутине (прежнее поведение login);
+- pool — verify_password_async (пул bcrypt с ограничением параллелизма).
+Результат — JSON в stdout; если p99 задержки в режиме pool выше --max-p99-ms — код выхода 1.
+БД не нужна.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+from app.api.admin_auth import hash_password, verify_password, verify_password_async
+
+PASSWORD = "bench-password"
+
+
+async def _probe(stop: asyncio.Event, interval_s: float, lags: list[float]) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval_s)
+        lags.append((time.perf_counter() - t0 - interval_s) * 1000)
+
+
+async def _inline_login(hashed: str) -> bool:
+    return verify_password(PASSWORD, hashed)
+
+
+async def _pool_login(hashed: str) -> bool:
+    return await verify_password_async(PASSWORD, hashed)
+
+
+async def burst(mode: str, logins: int, hashed: str, probe_ms: float) -> dict:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(stop, probe_ms / 1000, lags))
+    await asyncio.sleep(probe_ms / 1000 * 5)  # базовая линия до всплеска
+    login = _inline_login if mode == "inline" else _pool_login
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(login(hashed) for _ in range(logins)))
+    burst_s = time.perf_counter() - t0
+    stop.set()
+    await probe
+    lags.sort()
+    return {
+        "mode": mode,
+        "logins": logins,
+        "all_verified": all(results),
+        "burst_seconds": round(burst_s, 3),
+        "probe_samples": len(lags),
+        "lag_ms": {
+            "p50": round(lags[len(lags) // 2], 2),
+            "p99": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))], 2),
+            "max": round(lags[-1], 2),
+            "mean": round(statistics.fmean(lags), 2),
+        },
+    }
+
+
+async def run(logins: int, probe_ms: float) -> dict:
+    hashed = hash_password(PASSWORD)
+    return {
+        "inline": await burst("inline", logins, hashed, probe_ms),
+        "pool": await burst("pool", logins, hashed, probe_ms),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Задержка event loop во время всплеска логинов")
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--probe-ms", type=float, default=5.0)
+    parser.add_argument("--max-p99-ms", type=float, default=50.0, help="порог p99 задержки в режиме pool")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.logins, args.probe_ms))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if not report["pool"]["all_verified"] or report["pool"]["lag_ms"]["p99"] > args.max_p99_ms:
+        sys.exit(1)
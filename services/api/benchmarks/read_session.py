@@ -0,0 +1,108 @@
+"""
+Бенчмарк сессий чтения: get_db (BEGIN … COMMIT) против get_readonly_db (AUTOCOMMIT, без COMMIT).
+Использование: python -m benchmarks.read_session --requests 2000 --concurrency 10
+
+Каждый «запрос» проходит зависимость FastAPI целиком (открытие сессии, выборка первой страницы
+каталога как в GET /api/products, завершение зависимости). Обмены с сервером считаются событиями
+движка: выполненные запросы + BEGIN + COMMIT/ROLLBACK (последние — только вне AUTOCOMMIT).
+Результат — JSON в stdout; если сессия чтения не экономит обменов — код выхода 1.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+from sqlalchemy import event
+
+from app.db import engine, get_db, get_readonly_db
+from app.repositories.product import list_products
+from benchmarks.stats import percentile
+
+round_trips = 0
+
+
+def _autocommit(conn) -> bool:
+    return bool(getattr(conn.connection.dbapi_connection, "autocommit", False))
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _on_execute(conn, cursor, statement, parameters, context, executemany):
+    global round_trips
+    round_trips += 1
+
+
+@event.listens_for(engine.sync_engine, "begin")
+@event.listens_for(engine.sync_engine, "commit")
+@event.listens_for(engine.sync_engine, "rollback")
+def _on_tx(conn):
+    global round_trips
+    if not _autocommit(conn):
+        round_trips += 1
+
+
+async def one_request(dependency) -> float:
+    t0 = time.perf_counter()
+    gen = dependency()
+    db = await gen.__anext__()
+    await list_products(db, page=1, per_page=20)
+    try:
+        await gen.__anext__()
+    except StopAsyncIteration:
+        pass
+    return (time.perf_counter() - t0) * 1000
+
+
+async def measure(dependency, requests: int, concurrency: int) -> dict:
+    global round_trips
+    await one_request(dependency)  # прогрев пула и кэша подготовленных запросов
+    round_trips = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def bounded() -> float:
+        async with sem:
+            return await one_request(dependency)
+
+    t0 = time.perf_counter()
+    latencies = await asyncio.gather(*(bounded() for _ in range(requests)))
+    elapsed = time.perf_counter() - t0
+    return {
+        "round_trips_per_request": round(round_trips / requests, 2),
+        "requests_per_second": round(requests / elapsed),
+        "latency_ms": {
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "mean": round(statistics.fmean(latencies), 3),
+        },
+    }
+
+
+async def run(requests: int, concurrency: int) -> dict:
+    transactional = await measure(get_db, requests, concurrency)
+    read_only = await measure(get_readonly_db, requests, concurrency)
+    await engine.dispose()
+    saved = transactional["round_trips_per_request"] - read_only["round_trips_per_request"]
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "get_db": transactional,
+        "get_readonly_db": read_only,
+        "round_trips_saved_per_request": round(saved, 2),
+        "mean_latency_saved_ms": round(
+            transactional["latency_ms"]["mean"] - read_only["latency_ms"]["mean"], 3
+        ),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Обмены с БД на запрос: транзакционная сессия и сессия чтения")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.requests, args.concurrency))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if report["round_trips_saved_per_request"] <= 0:
+        sys.exit(1)
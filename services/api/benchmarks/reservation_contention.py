@@ -0,0 +1,162 @@
+"""
+Бенчмарк резервирования: сотни параллельных покупателей на одном «горячем» варианте.
+Использование: python -m benchmarks.reservation_contention --buyers 500 --stock 200 --qty 1
+
+Засевает товар с одним вариантом (stock_qty = --stock), запускает --buyers корутин, каждая
+в своей сессии вызывает stock.reserve() со своим ключом (часть — повторно с тем же ключом,
+проверка идемпотентности), затем половину успешных резервов подтверждает, половину снимает.
+Проверяется отсутствие перепродажи и согласованность in_order_qty с активными удержаниями.
+Результат — JSON в stdout; при нарушении инвариантов код выхода 1.
+Удаляется только товар этого прогона (резервы — каскадом), параллельные прогоны не затрагиваются.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app.db import async_session_maker, engine
+from app.services import stock
+from benchmarks.stats import percentile
+
+BENCH_PREFIX = "bench-reserve-"
+
+
+async def seed(stock_qty: int) -> tuple[uuid.UUID, uuid.UUID]:
+    product_id, variant_id = uuid.uuid4(), uuid.uuid4()
+    async with async_session_maker() as db:
+        await db.execute(
+            text(
+                """
+                INSERT INTO products (id, slug, title, is_published, sort_order, view_count, created_at, updated_at)
+                VALUES (:id, :slug, 'Bench reservation', false, 0, 0, now(), now())
+                """
+            ),
+            {"id": product_id, "slug": f"{BENCH_PREFIX}{product_id}"},
+        )
+        await db.execute(
+            text(
+                """
+                INSERT INTO product_variants (id, product_id, option_name, option_value, stock_qty, in_order_qty, sort_order)
+                VALUES (:id, :product_id, 'Размер', 'M', :stock, 0, 0)
+                """
+            ),
+            {"id": variant_id, "product_id": product_id, "stock": stock_qty},
+        )
+        await db.commit()
+    return product_id, variant_id
+
+
+async def cleanup(product_id: uuid.UUID) -> None:
+    """Удалить товар прогона (варианты и резервы — каскадом)."""
+    async with async_session_maker() as db:
+        await db.execute(text("DELETE FROM products WHERE id = :id"), {"id": product_id})
+        await db.commit()
+
+
+async def call(fn, *args) -> tuple[str, float]:
+    """Одна операция в своей транзакции: (исход, задержка в мс)."""
+    t0 = time.perf_counter()
+    async with async_session_maker() as db:
+        try:
+            await fn(db, *args)
+            await db.commit()
+            outcome = "ok"
+        except stock.InsufficientStock:
+            await db.rollback()
+            outcome = "insufficient"
+        except stock.ReservationError:
+            await db.rollback()
+            outcome = "conflict"
+    return outcome, (time.perf_counter() - t0) * 1000
+
+
+async def run(buyers: int, stock_qty: int, qty: int, replay_every: int) -> dict:
+    product_id, variant_id = await seed(stock_qty)
+    try:
+        return await _run(variant_id, buyers, stock_qty, qty, replay_every)
+    finally:
+        await cleanup(product_id)
+        await engine.dispose()
+
+
+async def _run(variant_id: uuid.UUID, buyers: int, stock_qty: int, qty: int, replay_every: int) -> dict:
+    run_id = uuid.uuid4().hex[:8]
+    keys = [f"{BENCH_PREFIX}{run_id}-{i}" for i in range(buyers)]
+    # Каждый replay_every-й покупатель отправляет запрос дважды (повтор по сети)
+    calls = [(stock.reserve, k, variant_id, qty) for k in keys]
+    calls += [(stock.reserve, k, variant_id, qty) for k in keys[::replay_every]] if replay_every else []
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(call(fn, *args) for fn, *args in calls))
+    reserve_s = time.perf_counter() - t0
+
+    latencies = [ms for _, ms in results]
+    async with async_session_maker() as db:
+        held_keys = (
+            await db.execute(
+                text("SELECT idempotency_key FROM stock_reservations WHERE variant_id = :v AND status = 'held'"),
+                {"v": variant_id},
+            )
+        ).scalars().all()
+
+    to_commit, to_release = held_keys[::2], held_keys[1::2]
+    t0 = time.perf_counter()
+    finish = await asyncio.gather(
+        *(call(stock.commit, k) for k in to_commit),
+        *(call(stock.release, k) for k in to_release),
+    )
+    finish_s = time.perf_counter() - t0
+
+    async with async_session_maker() as db:
+        stock_left, in_order = (
+            await db.execute(
+                text("SELECT stock_qty, in_order_qty FROM product_variants WHERE id = :v"), {"v": variant_id}
+            )
+        ).one()
+        held = await stock.held_qty(db, variant_id)
+
+    expected_held = min(buyers, stock_qty // qty)
+    checks = {
+        "no_oversell": len(held_keys) * qty <= stock_qty,
+        "all_stock_sold_when_contended": len(held_keys) == expected_held,
+        "stock_after_commit": stock_left == stock_qty - len(to_commit) * qty,
+        "in_order_matches_holds": in_order == held == 0,
+        "finish_all_ok": all(o == "ok" for o, _ in finish),
+    }
+    return {
+        "buyers": buyers,
+        "requests": len(calls),
+        "stock": stock_qty,
+        "qty": qty,
+        "held": len(held_keys),
+        "outcomes": {o: sum(1 for r, _ in results if r == o) for o in ("ok", "insufficient", "conflict")},
+        "reserve_seconds": round(reserve_s, 3),
+        "reserve_per_second": round(len(calls) / reserve_s) if reserve_s else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "mean": round(statistics.fmean(latencies), 2),
+        },
+        "finish_seconds": round(finish_s, 3),
+        "checks": checks,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Конкурентное резервирование одного варианта")
+    parser.add_argument("--buyers", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=200)
+    parser.add_argument("--qty", type=int, default=1)
+    parser.add_argument("--replay-every", type=int, default=10, help="каждый N-й ключ отправляется повторно (0 — без повторов)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.buyers, args.stock, args.qty, args.replay_every))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if not all(report["checks"].values()):
+        sys.exit(1)
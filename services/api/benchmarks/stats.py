@@ -0,0 +1,11 @@
+"""
+Общие расчёты для бенчмарков: перцентили выборки задержек.
+"""
+
+
+def percentile(values: list[float], p: float, digits: int = 3) -> float:
+    """Перцентиль p (0…1) методом ближайшего ранга; пустая выборка — 0."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], digits)
@@ -0,0 +1,44 @@
+"""
+Массовый импорт товаров из CSV/XLSX (формат колонок — см. app/services/product_import.py).
+Использование: python import_products.py catalog.xlsx [--dry-run] [--batch-size 500]
+"""
+import argparse
+import asyncio
+import sys
+
+from app.db import async_session_maker, engine
+from app.schemas.admin import ProductImportResult
+from app.services.product_import import IMPORT_BATCH_SIZE, ImportFormatError, import_products
+
+
+def _print_progress(report: ProductImportResult) -> None:
+    print(
+        f"processed={report.processed} created={report.created} "
+        f"updated={report.updated} failed={report.failed}",
+        file=sys.stderr,
+    )
+
+
+async def main(path: str, dry_run: bool, batch_size: int) -> int:
+    try:
+        with open(path, "rb") as f:
+            async with async_session_maker() as db:
+                report = await import_products(
+                    db, f, path, dry_run=dry_run, batch_size=batch_size, on_progress=_print_progress
+                )
+    except ImportFormatError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        await engine.dispose()
+    print(report.model_dump_json(indent=2))
+    return 0 if not report.failed else 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Импорт товаров из CSV/XLSX")
+    parser.add_argument("file", help="путь к .csv или .xlsx")
+    parser.add_argument("--dry-run", action="store_true", help="только проверить строки, без записи в БД")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.file, args.dry_run, args.batch_size)))
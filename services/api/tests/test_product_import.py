@@ -0,0 +1,58 @@
+"""
+Разбор файла импорта без БД: рваные строки CSV и генерация slug без колонки sku.
+Запуск из services/api: python -m pytest tests
+"""
+import asyncio
+import io
+
+from app.services.product_import import _resolve_slugs, iter_csv_rows, parse_row
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+    def scalars(self):
+        return self
+
+
+class _FakeSession:
+    """Сессия, у которой в БД нет ни одного товара."""
+
+    async def execute(self, stmt):
+        return _Result([])
+
+
+def _csv(text: str) -> list[dict[str, str]]:
+    return list(iter_csv_rows(io.BytesIO(text.encode("utf-8"))))
+
+
+def test_short_rows_padded_to_header():
+    rows = _csv(
+        "title;price;specs;variants\n"
+        "Чайник;1000;Мощность=2000|Вт;Цвет:Белый=3\n"
+        "Кружка;200\n"
+        "Ложка;50;;;лишняя ячейка\n"
+    )
+    assert [set(r) for r in rows] == [{"title", "price", "specs", "variants"}] * 3
+    assert rows[1]["specs"] == rows[1]["variants"] == ""
+    assert rows[2]["variants"] == ""
+
+
+def test_short_first_row_keeps_columns_for_batch():
+    rows = _csv("title,specs,variants\nКружка\nЧайник,Мощность=2000|Вт,Цвет:Белый=3\n")
+    parsed = [parse_row(r) for r in rows]
+    assert parsed[0]["specs"] == [] and parsed[0]["variants"] == []
+    assert parsed[1]["specs"][0]["name"] == "Мощность"
+    assert parsed[1]["variants"][0]["stock_qty"] == 3
+
+
+def test_slugs_generated_from_title_without_sku_column():
+    rows = [{**parse_row(r), "row": i} for i, r in enumerate(_csv("title,price\nЧайник,1000\nЧайник,1200\n"), 2)]
+    asyncio.run(_resolve_slugs(_FakeSession(), rows))
+    slugs = [r["product"]["slug"] for r in rows]
+    assert slugs[0] == "чайник"
+    assert slugs[1].startswith("чайник-")